@@ -1,11 +1,32 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import logging
+import json
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from sse_starlette.sse import EventSourceResponse
+from typing import List, Dict, Any, Literal, Optional
 from uuid import uuid4
-from backend.graph.builder import build_graph
+from backend.config.settings import WARMUP_ON_STARTUP
+from backend.utils.graph_store import is_valid_blob_id, load_figure_bytes, resolve_graphs
+from backend.utils.tracing import start_trace, finish_trace, tracing_config, trace_store
+from backend.utils.warmup import get_graph, start_warmup, warmup_status
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Il grafo non viene costruito all'import: il warmup parte in background e
+    # il server accetta subito connessioni (/health), /ready risponde 200 a warmup concluso
+    if WARMUP_ON_STARTUP:
+        start_warmup()
+    yield
 
-app = FastAPI()
-serenade_graph = build_graph()
+
+app = FastAPI(lifespan=lifespan)
 
 
 class ChatMessage(BaseModel):
@@ -19,6 +40,8 @@ class QueryRequest(BaseModel):
     message: str
     thread_id: Optional[str] = None
     max_iterations: int = 15
+    # Risposta per i turni con un solo risultato: "llm" o "template" (None = ANSWER_SYNTHESIS)
+    answer_synthesis: Optional[Literal["template", "llm"]] = None
 
 
 class GraphResponse(BaseModel):
@@ -35,75 +58,207 @@ class QueryResponse(BaseModel):
     message: str
     structured_responses: List[Dict[str, Any]]
     graphs: Optional[List[GraphResponse]] = None
+    trace_id: Optional[str] = None
 
 
-def run_chat(message: str, thread_id: str, max_iterations: int = 15):
-    """
-    Esegue il chatbot con gestione dello stato conversazionale.
-    """
-    assistant_message = None
-    structured_responses = []
-    graphs = None
+TEAMS = ("sleep_team", "kitchen_team", "mobility_team")
 
+
+def _chat_config(thread_id: str, max_iterations: int, answer_synthesis: str | None = None) -> dict:
     # Configura con thread_id per mantenere la conversazione
-    config = {
-        "configurable": {"thread_id": thread_id},
+    configurable = {"thread_id": thread_id}
+    if answer_synthesis:
+        configurable["answer_synthesis"] = answer_synthesis
+    return {
+        "configurable": configurable,
         "recursion_limit": max_iterations
     }
 
+
+class ChatResult:
+    """Accumula messaggio finale, structured_responses e grafici dagli update dei nodi"""
+
+    def __init__(self):
+        self.assistant_message = None
+        self.structured_responses = []
+        self.graphs = None
+
+    def collect(self, node_output: dict) -> None:
+        # Cattura messaggi AI aggiunti
+        if "messages" in node_output:
+            for msg in node_output["messages"]:
+                if hasattr(msg, 'type') and msg.type == "ai":
+                    self.assistant_message = msg.content
+
+        # Cattura structured_responses
+        if "structured_responses" in node_output:
+            team_responses = node_output["structured_responses"]
+            logger.debug("Team response %s", team_responses)
+            all_agent_responses = []
+            for team_resp in team_responses:
+                if isinstance(team_resp, dict) and "structured_responses" in team_resp:
+                    all_agent_responses.extend(team_resp["structured_responses"])
+            self.structured_responses = all_agent_responses
+
+        # Cattura i grafici
+        if "graphs" in node_output:
+            self.graphs = node_output["graphs"]
+
+    def finalize(self, config: dict):
+        """Completa i campi mancanti leggendo lo state finale del thread"""
+        assistant_message = self.assistant_message
+        graphs = self.graphs
+
+        if assistant_message is None:
+            final_state = get_graph().get_state(config)
+
+            if final_state and final_state.values and "messages" in final_state.values:
+                # Trova l'ultimo messaggio AI
+                for msg in reversed(final_state.values["messages"]):
+                    if hasattr(msg, 'type') and msg.type == "ai":
+                        assistant_message = msg.content
+                        break
+
+            # Cattura graphs dallo state finale se non catturati prima
+            if graphs is None and final_state and final_state.values and "graphs" in final_state.values:
+                graphs = final_state.values["graphs"]
+
+            # Se ancora non abbiamo risposta
+            if assistant_message is None:
+                assistant_message = "I'm sorry, I couldn't generate a response."
+
+        # Lo state contiene solo i riferimenti: le figure vengono lette dal blob store
+        return assistant_message, self.structured_responses, resolve_graphs(graphs)
+
+
+def run_chat(message: str, thread_id: str, max_iterations: int = 15, trace=None, answer_synthesis: str | None = None):
+    """
+    Esegue il chatbot con gestione dello stato conversazionale.
+    Se viene passato un Trace, nodi, chiamate LLM e tool vengono registrati come span.
+    """
+    config = _chat_config(thread_id, max_iterations, answer_synthesis)
+    result = ChatResult()
+
     # Stream degli aggiornamenti
-    for event in serenade_graph.stream(
+    for event in get_graph().stream(
             {"messages": [("user", message)]},
-            config,
+            tracing_config(config, trace),
             stream_mode="updates"
     ):
         # Ogni event è un dict: {node_name: node_output}
         for node_name, node_output in event.items():
-
-
             if node_output is None:
                 continue
+            result.collect(node_output)
 
-            # Cattura messaggi AI aggiunti
-            if "messages" in node_output:
-                for msg in node_output["messages"]:
-                    if hasattr(msg, 'type') and msg.type == "ai":
-                        assistant_message = msg.content
+    return result.finalize(config)
 
-            # Cattura structured_responses
-            if "structured_responses" in node_output:
-                team_responses = node_output["structured_responses"]
-                print("Team response ", team_responses)
-                all_agent_responses = []
-                for team_resp in team_responses:
-                    if isinstance(team_resp, dict) and "structured_responses" in team_resp:
-                        all_agent_responses.extend(team_resp["structured_responses"])
-                structured_responses = all_agent_responses
 
+def _sse(event: str, data: dict) -> dict:
+    return {"event": event, "data": json.dumps(data, default=str, ensure_ascii=False)}
 
-            # Cattura i grafici
-            if "graphs" in node_output:
-                graphs = node_output["graphs"]
 
-    if assistant_message is None:
-        final_state = serenade_graph.get_state(config)
+def _plan_payload(plan) -> dict:
+    return {
+        "subject_id": plan.subject_id,
+        "period": plan.period,
+        "cross_domain": plan.cross_domain,
+        "tasks": [{"team": t.team, "instruction": t.instruction} for t in plan.tasks],
+    }
 
-        if final_state and final_state.values and "messages" in final_state.values:
-            # Trova l'ultimo messaggio AI
-            for msg in reversed(final_state.values["messages"]):
-                if hasattr(msg, 'type') and msg.type == "ai":
-                    assistant_message = msg.content
-                    break
 
-        # Cattura graphs dallo state finale se non catturati prima
-        if graphs is None and final_state and final_state.values and "graphs" in final_state.values:
-            graphs = final_state.values["graphs"]
+def _answer_token(namespace: tuple, chunk) -> str | None:
+    """Testo del chunk se appartiene alla risposta del correlation_analyzer"""
+    if not namespace or not namespace[0].startswith("correlation_analyzer:"):
+        return None
+    if getattr(chunk, "tool_call_chunks", None):
+        return None
+    content = chunk.content
+    if isinstance(content, list):
+        content = "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+    return content or None
 
-        # Se ancora non abbiamo risposta
-        if assistant_message is None:
-            assistant_message = "I'm sorry, I couldn't generate a response."
 
-    return assistant_message, structured_responses, graphs
+async def stream_chat(message: str, thread_id: str, max_iterations: int = 15, answer_synthesis: str | None = None):
+    """
+    Esegue il chatbot emettendo eventi SSE man mano che il grafo avanza:
+
+    - thread: thread_id della conversazione (primo evento, immediato)
+    - plan: execution plan prodotto dal planner
+    - team_started / team_finished: inizio e fine di ogni team
+    - node: completamento di un nodo (anche interno ai team)
+    - graphs: grafici disponibili
+    - token: frammenti della risposta del correlation_analyzer
+    - message: risposta finale completa (stesso contenuto di /chat)
+    - error / done
+    """
+    config = _chat_config(thread_id, max_iterations, answer_synthesis)
+    result = ChatResult()
+    trace = start_trace("chat_stream", thread_id=thread_id)
+    trace_id = trace.trace_id if trace else None
+
+    yield _sse("thread", {"thread_id": thread_id, "trace_id": trace_id})
+
+    try:
+        # Costruzione del grafo (alla prima richiesta senza warmup) e finalize (salvataggio
+        # delle figure) sono sincroni: in un thread per non bloccare l'event loop
+        graph = await asyncio.to_thread(get_graph)
+        async for namespace, mode, payload in graph.astream(
+                {"messages": [("user", message)]},
+                tracing_config(config, trace),
+                stream_mode=["updates", "messages"],
+                subgraphs=True
+        ):
+            if mode == "messages":
+                chunk, _ = payload
+                token = _answer_token(namespace, chunk)
+                if token:
+                    yield _sse("token", {"content": token})
+                continue
+
+            team = namespace[0].split(":")[0] if namespace else None
+
+            for node_name, node_output in payload.items():
+                if namespace:
+                    # Nodi interni ai team: solo avanzamento (gli step degli agenti ReAct sono ignorati)
+                    if len(namespace) == 1 and team in TEAMS:
+                        yield _sse("node", {"node": node_name, "team": team})
+                    continue
+
+                if node_output is None:
+                    continue
+                result.collect(node_output)
+
+                if node_name == "planner" and node_output.get("execution_plan"):
+                    yield _sse("plan", _plan_payload(node_output["execution_plan"]))
+                elif node_name == "supervisor" and node_output.get("next") in TEAMS:
+                    yield _sse("team_started", {"team": node_output["next"]})
+                elif node_name in TEAMS:
+                    yield _sse("team_finished", {"team": node_name})
+                else:
+                    yield _sse("node", {"node": node_name, "team": None})
+
+                if node_output.get("graphs"):
+                    # Solo riferimenti: le figure sono in /graphs/{blob_id} e nel messaggio finale
+                    yield _sse("graphs", {"graphs": [
+                        {**ref, "url": f"/graphs/{ref['blob_id']}"} for ref in node_output["graphs"]
+                    ]})
+
+        assistant_message, structured_responses, graphs = await asyncio.to_thread(result.finalize, config)
+        yield _sse("message", {
+            "thread_id": thread_id,
+            "message": assistant_message,
+            "structured_responses": structured_responses,
+            "graphs": graphs or [],
+            "trace_id": trace_id,
+        })
+    except Exception as e:
+        logger.exception("Errore durante lo streaming della chat")
+        yield _sse("error", {"detail": f"Errore durante l'elaborazione: {str(e)}"})
+    finally:
+        finish_trace(trace)
+
+    yield _sse("done", {"thread_id": thread_id, "trace_id": trace_id})
 
 
 @app.post("/chat", response_model=QueryResponse)
@@ -114,33 +269,50 @@ async def chat_endpoint(request: QueryRequest):
     try:
         # Genera un nuovo thread_id se non fornito
         thread_id = request.thread_id or str(uuid4())
-
+        trace = start_trace("chat", thread_id=thread_id)
 
         # Esegui il chatbot
-        assistant_message, structured_responses, graphs = run_chat(
-            request.message,
-            thread_id,
-            request.max_iterations
-        )
-
-
+        try:
+            assistant_message, structured_responses, graphs = await asyncio.to_thread(
+                run_chat,
+                request.message,
+                thread_id,
+                request.max_iterations,
+                trace,
+                request.answer_synthesis
+            )
+        finally:
+            finish_trace(trace)
 
         return QueryResponse(
             thread_id=thread_id,
             message=assistant_message,
             structured_responses=structured_responses,
-            graphs=graphs or []
+            graphs=graphs or [],
+            trace_id=trace.trace_id if trace else None
         )
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Errore durante l'elaborazione della chat")
         raise HTTPException(
             status_code=500,
             detail=f"Errore durante l'elaborazione: {str(e)}"
         )
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: QueryRequest):
+    """
+    Come /chat, ma restituisce uno stream Server-Sent Events con l'avanzamento
+    del grafo e i token della risposta finale (vedi stream_chat).
+    """
+    thread_id = request.thread_id or str(uuid4())
+    return EventSourceResponse(
+        stream_chat(request.message, thread_id, request.max_iterations, request.answer_synthesis),
+        ping=15
+    )
+
+
 @app.post("/chat/new")
 async def new_conversation():
     """
@@ -160,7 +332,7 @@ async def get_conversation_history(thread_id: str):
     """
     try:
         config = {"configurable": {"thread_id": thread_id}}
-        state = serenade_graph.get_state(config)
+        state = get_graph().get_state(config)
 
         if state is None or not state.values or "messages" not in state.values:
             return {"messages": [], "thread_id": thread_id}
@@ -185,12 +357,55 @@ async def get_conversation_history(thread_id: str):
         )
 
 
+@app.get("/graphs/{blob_id}")
+async def get_graph_figure(blob_id: str):
+    """
+    Figura Plotly (JSON di fig.to_dict()) dal blob store.
+    I blob sono content-addressed, quindi immutabili e cacheabili indefinitamente.
+    """
+    data = load_figure_bytes(blob_id) if is_valid_blob_id(blob_id) else None
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"Grafico {blob_id} non trovato")
+    return Response(
+        content=data,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{blob_id}"'}
+    )
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, format: str = "json"):
+    """
+    Trace di una richiesta recente: format=json (span + riepilogo per nodo)
+    oppure format=chrome (da aprire in chrome://tracing o Perfetto).
+    """
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} non trovato")
+    if format == "chrome":
+        return trace.to_chrome_trace()
+    return trace.to_json()
+
+
 @app.get("/health")
 async def health_check():
     """Endpoint di health check."""
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: 200 quando il warmup è concluso (o disattivato con WARMUP_ON_STARTUP=0,
+    nel qual caso il grafo viene costruito alla prima richiesta), 503 con l'avanzamento
+    delle fasi altrimenti.
+    """
+    status = warmup_status.to_json()
+    if warmup_status.ready or not WARMUP_ON_STARTUP:
+        return {"status": "ready", "warmup": status}
+    return JSONResponse(status_code=503, content={"status": "starting", "warmup": status})
+
+
 if __name__ == "__main__":
     import uvicorn
 
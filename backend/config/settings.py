@@ -1,82 +1,130 @@
 from dotenv import load_dotenv
+import logging
 import os
 from pathlib import Path
 from google.api_core import exceptions
+import threading
 import time
 
 # Carica le variabili dal file .env
 load_dotenv()
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+# Livello di log dell'applicazione (DEBUG mostra anche i payload completi degli agenti)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
 
 # Recupera la chiave dall'ambiente
 google_api_key = os.getenv("GOOGLE_API")
 mistral_api = os.getenv("MISTRAL")
 
 
-llm_graph_generator = ChatGoogleGenerativeAI(
-    model="gemini-2.5-pro",
-    google_api_key=google_api_key,
-    temperature=0.7,
-    max_retries=0
-)
+# Configurazione dei client LLM. I client non vengono creati all'import del modulo:
+# ``from backend.config.settings import llm_agents`` (o ``settings.llm_agents``) li
+# costruisce al primo accesso tramite __getattr__ e li riusa per tutto il processo.
+LLM_CONFIGS = {
+    "llm_graph_generator": dict(
+        model="gemini-2.5-pro",
+        temperature=0.7,
+        max_retries=0
+    ),
+    "llm_supervisor": dict(
+        model="gemini-2.5-flash",
+        temperature=0.3,  # creativo
+        top_p=0.5,  # varietà lessicale
+        top_k=20,  # maggiori opzioni (da vedere meglio)
+        max_output_tokens=2096,  #lunghezza risposta (forse anche meno)
+        timeout=60.0,
+        max_retries=0
+    ),
+    "llm_correlation": dict(
+        model="gemini-2.5-flash",
+        temperature=0.3,  # creativo
+        top_p=0.5,  # varietà lessicale
+        top_k=20,  # maggiori opzioni (da vedere meglio)
+        max_output_tokens=5096,  #lunghezza risposta (forse anche meno)
+        timeout=60.0,
+        max_retries=0
+    ),
+    "llm_agents": dict(
+        model="gemini-2.5-flash",
+        temperature=0,
+        top_p=0.1,
+        top_k=1,
+        max_output_tokens=2048,
+        timeout=60.0,
+        max_retries=0
+    ),
+    "llm_query": dict(
+        model="gemini-2.0-flash-exp",
+        temperature=0,  #deterministico
+        top_p=0.1,  #token più probabili
+        top_k=1,  #solo il migliore
+        max_output_tokens=1024,  #per json dovrebbe bastare
+        timeout=30.0,
+        max_retries=0
+    ),
+}
 
+# Backend dei client LLM ("gemini" = ChatGoogleGenerativeAI, "fake" = modello simulato offline,
+# vedi backend.utils.fake_llm: nessuna rete né chiave, per benchmark e test di carico)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+# Modello simulato. Distribuzioni nel formato "tipo:parametri": constant:v, uniform:min,max,
+# normal:media,dev, lognormal:mediana,sigma, exponential:media
+FAKE_LLM_LATENCY_MS = os.getenv("FAKE_LLM_LATENCY_MS", "lognormal:600,0.4")  # tempo al primo token
+FAKE_LLM_MS_PER_TOKEN = float(os.getenv("FAKE_LLM_MS_PER_TOKEN", "4"))  # generazione dei token in uscita
+FAKE_LLM_OUTPUT_TOKENS = os.getenv("FAKE_LLM_OUTPUT_TOKENS", "uniform:120,400")  # lunghezza delle risposte testuali
+# Probabilità che una chiamata fallisca con ResourceExhausted (429) e retry_delay suggerito
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_RETRY_DELAY_SECONDS = int(os.getenv("FAKE_LLM_RETRY_DELAY_SECONDS", "1"))
+# Seed per sequenze riproducibili di latenze, lunghezze ed errori (vuoto = casuale)
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED")
 
-llm_supervisor  = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=google_api_key,
-    temperature=0.3,  # creativo
-    top_p=0.5,  # varietà lessicale
-    top_k=20,  # maggiori opzioni (da vedere meglio)
-    max_output_tokens=2096,  #lunghezza risposta (forse anche meno)
-    timeout=60.0,
-    max_retries=0
-)
+_llm_clients = {}
+_llm_lock = threading.Lock()
 
-llm_correlation  = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=google_api_key,
-    temperature=0.3,  # creativo
-    top_p=0.5,  # varietà lessicale
-    top_k=20,  # maggiori opzioni (da vedere meglio)
-    max_output_tokens=5096,  #lunghezza risposta (forse anche meno)
-    timeout=60.0,
-    max_retries=0
-)
 
-llm_agents = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=google_api_key,
-    temperature=0,
-    top_p=0.1,
-    top_k=1,
-    max_output_tokens=2048,
-    timeout=60.0,
-    max_retries=0
-)
+def get_llm(name: str):
+    """Client LLM ``name`` (chiave di LLM_CONFIGS), creato al primo uso"""
+    with _llm_lock:
+        if name not in _llm_clients:
+            config = LLM_CONFIGS[name]
+            if LLM_BACKEND == "fake":
+                from backend.utils.fake_llm import FakeChatModel
 
-llm_query = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash-exp",
-    google_api_key=google_api_key,
-    temperature=0,  #deterministico
-    top_p=0.1,  #token più probabili
-    top_k=1,  #solo il migliore
-    max_output_tokens=1024,  #per json dovrebbe bastare
-    timeout=30.0,
-    max_retries=0
-)
+                _llm_clients[name] = FakeChatModel(model=config["model"], max_output_tokens=config.get("max_output_tokens"))
+            else:
+                # Import pesante (client gRPC di Gemini): pagato solo quando serve un client
+                from langchain_google_genai import ChatGoogleGenerativeAI
+
+                _llm_clients[name] = ChatGoogleGenerativeAI(google_api_key=google_api_key, **config)
+            logger.debug("Client %s creato (%s, backend %s)", name, config["model"], LLM_BACKEND)
+    return _llm_clients[name]
+
+
+def graph_llm_names() -> list[str]:
+    """
+    Client usati da build_graph(): gli stessi che il warmup crea in anticipo.
+    llm_graph_generator (gemini-2.5-pro) serve solo con CROSS_DOMAIN_CHART_LLM_FALLBACK.
+    """
+    names = ["llm_agents", "llm_supervisor", "llm_query", "llm_correlation"]
+    if CROSS_DOMAIN_CHART_LLM_FALLBACK:
+        names.append("llm_graph_generator")
+    return names
 
-llm_visualization = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash-exp",
-    google_api_key=google_api_key,
-    temperature=0.5,  # Leggermente creativo per intent detection
-    max_output_tokens=50000,
-    timeout=30.0,
-    max_retries=0
-)
+
+def __getattr__(name: str):
+    # PEP 562: llm_supervisor, llm_agents, ... vengono risolti qui al primo accesso
+    if name in LLM_CONFIGS:
+        return get_llm(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def invoke_with_retry(agent, messages, max_retries=3):
+    from backend.utils.tracing import retry_span
     retry_count = 0
 
     while retry_count <= max_retries:
@@ -96,13 +144,16 @@ def invoke_with_retry(agent, messages, max_retries=3):
                 retry_delay = int(match.group(1)) if match else 60
 
             if retry_count <= max_retries:
-                print(f"Quota exceeded. Waiting {retry_delay} seconds before retry {retry_count}/{max_retries}...")
-                time.sleep(retry_delay)
+                logger.warning("Quota exceeded. Waiting %s seconds before retry %d/%d...",
+                               retry_delay, retry_count, max_retries)
+                with retry_span(retry_count, max_retries, retry_delay, exc):
+                    time.sleep(retry_delay)
             else:
-                print(f"Max retries ({max_retries}) reached. Raising exception.")
+                logger.error("Max retries (%d) reached. Raising exception.", max_retries)
                 raise
 
 def invoke_with_structured_output(llm, router,messages, max_retries=3):
+    from backend.utils.tracing import retry_span
     retry_count = 0
 
     while retry_count <= max_retries:
@@ -123,17 +174,104 @@ def invoke_with_structured_output(llm, router,messages, max_retries=3):
                 retry_delay = int(match.group(1)) if match else 60
 
             if retry_count <= max_retries:
-                print(f"Quota exceeded. Waiting {retry_delay} seconds before retry {retry_count}/{max_retries}...")
-                time.sleep(retry_delay)
+                logger.warning("Quota exceeded. Waiting %s seconds before retry %d/%d...",
+                               retry_delay, retry_count, max_retries)
+                with retry_span(retry_count, max_retries, retry_delay, exc):
+                    time.sleep(retry_delay)
             else:
-                print(f"Max retries ({max_retries}) reached. Raising exception.")
+                logger.error("Max retries (%d) reached. Raising exception.", max_retries)
                 raise
 
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
-DATA_DIR = PROJECT_ROOT / "data"
+# Cartella dei CSV (sovrascrivibile, ad esempio per i benchmark su dati sintetici)
+DATA_DIR = Path(os.getenv("DATA_DIR", str(PROJECT_ROOT / "data")))
 
 
 SLEEP_DATA_PATH = DATA_DIR / "sonno_data.csv"
 KITCHEN_DATA_PATH = DATA_DIR / "cucina_data.csv"
-SENSOR_DATA_PATH = DATA_DIR / "sensor_data.csv"
\ No newline at end of file
+SENSOR_DATA_PATH = DATA_DIR / "sensor_data.csv"
+
+# Context caching lato provider per i prefissi statici dei prompt
+# ("gemini" = CachedContent di Gemini, "local" = stand-in in memoria per test/offline, valido solo
+# con LLM_BACKEND=fake, "off" = disattivato)
+CONTEXT_CACHE_BACKEND = os.getenv("CONTEXT_CACHE_BACKEND", "gemini")
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+CONTEXT_CACHE_REFRESH_MARGIN_SECONDS = int(os.getenv("CONTEXT_CACHE_REFRESH_MARGIN_SECONDS", "300"))
+# Gemini rifiuta cache sotto una soglia minima di token: sotto questa stima non si prova nemmeno
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+
+# Prefetch speculativo di dataset e risultati dei tool in parallelo al planner
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "1") == "1"
+
+# Tracing per richiesta (span di nodi, chiamate LLM e tool)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+# Numero di trace recenti consultabili da /traces/{trace_id}
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "50"))
+# Se impostata, ogni trace viene salvato anche su disco (JSON + Chrome trace)
+TRACE_DIR = os.getenv("TRACE_DIR")
+
+# Grafico cross-domain: composto in modo deterministico dai template di graph_templates.
+# Con 1 si torna al codice Plotly generato dall'LLM (llm_graph_generator) solo quando i
+# template non riescono a rappresentare i risultati
+CROSS_DOMAIN_CHART_LLM_FALLBACK = os.getenv("CROSS_DOMAIN_CHART_LLM_FALLBACK", "0") == "1"
+# Pool di processi che eseguono il codice Plotly del fallback (backend.utils.code_executor):
+# worker pre-riscaldati, limite di tempo e di memoria per esecuzione, riciclo dopo N esecuzioni
+CODE_EXECUTOR_POOL_SIZE = int(os.getenv("CODE_EXECUTOR_POOL_SIZE", "2"))
+CODE_EXECUTOR_TIMEOUT_SECONDS = float(os.getenv("CODE_EXECUTOR_TIMEOUT_SECONDS", "30"))
+CODE_EXECUTOR_MEMORY_MB = int(os.getenv("CODE_EXECUTOR_MEMORY_MB", "512"))
+CODE_EXECUTOR_MAX_TASKS = int(os.getenv("CODE_EXECUTOR_MAX_TASKS", "20"))
+
+# Memoria conversazionale: scambi utente/assistente recenti inviati per intero all'LLM;
+# i più vecchi vengono riassunti
+MEMORY_RECENT_EXCHANGES = int(os.getenv("MEMORY_RECENT_EXCHANGES", "4"))
+# Lunghezza massima di ciascun messaggio passato al riassunto (le risposte possono essere lunghe)
+MEMORY_SUMMARY_INPUT_CHARS = int(os.getenv("MEMORY_SUMMARY_INPUT_CHARS", "2000"))
+
+# Blob store delle figure Plotly ("fs" = file JSON, "sqlite" = database SQLite)
+GRAPH_STORE_BACKEND = os.getenv("GRAPH_STORE_BACKEND", "fs")
+GRAPH_STORE_PATH = os.getenv(
+    "GRAPH_STORE_PATH",
+    str(PROJECT_ROOT / "storage" / ("graphs.sqlite3" if GRAPH_STORE_BACKEND == "sqlite" else "graphs"))
+)
+
+# Compattazione del JSON delle figure prima del salvataggio (backend.utils.plotly_payload):
+# template di default sostituito dal nome, float arrotondati, interi come typed array
+PLOTLY_COMPACT_PAYLOAD = os.getenv("PLOTLY_COMPACT_PAYLOAD", "1") == "1"
+PLOTLY_FLOAT_DECIMALS = int(os.getenv("PLOTLY_FLOAT_DECIMALS", "3"))
+PLOTLY_TYPED_ARRAYS = os.getenv("PLOTLY_TYPED_ARRAYS", "1") == "1"
+# Serie temporali nei grafici (backend.utils.downsampling): punti massimi per traccia,
+# metodo di riduzione oltre il budget ("lttb" o "minmax") e punti oltre i quali la
+# traccia usa WebGL (scattergl)
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "1000"))
+CHART_DOWNSAMPLING = os.getenv("CHART_DOWNSAMPLING", "lttb")
+CHART_WEBGL_THRESHOLD = int(os.getenv("CHART_WEBGL_THRESHOLD", "500"))
+# Valori delle serie giornaliere dei risultati come typed array Plotly (float64 in base64)
+# invece che come lista di numeri (backend.utils.series)
+SERIES_TYPED_ARRAYS = os.getenv("SERIES_TYPED_ARRAYS", "0") == "1"
+# Serie giornaliere con più valori di questa soglia arrivano ai prompt LLM come riassunto
+# (statistiche, trend, estremi, anomalie, aggregati per periodo) invece che per intero
+LLM_SERIES_MAX_VALUES = int(os.getenv("LLM_SERIES_MAX_VALUES", "31"))
+# Risposta finale dei turni con un solo risultato non cross-domain: "llm" = agente del
+# correlation_analyzer (risponde alla domanda specifica e allo storico), "template" = testo
+# deterministico di backend.utils.answer_templates, lo stesso report per ogni domanda sul
+# risultato. Sovrascrivibile per richiesta (configurable["answer_synthesis"])
+ANSWER_SYNTHESIS_MODES = ("llm", "template")
+ANSWER_SYNTHESIS = os.getenv("ANSWER_SYNTHESIS", "llm")
+if ANSWER_SYNTHESIS not in ANSWER_SYNTHESIS_MODES:
+    raise ValueError(f"ANSWER_SYNTHESIS={ANSWER_SYNTHESIS!r} non valido, valori ammessi: {ANSWER_SYNTHESIS_MODES}")
+
+# Checkpointer del grafo ("sqlite" = persistente e condiviso tra worker, "memory" = InMemorySaver)
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", str(PROJECT_ROOT / "storage" / "checkpoints.sqlite3"))
+# Checkpoint del grafo principale conservati per ogni thread (basta l'ultimo per riprendere la conversazione)
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "10"))
+# I thread senza attività da più di questo intervallo vengono eliminati
+CHECKPOINT_THREAD_TTL_SECONDS = int(os.getenv("CHECKPOINT_THREAD_TTL_SECONDS", str(7 * 24 * 3600)))
+# Intervallo della compaction in background (0 = disattivata)
+CHECKPOINT_COMPACTION_INTERVAL_SECONDS = int(os.getenv("CHECKPOINT_COMPACTION_INTERVAL_SECONDS", "300"))
+# Serializer dei checkpoint ("fast" = msgpack con estensioni per i tipi dello state, "jsonplus" = default LangGraph)
+CHECKPOINT_SERIALIZER = os.getenv("CHECKPOINT_SERIALIZER", "fast")
+
+# Warmup in background all'avvio del server (client LLM, grafo, dataset, librerie dei grafici)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
@@ -1,10 +1,9 @@
-from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import StateGraph, START
 
-from backend.config.settings import llm_agents, llm_supervisor, llm_query, llm_visualization, llm_graph_generator, \
-    llm_correlation
+from backend.config import settings
 from backend.models.state import State
 from backend.nodes.conversational_router import create_conversational_router
+from backend.nodes.memory_node import create_memory_node, create_memory_summary_node
 from backend.nodes.graph_generator_node import create_graph_generator_agent, create_graph_generator_node
 from backend.nodes.kitchen_teams.kitchen_graph import build_kitchen_graph
 from backend.nodes.mobility_teams.mobility_graph import build_mobility_graph
@@ -12,6 +11,7 @@ from backend.nodes.sleep_teams.sleep_graph import build_sleep_graph
 from backend.nodes.supervisor import make_supervisor_node
 from backend.nodes.planner_node import create_planner_node
 from backend.nodes.correlation_analyzer_node import create_correlation_analyzer_node
+from backend.utils.checkpointer import get_checkpointer
 from backend.utils.grap_utilis import Assistant
 
 
@@ -25,12 +25,22 @@ def build_graph():
     - Teams (subgraphs): sleep_team, kitchen_team, mobility_team
     - Correlation Analyzer: sintetizza i risultati finali
     - Visualization Node: genera grafici Plotly dai dati strutturati  ← NUOVO
+    - Generator Node: grafico cross-domain composto dai template (LLM solo come fallback opzionale)
+
+    I client LLM vengono creati qui (al primo accesso a settings.llm_*), non all'import.
     """
+    llm_agents = settings.llm_agents
+    llm_supervisor = settings.llm_supervisor
+    llm_query = settings.llm_query
+    llm_correlation = settings.llm_correlation
 
     sleep_team_graph = build_sleep_graph(llm_agents, llm_supervisor)
     kitchen_team_graph = build_kitchen_graph(llm_agents, llm_supervisor)
     mobility_team_graph = build_mobility_graph(llm_agents, llm_supervisor)
-    graph_generetor_agent = create_graph_generator_agent(llm_graph_generator)
+    # Il grafico cross-domain usa i template: l'agente (e il client gemini-2.5-pro) serve solo come fallback
+    graph_generetor_agent = None
+    if settings.CROSS_DOMAIN_CHART_LLM_FALLBACK:
+        graph_generetor_agent = create_graph_generator_agent(settings.llm_graph_generator)
 
     planner = create_planner_node(llm_query)
     supervisor = make_supervisor_node(
@@ -43,6 +53,8 @@ def build_graph():
     builder = StateGraph(State)
 
     conversational_router = create_conversational_router(llm_supervisor)
+    memory = create_memory_node()
+    memory_summary = create_memory_summary_node(llm_supervisor)
 
 
     # nodi di coordinamento
@@ -51,6 +63,9 @@ def build_graph():
     builder.add_node("generator_node", graph_generetor_node)
     builder.add_node("correlation_analyzer", correlation_analyzer)
     builder.add_node("conversational_router",conversational_router)
+    builder.add_node("memory", memory)
+    # differito: il riassunto viene eseguito a fine turno, dopo la risposta
+    builder.add_node("memory_summary", memory_summary, defer=True)
 
     # subgraphs come nodi
     builder.add_node("sleep_team", sleep_team_graph)
@@ -63,8 +78,10 @@ def build_graph():
     builder.add_edge("mobility_team", "supervisor")
 
     builder.add_edge(START, "conversational_router")
+    # manutenzione della memoria in parallelo al router
+    builder.add_edge(START, "memory")
+    builder.add_edge(START, "memory_summary")
 
-    memory = InMemorySaver()
-    return builder.compile(checkpointer=memory)
+    return builder.compile(checkpointer=get_checkpointer())
 
 
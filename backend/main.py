@@ -1,9 +1,7 @@
 import uuid
-from backend.graph.builder import build_graph
+from backend.utils.warmup import get_graph
 import time
 
-graph = build_graph()
-
 
 def run_demo(question: str, max_iterations: int = 10):
     """
@@ -16,7 +14,7 @@ def run_demo(question: str, max_iterations: int = 10):
             "thread_id": thread_id,
         }
     }
-    result = graph.invoke(
+    result = get_graph().invoke(
         {"messages": [("user", question)]},
         config=config
     )
@@ -48,7 +46,7 @@ def run_demo_2():
             print("\nAssistant: ", end="", flush=True)
 
             final_message = None
-            for event in graph.stream(
+            for event in get_graph().stream(
                     {"messages": [("user", user_input)]},
                     config=config,
                     stream_mode="values"  # Importante!
@@ -1,5 +1,5 @@
 from typing_extensions import TypedDict
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Union
 
 
 class MetricStatistics(TypedDict):
@@ -79,11 +79,21 @@ class SleepQualityCorrelationResult(TypedDict):
     correlations: CorrelationData
 
 
+class DailySeries(TypedDict):
+    """
+    Serie giornaliera in forma colonnare: values[i] è il valore del giorno dates[i] (YYYY-MM-DD).
+    values è una lista di float oppure un typed array Plotly ({"dtype": "f8", "bdata": base64}).
+    Per leggerla usare backend.utils.series.
+    """
+    dates: List[str]
+    values: Union[List[float], Dict[str, str]]
+
+
 class DailyHeartRateResult(TypedDict):
     """Risultato del tool analyze_daily_heart_rate"""
     subject_id: int
     period: str
-    daily_avg_hr: Dict[str, float]
+    daily_avg_hr: DailySeries
 
 
 # --- KITCHEN DOMAIN ---
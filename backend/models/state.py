@@ -43,6 +43,14 @@ class GraphData(TypedDict):
     type: str
     plotly_json: dict[str, Any]
 
+
+class GraphRef(TypedDict):
+    """Riferimento a un grafico salvato nel blob store (backend.utils.graph_store)"""
+    id: str
+    title: str
+    type: str
+    blob_id: str
+
 class TeamTask(BaseModel):
     """Singolo task per un team specifico"""
     team: Literal["sleep_team", "kitchen_team", "mobility_team"] = Field(
@@ -90,4 +98,8 @@ class State(MessagesState):
     structured_responses: list[TeamResponse]
     execution_plan: ExecutionPlan
     completed_tasks: set[str]
-    graphs: Optional[list[GraphData]]
\ No newline at end of file
+    # Solo riferimenti: le figure Plotly sono nel blob store, fuori dai checkpoint
+    graphs: Optional[list[GraphRef]]
+    # Memoria conversazionale (vedi backend.utils.memory)
+    conversation_summary: Optional[str]
+    summarized_exchanges: int
\ No newline at end of file
@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 from langchain_core.messages import AIMessage
 
 from backend.models.state import State
+from backend.utils.memory import conversation_history
 
 def create_conversational_router(llm):
     """
@@ -35,7 +36,8 @@ def create_conversational_router(llm):
         """Route based on LLM decision."""
         messages = [{"role": "system", "content": system_message}]
 
-        for msg in state["messages"]:
+        # Solo riassunto + ultimi scambi utente/assistente, senza i messaggi interni
+        for msg in conversation_history(state):
             messages.append({
                 "role": "user" if msg.type == "human" else "assistant",
                 "content": msg.content
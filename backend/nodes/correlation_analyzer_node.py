@@ -1,13 +1,34 @@
+import logging
 from typing import Literal
 
 from langgraph.prebuilt import create_react_agent
 from langgraph.types import Command
 from langgraph.graph import END
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from google.api_core import exceptions
 
-from backend.config.settings import invoke_with_retry
+from backend.config.settings import ANSWER_SYNTHESIS, ANSWER_SYNTHESIS_MODES, invoke_with_retry
 from backend.models.state import State
+from backend.utils.answer_templates import template_answer
+from backend.utils.context_cache import cached_prompt_model
+from backend.utils.llm_format import estimate_tokens, format_agent_responses
+
+logger = logging.getLogger(__name__)
+
+
+def _single_result(state: State, agent_responses: list) -> dict | None:
+    """L'unico risultato del turno, se il turno non è cross-domain e ne ha prodotto uno solo senza errori"""
+    execution_plan = state.get("execution_plan")
+    if execution_plan and execution_plan.cross_domain:
+        return None
+    results = []
+    for agent_resp in agent_responses:
+        data = agent_resp.get("data")
+        results.extend(data.get("results", [data]) if isinstance(data, dict) else [data])
+    if len(results) != 1 or not isinstance(results[0], dict) or "error" in results[0]:
+        return None
+    return results[0]
 
 
 def create_correlation_analyzer_node(llm):
@@ -43,19 +64,18 @@ def create_correlation_analyzer_node(llm):
         "Menzione grafici (se presenti): Una sola riga finale\n"
     )
     agent = create_react_agent(
-        llm,
-        tools=[],
-        prompt=prompt
+        cached_prompt_model(llm, prompt),
+        tools=[]
     )
 
-    def correlation_analyzer_node(state: State) -> Command[Literal["__end__"]]:
+    def correlation_analyzer_node(state: State, config: RunnableConfig) -> Command[Literal["__end__"]]:
         """
         Riceve tutti i dati strutturati dagli agenti e genera
         una risposta finale completa, analizzando eventuali correlazioni.
+        Con un solo risultato non cross-domain e answer_synthesis="template" (opt-in) la risposta
+        viene dal template del tipo di risultato, senza chiamare l'LLM.
         """
-        print(f"\n{'=' * 60}")
-        print("CORRELATION ANALYZER - Synthesizing final answer")
-        print(f"{'=' * 60}\n")
+        logger.info("CORRELATION ANALYZER - Synthesizing final answer")
 
         team_responses = state.get("structured_responses", [])
         graphs = state.get("graphs", [])
@@ -79,15 +99,31 @@ def create_correlation_analyzer_node(llm):
         else:
             original_question = state.get("original_question", "Analisi dati")
 
-        print("ORIGINAL QUESTION: " + original_question)
+        logger.debug("Original question: %s", original_question)
 
         # Log dei grafici disponibili
         if graphs:
-            print(f"Available graphs ({len(graphs)}):")
+            logger.info("Available graphs: %d", len(graphs))
             for g in graphs:
-                print(f"   - {g['id']}: {g['title']}")
+                logger.debug("   - %s: %s", g['id'], g['title'])
         else:
-            print("No graphs generated")
+            logger.info("No graphs generated")
+
+        synthesis = (config.get("configurable") or {}).get("answer_synthesis") or ANSWER_SYNTHESIS
+        if synthesis not in ANSWER_SYNTHESIS_MODES:
+            logger.warning("answer_synthesis=%r non valido, uso %s", synthesis, ANSWER_SYNTHESIS)
+            synthesis = ANSWER_SYNTHESIS
+        single_result = _single_result(state, all_agent_responses) if synthesis == "template" else None
+        answer = template_answer(single_result, graphs) if single_result is not None else None
+        if answer is not None:
+            logger.info("Single result: template answer, LLM skipped")
+            return Command(
+                goto=END,
+                update={
+                    "messages": [AIMessage(content=answer, name="correlation_analyzer")],
+                    "next": "FINISH"
+                }
+            )
 
         # Costruisci il prompt per l'analisi
         analysis_prompt = (
@@ -95,8 +131,8 @@ def create_correlation_analyzer_node(llm):
             f"Dati strutturati ricevuti dagli agenti:\n"
         )
 
-        for resp in all_agent_responses:
-            analysis_prompt += f"\n{resp['agent_name']}:\n{resp['data']}\n"
+        # Risultati in forma compatta (tabelle e righe chiave=valore, numeri arrotondati)
+        analysis_prompt += f"\n{format_agent_responses(all_agent_responses)}\n"
 
         # Informa l'LLM se ci sono grafici disponibili
         if graphs:
@@ -114,19 +150,18 @@ def create_correlation_analyzer_node(llm):
 
 
 
+        logger.info("Synthesis prompt: ~%d token stimati", estimate_tokens(analysis_prompt))
+
         try:
             result = invoke_with_retry(agent, HumanMessage(content=analysis_prompt),3)
         except exceptions.ResourceExhausted as e:
-             print(f"retry fallita in {e} tentativi")
+             logger.error("Retry fallita dopo tutti i tentativi: %s", e)
 
 
         final_response = result['messages'][-1]
 
 
-        print(f"\nFINAL ANSWER:")
-        print(f"{'-' * 60}")
-        print(final_response)
-        print(f"{'-' * 60}\n")
+        logger.debug("Final answer: %s", final_response.content)
 
         return Command(
             goto=END,
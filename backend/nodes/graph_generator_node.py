@@ -1,60 +1,146 @@
+import logging
 from typing import Annotated, Literal
-import json
 from google.api_core import exceptions
 
-from langchain_experimental.utilities import PythonREPL
 from langchain_core.tools import tool
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 from langgraph.prebuilt import create_react_agent
 from langgraph.types import Command
 
 from backend.config.settings import invoke_with_retry
 from backend.models.state import State, GraphData
+from backend.utils.graph_store import store_graph
+from backend.utils.code_executor import get_executor_pool
+from backend.utils.context_cache import cached_prompt_model
+from backend.utils.cross_domain_charts import collect_domain_results, create_cross_domain_chart
+from backend.utils.graph_templates import create_no_data_placeholder
+from backend.utils.llm_format import format_result
 
-repl = PythonREPL()
+logger = logging.getLogger(__name__)
 
 
-@tool
+@tool(response_format="content_and_artifact")
 def python_repl_tool(
         code: Annotated[str, "The python code to execute to generate your chart."],
 ):
     """Use this to execute python code. If you want to see the output of a value,
     you should print it out with `print(...)`. This is visible to the user."""
-    try:
-        result = repl.run(code)
-    except BaseException as e:
-        return f"Failed to execute. Error: {repr(e)}"
-    result_str = f"Successfully executed:\n```python\n{code}\n```\nStdout: {result}"
+    # Processo isolato del pool: namespace nuovo, limiti di tempo e memoria, figura in JSON (artifact)
+    result = get_executor_pool().run(code)
+    if result["error"]:
+        return f"Failed to execute. Error: {result['error']}\nStdout: {result['stdout']}", None
+    result_str = f"Successfully executed:\n```python\n{code}\n```\nStdout: {result['stdout']}"
+    if result["figure"] is None:
+        result_str += "\n\nNo Plotly figure named `fig` was found: assign the chart to `fig`."
     return (
             result_str + "\n\nIf you have completed all tasks, respond with FINAL ANSWER."
-    )
+    ), result["figure"]
+
+
+GRAPH_GENERATOR_PROMPT = (
+    "You are a chart generation expert. You MUST use the python_repl_tool to create visualizations. "
+    "Create professional and informative visualizations based on the data provided. "
+    "\n\n"
+    "CRITICAL REQUIREMENTS:\n"
+    "- You MUST use ONLY Plotly for visualization (plotly.graph_objects or plotly.express)\n"
+    "- DO NOT use matplotlib, seaborn, or any other plotting library\n"
+    "- Save the output as an HTML file using fig.write_html('correlation_chart.html')\n"
+    "- Your code MUST start with imports like:\n"
+    "  from plotly.subplots import make_subplots\n"
+    "  import plotly.graph_objects as go\n"
+    "- DO NOT import matplotlib or plt\n"
+    "IMPORTANT: you must use the best combination of chart (DONT USE GAUGE CHART) to best represent the user's query"
+    "\n"
+    "Make sure charts are clear, well-labeled, and visually appealing. "
+    "IMPORTANT: You must call the python_repl_tool to execute the code that generates the chart. "
+    "After generating the chart, respond with FINAL ANSWER."
+)
+
 
 def create_graph_generator_agent(llm):
-    return create_react_agent(
-        llm,
-        [python_repl_tool],
-        prompt=(
-            "You are a chart generation expert. You MUST use the python_repl_tool to create visualizations. "
-            "Create professional and informative visualizations based on the data provided. "
-            "\n\n"
-            "CRITICAL REQUIREMENTS:\n"
-            "- You MUST use ONLY Plotly for visualization (plotly.graph_objects or plotly.express)\n"
-            "- DO NOT use matplotlib, seaborn, or any other plotting library\n"
-            "- Save the output as an HTML file using fig.write_html('correlation_chart.html')\n"
-            "- Your code MUST start with imports like:\n"
-            "  from plotly.subplots import make_subplots\n"
-            "  import plotly.graph_objects as go\n"
-            "- DO NOT import matplotlib or plt\n"
-            "IMPORTANT: you must use the best combination of chart (DONT USE GAUGE CHART) to best represent the user's query"
-            "\n"
-            "Make sure charts are clear, well-labeled, and visually appealing. "
-            "IMPORTANT: You must call the python_repl_tool to execute the code that generates the chart. "
-            "After generating the chart, respond with FINAL ANSWER."
-        ),
-    )
-
-
-def create_graph_generator_node(graph_generator_agent):
+    tools = [python_repl_tool]
+    return create_react_agent(cached_prompt_model(llm, GRAPH_GENERATOR_PROMPT, tools), tools=tools)
+
+
+def create_graph_generator_node(graph_generator_agent=None):
+    """
+    Nodo del grafico cross-domain. Il grafico viene composto dai template
+    (backend.utils.cross_domain_charts); graph_generator_agent, se presente, è il fallback
+    opzionale che fa scrivere il codice Plotly all'LLM quando i template non bastano.
+    """
+
+    def _llm_chart(state: State, original_query: str, structured_responses) -> tuple[GraphData, list]:
+        sleep_data = None
+        kitchen_data = None
+        mobility_data = None
+        for team in structured_responses:
+            for response in team["structured_responses"]:
+                # Risultati in forma compatta (tabelle e righe chiave=valore, numeri arrotondati)
+                if team["team_name"] == "sleep_team":
+                    sleep_data = format_result(response["data"])
+                elif team["team_name"] == "kitchen_team":
+                    kitchen_data = format_result(response["data"])
+                elif team["team_name"] == "mobility_team":
+                    mobility_data = format_result(response["data"])
+
+
+        data_summary = f"""
+            Original Query: {original_query} 
+            SLEEP Data: {sleep_data} 
+            KITCHEN Data: {kitchen_data} 
+            MOBILITY Data: {mobility_data} 
+            
+            Use plotly.graph_objects or plotly.express and create a comprehensive visualization. Make sure to:
+            - Import plotly.graph_objects as go and/or import plotly.express as px
+            - Import plotly.subplots (from plotly.subplots import make_subplots)
+            - Create a figure with subplots (e.g., fig = make_subplots(rows=2, cols=2, ...))
+            - Add proper titles and labels
+            - Configure layout with fig.update_layout()
+            - Save the figure as 'correlation_chart.html' using fig.write_html('correlation_chart.html')
+            - Display with fig.show()
+            
+            IMPORTANT: you must use the best combination of chart (DONT USE GAUGE CHART) to best represent the Original Query
+            
+            Start by calling the python_repl_tool with the complete code to generate the interactive chart.
+        """
+
+        messages = state["messages"] + [HumanMessage(content=data_summary, name="graph_generator_request")]
+
+        output_messages = []
+        try:
+            result = invoke_with_retry(graph_generator_agent, messages)
+            output_messages = result["messages"]
+        except exceptions.ResourceExhausted as e:
+            logger.error("Failed after all retries: %s", e)
+
+
+        # La figura arriva come artifact dell'ultima esecuzione riuscita di python_repl_tool
+        toDict = {"error": "Figure not found in executor output"}
+        for msg in reversed(output_messages):
+            if isinstance(msg, ToolMessage) and msg.name == python_repl_tool.name and msg.artifact:
+                toDict = msg.artifact
+                break
+        # La figura va nel blob store, non nei messaggi salvati nei checkpoint
+        for msg in output_messages:
+            if isinstance(msg, ToolMessage):
+                msg.artifact = None
+
+        if output_messages:
+            output_messages[-1] = AIMessage(
+                content=output_messages[-1].content,
+                name="graph_generator"
+            )
+
+        logger.debug("ToDictGraph %s", toDict)
+
+        graph_data = GraphData(
+            id="correlation_chart",
+            title=f"Correlation Chart: {original_query}",
+            type="plotly",
+            plotly_json=toDict
+        )
+        return graph_data, output_messages
+
     def _node_(state: State) -> Command[Literal["correlation_analyzer"]]:
         execution_plan = state.get("execution_plan")
         if execution_plan and execution_plan.cross_domain:
@@ -66,77 +152,31 @@ def create_graph_generator_node(graph_generator_agent):
                 original_query_parts.append(f"{task.team}: {task.instruction}")
 
             original_query = " | ".join(original_query_parts)
+            title = f"Correlation Chart: {original_query}"
 
-            sleep_data = None
-            kitchen_data = None
-            mobility_data = None
-            for team in structured_responses:
-                for response in team["structured_responses"]:
-                    if team["team_name"] == "sleep_team":
-                        sleep_data = response["data"]
-                    elif team["team_name"] == "kitchen_team":
-                        kitchen_data = response["data"]
-                    elif team["team_name"] == "mobility_team":
-                        mobility_data = response["data"]
-
-
-            data_summary = f"""
-                Original Query: {original_query} 
-                SLEEP Data: {sleep_data} 
-                KITCHEN Data: {kitchen_data} 
-                MOBILITY Data: {mobility_data} 
-                
-                Use plotly.graph_objects or plotly.express and create a comprehensive visualization. Make sure to:
-                - Import plotly.graph_objects as go and/or import plotly.express as px
-                - Import plotly.subplots (from plotly.subplots import make_subplots)
-                - Create a figure with subplots (e.g., fig = make_subplots(rows=2, cols=2, ...))
-                - Add proper titles and labels
-                - Configure layout with fig.update_layout()
-                - Save the figure as 'correlation_chart.html' using fig.write_html('correlation_chart.html')
-                - Display with fig.show()
-                
-                IMPORTANT: you must use the best combination of chart (DONT USE GAUGE CHART) to best represent the Original Query
-                
-                Start by calling the python_repl_tool with the complete code to generate the interactive chart.
-            """
-
-            messages = state["messages"] + [HumanMessage(content=data_summary)]
-
-            try:
-                result = invoke_with_retry(graph_generator_agent, messages)
-            except exceptions.ResourceExhausted as e:
-                print(f"Failed after all retries: {e}")
-
-
-            toDict = {}
             try:
-                # Accedi alla figura creata nel namespace del REPL
-                fig = repl.locals.get('fig')
-                if fig is not None:
-                    toDict = fig.to_dict()
-                else:
-                    toDict = {"error": "Figure not found in REPL namespace"}
+                graph_data = create_cross_domain_chart(collect_domain_results(structured_responses), title)
             except Exception as e:
-                toDict = {"error": f"Failed to convert figure: {str(e)}"}
+                logger.exception("Cross-domain chart template failed: %s", e)
+                graph_data = None
 
-            output_messages = result["messages"]
-            if output_messages:
-                output_messages[-1] = AIMessage(
-                    content=output_messages[-1].content,
+            if graph_data is not None:
+                output_messages = [AIMessage(
+                    content=f"Grafico di correlazione generato ({len(graph_data['plotly_json']['data'])} tracce).",
                     name="graph_generator"
-                )
-
-            print("ToDictGraph", toDict)
+                )]
+            elif graph_generator_agent is not None:
+                logger.info("No chart template applies, falling back to LLM code generation")
+                graph_data, output_messages = _llm_chart(state, original_query, structured_responses)
+            else:
+                logger.warning("No chart template applies to the collected results")
+                graph_data = create_no_data_placeholder(title)
+                graph_data["id"] = "correlation_chart"
+                output_messages = [AIMessage(content="Grafico di correlazione non disponibile.", name="graph_generator")]
 
-            graph_data = GraphData(
-                id="correlation_chart",
-                title=f"Correlation Chart: {original_query}",
-                type="plotly",
-                plotly_json=toDict
-            )
             return Command(
                 update={
-                    "graphs": [graph_data],
+                    "graphs": [store_graph(graph_data)],
                     "messages": output_messages,
                 },
                 goto="correlation_analyzer"
@@ -146,4 +186,4 @@ def create_graph_generator_node(graph_generator_agent):
             goto="correlation_analyzer",
         )
 
-    return _node_
\ No newline at end of file
+    return _node_
@@ -1,4 +1,4 @@
-import json
+import logging
 from typing import Literal
 from google.api_core import exceptions
 from langgraph.prebuilt import create_react_agent
@@ -14,6 +14,10 @@ from backend.tools.kitchen_tools import (
     analyze_kitchen_usage_pattern,
     analyze_kitchen_temperature
 )
+from backend.tools.tool_output import tool_message_result
+from backend.utils.context_cache import cached_prompt_model
+
+logger = logging.getLogger(__name__)
 
 
 def create_analyze_kitchen_agent(llm):
@@ -35,7 +39,7 @@ def create_analyze_kitchen_agent(llm):
         "Always extract subject_id and period from the user's request.\n"
     )
 
-    return create_react_agent(llm, tools=tools, prompt=system_message)
+    return create_react_agent(cached_prompt_model(llm, system_message, tools), tools=tools)
 
 
 def create_analyze_kitchen_node(analyze_kitchen_agent):
@@ -52,36 +56,25 @@ def create_analyze_kitchen_node(analyze_kitchen_agent):
                 task = msg.content.replace("[TASK]: ", "")
                 break
 
-        print(f"DEBUG - Kitchen agent received task: '{task}'")
+        logger.debug("Kitchen agent received task: '%s'", task)
         message = task or "Analizza l'attività di cucina del soggetto richiesto."
 
         try:
             result = invoke_with_retry(analyze_kitchen_agent, [HumanMessage(content=message)], 3)
         except exceptions.ResourceExhausted as e:
-            print(f"Failed after all retries: {e}")
+            logger.error("Failed after all retries: %s", e)
 
 
 
-        print("result " + str(result))
+        logger.debug("Agent result: %s", result)
 
         # Raccoglie TUTTI i risultati dai ToolMessage
         all_results = []
 
         for msg in result["messages"]:
             if isinstance(msg, ToolMessage):
-                # Parse del contenuto
-                if isinstance(msg.content, dict):
-                    raw_data = msg.content
-                elif isinstance(msg.content, str):
-                    try:
-                        raw_data = json.loads(msg.content)
-                    except json.JSONDecodeError:
-                        raw_data = {"error": "JSON parsing failed"}
-                else:
-                    raw_data = {"error": f"Formato risposta non valido: {type(msg.content)}"}
-
-                # Aggiungi il risultato alla lista
-                all_results.append(raw_data)
+                # Risultato completo dall'artifact (il content è solo il riepilogo per l'LLM)
+                all_results.append(tool_message_result(msg))
 
         # Se non ci sono risultati, genera errore
         if not all_results:
@@ -103,7 +96,7 @@ def create_analyze_kitchen_node(analyze_kitchen_agent):
             "data": agent_data
         }
 
-        print(f"DEBUG - Kitchen agent response: {len(all_results)} result(s) collected")
+        logger.info("Kitchen agent response: %d result(s) collected", len(all_results))
 
         # Aggiorna state
         current_responses = state.get("structured_responses", [])
@@ -1,3 +1,4 @@
+import logging
 from google.api_core import exceptions
 from typing import Literal, TypedDict
 from langchain_core.language_models.chat_models import BaseChatModel
@@ -8,6 +9,8 @@ from langchain_core.messages import AIMessage
 from backend.config.settings import invoke_with_structured_output
 from backend.models.state import State
 
+logger = logging.getLogger(__name__)
+
 
 def make_supervisor_kitchen(llm: BaseChatModel, members: list[str]):
     """
@@ -73,13 +76,10 @@ def make_supervisor_kitchen(llm: BaseChatModel, members: list[str]):
             completed_agents.add(resp["agent_name"])
 
 
-        print(f"\n{'=' * 60}")
-        print("KITCHEN SUPERVISOR STATUS:")
-        print(f"Original question: {original_question}")
-        print(f"Cross-Domain Mode: {cross_domain}")
-        print(f"Completed tasks: {completed_tasks}")
-        print(f"Completed agents: {completed_agents}")
-        print(f"{'=' * 60}\n")
+        logger.info("Kitchen supervisor: cross_domain=%s, completed agents=%s",
+                    cross_domain, sorted(completed_agents))
+        logger.debug("Original question: %s", original_question)
+        logger.debug("Completed tasks: %s", completed_tasks)
 
         # Prepara il messaggio per l'LLM con context
         context_message = (
@@ -107,14 +107,13 @@ def make_supervisor_kitchen(llm: BaseChatModel, members: list[str]):
         try:
             response = invoke_with_structured_output(llm, Router, messages, 3)
         except exceptions.ResourceExhausted as e:
-            print(f"Failed after all retries: {e}")
+            logger.error("Failed after all retries: %s", e)
         goto = response["next"]
 
         if goto == "FINISH":
             goto = END
 
-        print(f"Kitchen supervisor decision: {goto}")
-        print(f"{'=' * 60}\n")
+        logger.info("Kitchen supervisor decision: %s", goto)
 
         # Messaggio di tracking
         if goto == "kitchen_visualization_node":
@@ -0,0 +1,56 @@
+import logging
+
+from langchain_core.messages import HumanMessage
+
+from backend.models.state import State
+from backend.utils.memory import exchanges_to_fold, prune_messages, summary_prompt
+
+logger = logging.getLogger(__name__)
+
+
+def create_memory_node():
+    """
+    Nodo di manutenzione della memoria conversazionale, eseguito all'inizio di ogni turno
+    in parallelo al conversational_router: rimuove dallo state i messaggi interni dei
+    turni conclusi ([TASK], tracking dei team, completamento dei nodi, transcript dei tool).
+    Non chiama l'LLM, quindi non ritarda il router e il planner.
+    """
+
+    def memory_node(state: State) -> dict:
+        removals = prune_messages(state["messages"])
+        logger.info("Memory: %d messaggi interni rimossi", len(removals))
+        return {"messages": removals} if removals else {}
+
+    return memory_node
+
+
+def create_memory_summary_node(llm):
+    """
+    Nodo che riassume gli scambi che eccedono gli ultimi MEMORY_RECENT_EXCHANGES,
+    aggiornando conversation_summary. Va registrato con defer=True: parte all'inizio del
+    turno ma viene eseguito solo quando tutti gli altri nodi sono conclusi, cioè dopo la
+    risposta, così la chiamata LLM del riassunto non è sul percorso di router e planner.
+
+    Gli scambi riassunti qui vengono esclusi dallo storico a partire dal turno successivo.
+    """
+
+    def memory_summary_node(state: State) -> dict:
+        to_fold = exchanges_to_fold(state)
+        if not to_fold:
+            return {}
+
+        previous_summary = state.get("conversation_summary")
+        try:
+            response = llm.invoke([HumanMessage(content=summary_prompt(previous_summary, to_fold))])
+        except Exception as e:
+            # Gli scambi restano nello storico e verranno riassunti al prossimo turno
+            logger.warning("Riassunto della conversazione non aggiornato: %s", e)
+            return {}
+
+        logger.info("Memory: %d scambi riassunti", len(to_fold))
+        return {
+            "conversation_summary": response.content,
+            "summarized_exchanges": state.get("summarized_exchanges", 0) + len(to_fold),
+        }
+
+    return memory_summary_node
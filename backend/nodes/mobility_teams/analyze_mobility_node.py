@@ -1,4 +1,4 @@
-import json
+import logging
 from typing import Literal
 from google.api_core import exceptions
 from langgraph.prebuilt import create_react_agent
@@ -10,6 +10,10 @@ from langgraph.types import Command
 from langchain_core.messages import HumanMessage, ToolMessage
 
 from backend.tools.mobility_tools import analyze_mobility_patterns
+from backend.tools.tool_output import tool_message_result
+from backend.utils.context_cache import cached_prompt_model
+
+logger = logging.getLogger(__name__)
 
 
 def create_analyze_mobility_agent(llm):
@@ -42,7 +46,7 @@ def create_analyze_mobility_agent(llm):
         "→ Call analyze_mobility_patterns with subject_id=1\n"
     )
 
-    return create_react_agent(llm, tools=tools, prompt=system_message)
+    return create_react_agent(cached_prompt_model(llm, system_message, tools), tools=tools)
 
 
 def create_analyze_mobility_node(analyze_mobility_agent):
@@ -59,36 +63,24 @@ def create_analyze_mobility_node(analyze_mobility_agent):
                 task = msg.content.replace("[TASK]: ", "")
                 break
 
-        print(f"DEBUG - Mobility agent received task: '{task}'")
+        logger.debug("Mobility agent received task: '%s'", task)
         message = task or "Analizza la mobilità del soggetto richiesto."
 
         # Invoca l'agente
         try:
             result = invoke_with_retry(analyze_mobility_agent, [HumanMessage(content=message)])
         except exceptions.ResourceExhausted as e:
-            print(f"Failed after all retries: {e}")
+            logger.error("Failed after all retries: %s", e)
 
-        print("CHIAMATA LLM")
-        print("result " + str(result))
+        logger.debug("Agent result: %s", result)
 
         # Raccoglie TUTTI i risultati dai ToolMessage
         all_results = []
 
         for msg in result["messages"]:
             if isinstance(msg, ToolMessage):
-                # Parse del contenuto
-                if isinstance(msg.content, dict):
-                    raw_data = msg.content
-                elif isinstance(msg.content, str):
-                    try:
-                        raw_data = json.loads(msg.content)
-                    except json.JSONDecodeError:
-                        raw_data = {"error": "JSON parsing failed"}
-                else:
-                    raw_data = {"error": f"Formato risposta non valido: {type(msg.content)}"}
-
-                # Aggiungi il risultato alla lista
-                all_results.append(raw_data)
+                # Risultato completo dall'artifact (il content è solo il riepilogo per l'LLM)
+                all_results.append(tool_message_result(msg))
 
         # Se non ci sono risultati, genera errore
         if not all_results:
@@ -110,7 +102,7 @@ def create_analyze_mobility_node(analyze_mobility_agent):
             "data": agent_data
         }
 
-        print(f"DEBUG - Mobility agent response: {len(all_results)} result(s) collected")
+        logger.info("Mobility agent response: %d result(s) collected", len(all_results))
 
         # Aggiorna state
         current_responses = state.get("structured_responses", [])
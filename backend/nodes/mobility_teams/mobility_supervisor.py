@@ -1,3 +1,4 @@
+import logging
 from typing import Literal, TypedDict
 from langchain_core.language_models.chat_models import BaseChatModel
 from langgraph.types import Command
@@ -8,6 +9,8 @@ from google.api_core import exceptions
 from backend.config.settings import invoke_with_structured_output
 from backend.models.state import State
 
+logger = logging.getLogger(__name__)
+
 
 def make_supervisor_mobility(llm: BaseChatModel, members: list[str]):
     """
@@ -65,13 +68,10 @@ def make_supervisor_mobility(llm: BaseChatModel, members: list[str]):
         for resp in mobility_team_responses:
             completed_agents.add(resp["agent_name"])
 
-        print(f"\n{'=' * 60}")
-        print("MOBILITY SUPERVISOR STATUS:")
-        print(f"Original question: {original_question}")
-        print(f"Cross-Domain Mode: {cross_domain}")
-        print(f"Completed tasks: {completed_tasks}")
-        print(f"Completed agents: {completed_agents}")
-        print(f"{'=' * 60}\n")
+        logger.info("Mobility supervisor: cross_domain=%s, completed agents=%s",
+                    cross_domain, sorted(completed_agents))
+        logger.debug("Original question: %s", original_question)
+        logger.debug("Completed tasks: %s", completed_tasks)
 
         # Prepara il messaggio per l'LLM con context
         context_message = (
@@ -100,21 +100,19 @@ def make_supervisor_mobility(llm: BaseChatModel, members: list[str]):
         try:
             response = invoke_with_structured_output(llm, Router, messages, 3)
         except exceptions.ResourceExhausted as e:
-            print(f"Failed after all retries: {e}")
+            logger.error("Failed after all retries: %s", e)
 
-        print("CHIAMATA LLM - MOBILITY SUPERVISOR")
         goto = response["next"]
 
         # multi dominio e richiede la mobility_visualization_node allora andiamo su finish
         if cross_domain and goto == "mobility_visualization_node":
-            print("Cross-domain mode active, forcing skip of visualization → FINISH")
+            logger.warning("Cross-domain mode active, forcing skip of visualization → FINISH")
             goto = "FINISH"
 
         if goto == "FINISH":
             goto = END
 
-        print(f"Mobility supervisor decision: {goto}")
-        print(f"{'=' * 60}\n")
+        logger.info("Mobility supervisor decision: %s", goto)
 
         # Messaggio di tracking
         if goto == "mobility_visualization_node":
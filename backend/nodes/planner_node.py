@@ -1,13 +1,20 @@
+import logging
 import time
 from time import sleep
 from typing import Literal
 from langgraph.types import Command
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
 from backend.models.state import State, ExecutionPlan
+from backend.config.settings import SPECULATIVE_PREFETCH
+from backend.utils.context_cache import lookup_cached_prefix
+from backend.utils.memory import conversation_history
+from backend.utils.prefetch import start_speculative_prefetch
+
+logger = logging.getLogger(__name__)
 
 
 def create_planner_node(llm):
@@ -18,9 +25,8 @@ def create_planner_node(llm):
     # Parser Pydantic per output strutturato
     parser = PydanticOutputParser(pydantic_object=ExecutionPlan)
 
-    # Template del prompt con format instructions
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """Sei un esperto nell'analisi di domande sulle attività quotidiane di soggetti monitorati.
+    # System prompt con format instructions: è statico, viene formattato una sola volta
+    system_template = SystemMessagePromptTemplate.from_template("""Sei un esperto nell'analisi di domande sulle attività quotidiane di soggetti monitorati.
 
 Analizza la domanda dell'utente e crea un piano di esecuzione che specifichi:
 
@@ -116,7 +122,18 @@ Piano:
     {{"team": "kitchen_team", "instruction": "Analizza come cucina il soggetto 5 negli ultimi 30 giorni"}}
   ]
 
-{format_instructions}"""),
+{format_instructions}""")
+    system_prompt = system_template.format(
+        format_instructions=parser.get_format_instructions()
+    ).content
+
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=system_prompt),
+        MessagesPlaceholder(variable_name="messages"),
+    ])
+
+    # Variante con prefisso in context cache: il system prompt non viene reinviato
+    history_prompt = ChatPromptTemplate.from_messages([
         MessagesPlaceholder(variable_name="messages"),
     ])
 
@@ -132,28 +149,44 @@ Piano:
         Assegna i task ai team appropriati in base al dominio della query.
         """
         # Prendi la domanda originale
-        print(f"{'=' * 60}\n")
+        question = next(
+            (msg.content for msg in reversed(state["messages"]) if msg.type == "human" and not msg.name),
+            None
+        )
 
-        # Esegui la planning chain
-        plan: ExecutionPlan = planning_chain.invoke({
-            "messages":state["messages"],
-            "format_instructions": parser.get_format_instructions(),
-        })
-        print("CHIAMATA LLM")
+        # Mentre il planner ragiona, carica in parallelo i dati più probabili
+        prefetch = None
+        if SPECULATIVE_PREFETCH and isinstance(question, str):
+            prefetch = start_speculative_prefetch(question)
+
+        # Esegui la planning chain, referenziando il system prompt in cache se disponibile
+        cache_name = lookup_cached_prefix(llm, system_prompt)
+        if cache_name:
+            chain = history_prompt | llm.bind(cached_content=cache_name) | parser
+        else:
+            chain = planning_chain
+
+        try:
+            plan: ExecutionPlan = chain.invoke({
+                "messages": conversation_history(state),
+            })
+        except BaseException:
+            # Senza piano i risultati speculativi non sono confermati da nessuna richiesta
+            if prefetch:
+                prefetch.discard()
+            raise
+
+        if prefetch:
+            prefetch.reconcile(plan)
 
         unique_teams = set(task.team for task in plan.tasks)
         if len(unique_teams) > 1:
             plan.cross_domain=True
 
-        print(f"EXECUTION PLAN:")
-        print(f"  Subject ID: {plan.subject_id}")
-        print(f"  Period: {plan.period}")
-        print(f"  Cross-Domain: {'YES' if plan.cross_domain else 'NO'}")
-        print(f"  Tasks ({len(plan.tasks)}):")
+        logger.info("Execution plan: subject=%s, period=%s, cross_domain=%s, %d task(s)",
+                    plan.subject_id, plan.period, plan.cross_domain, len(plan.tasks))
         for i, task in enumerate(plan.tasks, 1):
-            print(f"    {i}. [{task.team}]")
-            print(f"       {task.instruction}")
-        print(f"{'=' * 60}\n")
+            logger.info("  %d. [%s] %s", i, task.team, task.instruction)
 
         plan_summary = (
             f"EXECUTION PLAN:\n"
@@ -167,7 +200,7 @@ Piano:
         return Command(
             goto="supervisor",
             update={
-                "messages": [AIMessage(content=plan_summary)],
+                "messages": [AIMessage(content=plan_summary, name="planner")],
                 "execution_plan": plan,
                 "completed_tasks": set(),
                 "structured_responses": [],
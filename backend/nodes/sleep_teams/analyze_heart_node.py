@@ -1,4 +1,4 @@
-import json
+import logging
 from typing import Literal
 
 from langgraph.prebuilt import create_react_agent
@@ -9,6 +9,10 @@ from langgraph.types import Command
 from langchain_core.messages import HumanMessage, ToolMessage
 
 from backend.tools.sleep_tools import analyze_daily_heart_rate
+from backend.tools.tool_output import tool_message_result
+from backend.utils.context_cache import cached_prompt_model
+
+logger = logging.getLogger(__name__)
 
 
 def create_analyze_heart_agent(llm):
@@ -18,7 +22,7 @@ def create_analyze_heart_agent(llm):
         "You MUST use the analyze_daily_heart_rate tool to retrieve data. "
         "Always call the tool with the subject_id and period from the user's request."
     )
-    return create_react_agent(llm, tools=tools, prompt=system_message)
+    return create_react_agent(cached_prompt_model(llm, system_message, tools), tools=tools)
 
 
 def create_analyze_heart_node(analyze_heart_agent):
@@ -30,32 +34,20 @@ def create_analyze_heart_node(analyze_heart_agent):
                 task = msg.content.replace("[TASK]: ", "")
                 break
 
-        print(f"DEBUG - Heart rate agent received task: '{task}'")
+        logger.debug("Heart rate agent received task: '%s'", task)
         message = task or "Analizza la frequenza cardiaca del soggetto richiesto."
 
         # Invoca agent con focused_state
         focused_state = {"messages": [HumanMessage(content=message)]}
         result = analyze_heart_agent.invoke(focused_state)
-        print("result " + str(result))
+        logger.debug("Agent result: %s", result)
 
         # Estrai dati strutturati
         agent_data: DailyHeartRateResult | ErrorResult | None = None
         for msg in result["messages"]:
             if isinstance(msg, ToolMessage):
-                if isinstance(msg.content, dict):
-                    raw_data = msg.content
-                elif isinstance(msg.content, str):
-                    try:
-                        raw_data = json.loads(msg.content)
-                    except json.JSONDecodeError:
-                        raw_data = {"error": "JSON parsing failed"}
-                else:
-                    raw_data = {"error": f"Formato risposta non valido: {type(msg.content)}"}
-
-                if "error" in raw_data:
-                    agent_data = raw_data
-                else:
-                    agent_data = raw_data
+                # Risultato completo dall'artifact (il content è solo il riepilogo per l'LLM)
+                agent_data = tool_message_result(msg)
                 break
 
         if not agent_data:
@@ -68,7 +60,7 @@ def create_analyze_heart_node(analyze_heart_agent):
             "data": agent_data
         }
 
-        print(f"DEBUG - Heart rate agent response type: {type(agent_response['data'])}")
+        logger.debug("Heart rate agent response type: %s", type(agent_response['data']))
 
         # Recupera structured_responses esistenti
         current_responses = state.get("structured_responses", [])
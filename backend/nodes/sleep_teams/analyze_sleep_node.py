@@ -1,4 +1,4 @@
-import json
+import logging
 from google.api_core import exceptions
 from typing import Literal
 
@@ -19,6 +19,10 @@ from backend.tools.sleep_tools import (
     analyze_sleep_distribution,
     analyze_sleep_quality_correlation
 )
+from backend.tools.tool_output import tool_message_result
+from backend.utils.context_cache import cached_prompt_model
+
+logger = logging.getLogger(__name__)
 
 
 def create_analyze_sleep_agent(llm):
@@ -72,7 +76,7 @@ def create_analyze_sleep_agent(llm):
         "→ Call only analyze_sleep_quality_correlation with subject_id=3\n"
     )
 
-    return create_react_agent(llm, tools=tools, prompt=system_message)
+    return create_react_agent(cached_prompt_model(llm, system_message, tools), tools=tools)
 
 
 def create_analyze_sleep_node(analyze_sleep_agent):
@@ -89,36 +93,24 @@ def create_analyze_sleep_node(analyze_sleep_agent):
                 task = msg.content.replace("[TASK]: ", "")
                 break
 
-        print(f"DEBUG - Sleep agent received task: '{task}'")
+        logger.debug("Sleep agent received task: '%s'", task)
         message = task or "Analizza il sonno del soggetto richiesto."
 
 
         try:
             result = invoke_with_retry(analyze_sleep_agent, [HumanMessage(content=message)])
         except exceptions.ResourceExhausted as e:
-            print(f"Failed after all retries: {e}")
+            logger.error("Failed after all retries: %s", e)
 
-        print("CHIAMTA LLM")
-        print("result " + str(result))
+        logger.debug("Agent result: %s", result)
 
         # Raccoglie TUTTI i risultati dai ToolMessage
         all_results = []
 
         for msg in result["messages"]:
             if isinstance(msg, ToolMessage):
-                # Parse del contenuto
-                if isinstance(msg.content, dict):
-                    raw_data = msg.content
-                elif isinstance(msg.content, str):
-                    try:
-                        raw_data = json.loads(msg.content)
-                    except json.JSONDecodeError:
-                        raw_data = {"error": "JSON parsing failed"}
-                else:
-                    raw_data = {"error": f"Formato risposta non valido: {type(msg.content)}"}
-
-                # Aggiungi il risultato alla lista
-                all_results.append(raw_data)
+                # Risultato completo dall'artifact (il content è solo il riepilogo per l'LLM)
+                all_results.append(tool_message_result(msg))
 
         # Se non ci sono risultati, genera errore
         if not all_results:
@@ -140,7 +132,7 @@ def create_analyze_sleep_node(analyze_sleep_agent):
             "data": agent_data
         }
 
-        print(f"DEBUG - Sleep agent response: {len(all_results)} result(s) collected")
+        logger.info("Sleep agent response: %d result(s) collected", len(all_results))
 
         # Aggiorna state
         current_responses = state.get("structured_responses", [])
@@ -1,3 +1,4 @@
+import logging
 import time
 from google.api_core import exceptions
 from typing import Literal, TypedDict
@@ -10,6 +11,8 @@ from langchain_core.messages import HumanMessage, AIMessage
 from backend.config.settings import  invoke_with_structured_output
 from backend.models.state import State
 
+logger = logging.getLogger(__name__)
+
 
 def make_supervisor_sleep(llm: BaseChatModel, members: list[str]):
     """
@@ -72,13 +75,10 @@ def make_supervisor_sleep(llm: BaseChatModel, members: list[str]):
 
 
 
-        print(f"\n{'=' * 60}")
-        print("SLEEP SUPERVISOR STATUS:")
-        print(f"Original question: {original_question}")
-        print(f"Cross-Domain Mode: {cross_domain}")
-        print(f"Completed tasks: {completed_tasks}")
-        print(f"Completed agents: {completed_agents}")
-        print(f"{'=' * 60}\n")
+        logger.info("Sleep supervisor: cross_domain=%s, completed agents=%s",
+                    cross_domain, sorted(completed_agents))
+        logger.debug("Original question: %s", original_question)
+        logger.debug("Completed tasks: %s", completed_tasks)
 
         # Prepara il messaggio per l'LLM con context
         context_message = (
@@ -109,15 +109,14 @@ def make_supervisor_sleep(llm: BaseChatModel, members: list[str]):
         try:
             response = invoke_with_structured_output(llm, Router, messages, 3 )
         except exceptions.ResourceExhausted as e:
-            print(f"Failed after all retries: {e}")
+            logger.error("Failed after all retries: %s", e)
 
-        print("CHIAMTA LLM - SLEEP SUPERVISOR")
         goto = response["next"]
 
 
         # multi dominio e richiede la sleep_visualization allora andiamo su finish
         if cross_domain and goto == "sleep_visualization":
-            print("Cross-domain mode active, forcing skip of visualization → FINISH")
+            logger.warning("Cross-domain mode active, forcing skip of visualization → FINISH")
             goto = "FINISH"
 
 
@@ -125,8 +124,7 @@ def make_supervisor_sleep(llm: BaseChatModel, members: list[str]):
         if goto == "FINISH":
             goto = END
 
-        print(f"Sleep supervisor decision: {goto}")
-        print(f"{'=' * 60}\n")
+        logger.info("Sleep supervisor decision: %s", goto)
 
         # Messaggio di tracking
         if goto == "sleep_visualization":
@@ -1,9 +1,12 @@
+import logging
 from typing import Literal, TypedDict
 from langgraph.types import Command
 from langchain_core.messages import HumanMessage, AIMessage
 
 from backend.models.state import State
 
+logger = logging.getLogger(__name__)
+
 
 def make_supervisor_node(llm, teams: list[str]):
     """
@@ -16,14 +19,12 @@ def make_supervisor_node(llm, teams: list[str]):
     """
 
     def supervisor_node(state: State) -> Command[Literal[*teams, "generator_node", "correlation_analyzer"]]:
-        print(f"\n{'=' * 60}")
-        print("TOP SUPERVISOR - Processing state")
-        print(f"{'=' * 60}")
+        logger.info("TOP SUPERVISOR - Processing state")
 
         execution_plan = state.get("execution_plan")
 
         if not execution_plan:
-            print("ERROR - No execution plan found!")
+            logger.error("No execution plan found!")
             return Command(
                 goto="correlation_analyzer",
                 update={
@@ -33,9 +34,9 @@ def make_supervisor_node(llm, teams: list[str]):
             )
 
         completed_tasks = state.get("completed_tasks", set())
-        print(f"Completed tasks ({len(completed_tasks)}):")
+        logger.info("Completed tasks: %d", len(completed_tasks))
         for task in completed_tasks:
-            print(f"  ✓ {task[:80]}...")
+            logger.debug("  - %s...", task[:80])
 
         # Ottieni il prossimo task da eseguire
         next_task = execution_plan.get_next_task(completed_tasks)
@@ -43,8 +44,7 @@ def make_supervisor_node(llm, teams: list[str]):
         if next_task is None:
             # Tutti i task completati - decidi dove andare in base a cross_domain
             if execution_plan.cross_domain:
-                print("\nAll tasks completed - Routing to generator_node (cross_domain = True)")
-                print(f"{'=' * 60}\n")
+                logger.info("All tasks completed - Routing to generator_node (cross_domain = True)")
 
                 return Command(
                     goto="generator_node",
@@ -53,8 +53,7 @@ def make_supervisor_node(llm, teams: list[str]):
                     }
                 )
             else:
-                print("\nAll tasks completed - Routing to correlation_analyzer (cross_domain = False)")
-                print(f"{'=' * 60}\n")
+                logger.info("All tasks completed - Routing to correlation_analyzer (cross_domain = False)")
 
                 return Command(
                     goto="correlation_analyzer",
@@ -64,9 +63,7 @@ def make_supervisor_node(llm, teams: list[str]):
                 )
 
         # Assegna il prossimo task al team appropriato
-        print(f"\nAssigning task to {next_task.team}:")
-        print(f"   Task: {next_task.instruction}")
-        print(f"{'=' * 60}\n")
+        logger.info("Assigning task to %s: %s", next_task.team, next_task.instruction)
         return Command(
             goto=next_task.team,
             update={
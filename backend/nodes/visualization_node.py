@@ -0,0 +1,120 @@
+"""
+Nodo di visualizzazione comune ai team Sleep, Kitchen e Mobility.
+
+Il grafico si sceglie dal tipo dei risultati raccolti dal team tramite il registro
+(backend.tools.visualization_registry) e il tool visualize_* viene chiamato
+direttamente. L'LLM viene interpellato solo quando più grafici sono disponibili e la
+domanda non permette di scegliere (una sola chiamata con output strutturato, al posto
+dell'agente ReAct che ne faceva almeno due).
+"""
+
+import logging
+from typing import Literal, TypedDict
+
+from google.api_core import exceptions
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.types import Command
+
+from backend.config.settings import invoke_with_structured_output
+from backend.models.state import GraphRef, State
+from backend.tools.visualization_registry import (
+    eligible_visualizations,
+    flatten_results,
+    mentioned_visualizations,
+    pick_visualization,
+    render_visualization,
+)
+from backend.utils.graph_store import store_graph
+
+logger = logging.getLogger(__name__)
+
+
+def create_team_visualization_node(llm, team_name: str, message_name: str, supervisor: str, tools: list):
+    """
+    Crea il nodo di visualizzazione di un team.
+
+    tools sono i tool visualize_* del team (devono essere nel registro), message_name il
+    nome dei messaggi prodotti dal nodo e supervisor il nodo a cui tornare.
+    """
+    tool_names = [tool.name for tool in tools]
+
+    class ChartChoice(TypedDict):
+        """Grafico più rilevante per la domanda."""
+        chart: Literal[*tool_names]
+
+    def _message(content: str) -> HumanMessage:
+        return HumanMessage(content=content, name=message_name)
+
+    def _choose_with_llm(eligible, question: str):
+        options = "\n".join(f"- {spec['tool'].name}: {spec['description']}" for spec, _ in eligible)
+        messages = [
+            SystemMessage(content=(
+                "You choose the single most relevant Plotly chart for the user's question.\n"
+                f"AVAILABLE CHARTS:\n{options}\n"
+                "IMPORTANT choose ONLY ONE of the available charts."
+            )),
+            HumanMessage(content=f'Query: "{question}"'),
+        ]
+        try:
+            choice = invoke_with_structured_output(llm, ChartChoice, messages)
+        except exceptions.ResourceExhausted as e:
+            logger.error("Failed after all retries: %s", e)
+            choice = None
+        chosen = choice.get("chart") if isinstance(choice, dict) else None
+        for item in eligible:
+            if item[0]["tool"].name == chosen:
+                return item
+        # Risposta non valida: il grafico di default del team, altrimenti il primo disponibile
+        return next((item for item in eligible if item[0]["default"]), eligible[0])
+
+    def visualization_node(state: State) -> Command[Literal[supervisor]]:
+        logger.info("%s - Generating graphs", message_name.upper())
+
+        original_question = state.get("original_question", "")
+        results = []
+        for team_resp in state.get("structured_responses", []):
+            if team_resp["team_name"] == team_name:
+                for resp in team_resp["structured_responses"]:
+                    results.extend(flatten_results(resp["data"]))
+
+        eligible = [item for item in eligible_visualizations(results) if item[0]["tool"].name in tool_names]
+        if not eligible:
+            logger.warning("No data available, skipping visualization")
+            return Command(
+                goto=supervisor,
+                update={"messages": [_message("Visualization skipped: no data")]}
+            )
+
+        try:
+            chosen = pick_visualization(eligible, original_question)
+            if chosen is None:
+                # L'LLM sceglie tra i grafici citati dalla domanda (o tra tutti, se nessuno è citato)
+                candidates = mentioned_visualizations(eligible, original_question) or eligible
+                logger.info("Ambiguous question, asking the LLM to choose among %d charts", len(candidates))
+                chosen = _choose_with_llm(candidates, original_question)
+
+            spec, data = chosen
+            graph = render_visualization(spec, data)
+            graphs: list[GraphRef] = []
+            if "error" in graph:
+                logger.error("Tool error: %s", graph["error"])
+            else:
+                graphs.append(store_graph(graph))
+                logger.info("Generated: %s - %s", graph["id"], graph["title"])
+
+            return Command(
+                goto=supervisor,
+                update={
+                    "graphs": graphs,
+                    "messages": [_message(f"Visualization completed: {len(graphs)} graphs")]
+                }
+            )
+
+        except Exception as e:
+            logger.exception("Visualization failed: %s", e)
+            return Command(
+                goto=supervisor,
+                update={"messages": [_message(f"Visualization failed: {str(e)}")]}
+            )
+
+    return visualization_node
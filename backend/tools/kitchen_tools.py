@@ -7,6 +7,8 @@ import pandas as pd
 import numpy as np
 
 from backend.config.settings import KITCHEN_DATA_PATH
+from backend.tools.tool_output import with_artifact
+from backend.utils.data_cache import load_dataset, cached_tool_result
 from backend.models.results import (
     KitchenStatisticsResult,
     KitchenUsagePatternResult,
@@ -14,8 +16,12 @@ from backend.models.results import (
     ErrorResult
 )
 
+KITCHEN_DATE_COLUMNS = ('timestamp_picco', 'start_time_attivita')
 
-@tool
+
+@tool(response_format="content_and_artifact")
+@with_artifact
+@cached_tool_result(KITCHEN_DATA_PATH)
 def analyze_kitchen_statistics(
         subject_id: Annotated[int, "ID of the subject to analyze, integer"],
         period: Annotated[
@@ -50,9 +56,7 @@ def analyze_kitchen_statistics(
         KitchenStatisticsResult con statistiche per ogni metrica, oppure ErrorResult
     """
     try:
-        df = pd.read_csv(KITCHEN_DATA_PATH)
-        df['timestamp_picco'] = pd.to_datetime(df['timestamp_picco'])
-        df['start_time_attivita'] = pd.to_datetime(df['start_time_attivita'])
+        df = load_dataset(KITCHEN_DATA_PATH, KITCHEN_DATE_COLUMNS)
 
         df_subject = df[df['subject_id'] == subject_id].copy()
 
@@ -107,7 +111,9 @@ def analyze_kitchen_statistics(
         return ErrorResult(error=f"Errore nell'analisi statistica cucina: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
+@cached_tool_result(KITCHEN_DATA_PATH)
 def analyze_kitchen_usage_pattern(
         subject_id: Annotated[int, "ID of the subject to analyze, integer"],
         period: Annotated[
@@ -149,8 +155,7 @@ def analyze_kitchen_usage_pattern(
         KitchenUsagePatternResult con pattern temporali, oppure ErrorResult
     """
     try:
-        df = pd.read_csv(KITCHEN_DATA_PATH)
-        df['timestamp_picco'] = pd.to_datetime(df['timestamp_picco'])
+        df = load_dataset(KITCHEN_DATA_PATH, KITCHEN_DATE_COLUMNS)
 
         df_subject = df[df['subject_id'] == subject_id].copy()
 
@@ -217,7 +222,9 @@ def analyze_kitchen_usage_pattern(
         return ErrorResult(error=f"Errore nell'analisi pattern cucina: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
+@cached_tool_result(KITCHEN_DATA_PATH)
 def analyze_kitchen_temperature(
         subject_id: Annotated[int, "ID of the subject to analyze, integer"],
         period: Annotated[
@@ -260,8 +267,7 @@ def analyze_kitchen_temperature(
         KitchenTemperatureAnalysisResult con analisi temperature, oppure ErrorResult
     """
     try:
-        df = pd.read_csv(KITCHEN_DATA_PATH)
-        df['timestamp_picco'] = pd.to_datetime(df['timestamp_picco'])
+        df = load_dataset(KITCHEN_DATA_PATH, KITCHEN_DATE_COLUMNS)
 
         df_subject = df[df['subject_id'] == subject_id].copy()
 
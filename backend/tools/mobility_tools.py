@@ -7,9 +7,15 @@ import pandas as pd
 
 from backend.config.settings import SENSOR_DATA_PATH
 from backend.models.results import ErrorResult, MobilityAnalysisResult, MobilityTrendData
+from backend.tools.tool_output import with_artifact
+from backend.utils.data_cache import load_dataset, cached_tool_result
 
+SENSOR_DATE_COLUMNS = ('timestamp',)
 
-@tool
+
+@tool(response_format="content_and_artifact")
+@with_artifact
+@cached_tool_result(SENSOR_DATA_PATH)
 def analyze_mobility_patterns(
         subject_id: Annotated[int, "ID of the subject to analyze, integer"],
         period: Annotated[
@@ -20,8 +26,7 @@ def analyze_mobility_patterns(
     Returns activity per room, movement frequency, and temporal patterns.
     """
     try:
-        df = pd.read_csv(SENSOR_DATA_PATH)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df = load_dataset(SENSOR_DATA_PATH, SENSOR_DATE_COLUMNS)
 
         df_subject = df[df['subject_id'] == subject_id].copy()
 
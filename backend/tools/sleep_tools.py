@@ -7,6 +7,9 @@ import pandas as pd
 import numpy as np
 
 from backend.config.settings import SLEEP_DATA_PATH
+from backend.tools.tool_output import with_artifact
+from backend.utils.data_cache import load_dataset, cached_tool_result
+from backend.utils.series import daily_series
 from backend.models.results import (
     SleepStatisticsResult,
     SleepDistributionResult,
@@ -15,8 +18,12 @@ from backend.models.results import (
     ErrorResult
 )
 
+SLEEP_DATE_COLUMNS = ('data',)
 
-@tool
+
+@tool(response_format="content_and_artifact")
+@with_artifact
+@cached_tool_result(SLEEP_DATA_PATH)
 def analyze_sleep_statistics(
         subject_id: Annotated[int, "ID of the subject to analyze, integer"],
         period: Annotated[
@@ -56,8 +63,7 @@ def analyze_sleep_statistics(
         SleepStatisticsResult con statistiche per ogni metrica, oppure ErrorResult
     """
     try:
-        df = pd.read_csv(SLEEP_DATA_PATH)
-        df['data'] = pd.to_datetime(df['data'])
+        df = load_dataset(SLEEP_DATA_PATH, SLEEP_DATE_COLUMNS)
 
         # Filtra per soggetto
         df_subject = df[df['subject_id'] == subject_id].copy()
@@ -113,7 +119,9 @@ def analyze_sleep_statistics(
         return ErrorResult(error=f"Errore nell'analisi statistica: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
+@cached_tool_result(SLEEP_DATA_PATH)
 def analyze_sleep_distribution(
         subject_id: Annotated[int, "ID of the subject to analyze, integer"],
         period: Annotated[
@@ -152,8 +160,7 @@ def analyze_sleep_distribution(
         SleepDistributionResult con distribuzione fasi e efficienza, oppure ErrorResult
     """
     try:
-        df = pd.read_csv(SLEEP_DATA_PATH)
-        df['data'] = pd.to_datetime(df['data'])
+        df = load_dataset(SLEEP_DATA_PATH, SLEEP_DATE_COLUMNS)
 
         df_subject = df[df['subject_id'] == subject_id].copy()
 
@@ -218,7 +225,9 @@ def analyze_sleep_distribution(
         return ErrorResult(error=f"Errore nell'analisi della distribuzione: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
+@cached_tool_result(SLEEP_DATA_PATH)
 def analyze_sleep_quality_correlation(
         subject_id: Annotated[int, "ID of the subject to analyze, integer"],
         period: Annotated[
@@ -268,8 +277,7 @@ def analyze_sleep_quality_correlation(
         SleepQualityCorrelationResult con coefficienti di correlazione e metriche, oppure ErrorResult
     """
     try:
-        df = pd.read_csv(SLEEP_DATA_PATH)
-        df['data'] = pd.to_datetime(df['data'])
+        df = load_dataset(SLEEP_DATA_PATH, SLEEP_DATE_COLUMNS)
 
         df_subject = df[df['subject_id'] == subject_id].copy()
 
@@ -344,7 +352,9 @@ def analyze_sleep_quality_correlation(
         return ErrorResult(error=f"Errore nell'analisi delle correlazioni: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
+@cached_tool_result(SLEEP_DATA_PATH)
 def analyze_daily_heart_rate(
         subject_id: Annotated[int, "ID of the subject to analyze, integer"],
         period: Annotated[str, "Period to analyze in format 'YYYY-MM-DD,YYYY-MM-DD' or 'last_N_days'"]
@@ -377,8 +387,7 @@ def analyze_daily_heart_rate(
         DailyHeartRateResult con FC giornaliera, oppure ErrorResult
     """
     try:
-        df = pd.read_csv(SLEEP_DATA_PATH)
-        df['data'] = pd.to_datetime(df['data'])
+        df = load_dataset(SLEEP_DATA_PATH, SLEEP_DATE_COLUMNS)
 
         df_subject = df[df['subject_id'] == subject_id].copy()
 
@@ -401,14 +410,13 @@ def analyze_daily_heart_rate(
         if df_period.empty:
             return ErrorResult(error="Nessun dato disponibile per il periodo specificato")
 
-        # Calcola media giornaliera
+        # Calcola media giornaliera (serie colonnare: date e valori paralleli, in ordine di data)
         daily_avg = df_period.groupby('data')['hr_average'].mean().round(2)
-        daily_avg = {date.strftime('%Y-%m-%d'): float(hr) for date, hr in daily_avg.items()}
 
         return DailyHeartRateResult(
             subject_id=subject_id,
             period=f"{start_date.date()} to {end_date.date()}",
-            daily_avg_hr=daily_avg
+            daily_avg_hr=daily_series(daily_avg.index, daily_avg.to_numpy())
         )
 
     except Exception as e:
@@ -0,0 +1,107 @@
+"""
+Output dei tool analyze_* e visualize_* come content_and_artifact.
+
+Il risultato completo (TypedDict di backend.models.results o GraphData) viaggia come
+artifact del ToolMessage: i nodi lo leggono così com'è, senza json.dumps nel ToolNode e
+json.loads nel nodo. Il content, l'unica parte che l'LLM dell'agente vede, è un
+riepilogo di una riga: gli agenti ReAct devono solo sapere se la chiamata è riuscita
+(o correggere gli argomenti in caso di errore), la sintesi dei risultati avviene dopo a
+partire dagli structured_responses.
+
+Uso sui tool (sopra i decoratori di cache):
+
+    @tool(response_format="content_and_artifact")
+    @with_artifact
+    @cached_tool_result(SLEEP_DATA_PATH)
+    def analyze_...(subject_id, period) -> ...:
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import uuid
+from typing import Any
+
+import numpy as np
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+# Valori scalari del risultato riportati nel riepilogo per l'LLM
+_SCALARS = (str, int, float, bool)
+
+
+def summarize_for_llm(result: Any) -> str:
+    """Riepilogo di una riga del risultato di un tool (content del ToolMessage)"""
+    if not isinstance(result, dict):
+        return str(result)
+    if "error" in result:
+        return f"Errore: {result['error']}"
+    if "plotly_json" in result:
+        return f"Grafico creato: {result.get('title', result.get('id'))}"
+
+    parts = []
+    for key, value in result.items():
+        if isinstance(value, float):
+            parts.append(f"{key}={value:g}")
+        elif isinstance(value, _SCALARS):
+            parts.append(f"{key}={value}")
+        elif isinstance(value, dict) and "dates" in value and "values" in value:
+            parts.append(f"{key}=serie di {len(value['dates'])} giorni")
+        elif isinstance(value, (dict, list)):
+            parts.append(f"{key}=({len(value)} voci)")
+    return "Analisi completata: " + ", ".join(parts)
+
+
+def to_native(value: Any) -> Any:
+    """
+    Converte gli scalari NumPy (np.float64, np.int64, ...) nei tipi Python equivalenti.
+    Il round trip JSON del ToolMessage lo faceva implicitamente: lo state e i checkpoint
+    devono continuare a contenere solo tipi nativi.
+    """
+    if isinstance(value, dict):
+        return {key: to_native(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_native(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def with_artifact(func):
+    """
+    Decoratore per i tool con response_format="content_and_artifact": la funzione
+    ritorna il risultato, il tool ritorna (riepilogo per l'LLM, risultato con tipi nativi).
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = to_native(func(*args, **kwargs))
+        return summarize_for_llm(result), result
+
+    return wrapper
+
+
+def tool_message_result(message: ToolMessage) -> dict[str, Any]:
+    """
+    Risultato strutturato di un ToolMessage: l'artifact se presente, altrimenti il
+    content (errori del ToolNode, messaggi di tool senza artifact).
+    """
+    if isinstance(message.artifact, dict):
+        return message.artifact
+    content = message.content
+    if isinstance(content, dict):
+        return content
+    if isinstance(content, str):
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            return {"error": content}
+        return data if isinstance(data, dict) else {"error": f"Formato risposta non valido: {type(data)}"}
+    return {"error": f"Formato risposta non valido: {type(content)}"}
+
+
+def invoke_tool(tool: BaseTool, args: dict[str, Any]) -> Any:
+    """Chiama il tool fuori da un agente e restituisce il risultato completo (l'artifact)"""
+    message = tool.invoke({"name": tool.name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"})
+    return tool_message_result(message)
@@ -2,8 +2,6 @@ from __future__ import annotations
 
 from typing import Annotated
 from langchain_core.tools import tool
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
 from backend.models.results import (
     KitchenStatisticsResult,
@@ -12,9 +10,13 @@ from backend.models.results import (
     ErrorResult,
 )
 from backend.models.state import GraphData
+from backend.tools.tool_output import with_artifact
+# Figure costruite come dict (senza i validatori di plotly.graph_objects)
+from backend.utils import figure_spec as fs
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
 def visualize_kitchen_statistics(
         result: Annotated[KitchenStatisticsResult, "Result from analyze_kitchen_statistics tool"]
 ) -> GraphData | ErrorResult:
@@ -34,7 +36,7 @@ def visualize_kitchen_statistics(
     """
     try:
         # Crea subplot con 2 righe e 3 colonne per gli indicator cards
-        fig = make_subplots(
+        fig = fs.make_subplots(
             rows=2, cols=3,
             specs=[
                 [{"type": "indicator"}, {"type": "indicator"}, {"type": "indicator"}],
@@ -46,7 +48,7 @@ def visualize_kitchen_statistics(
 
         # Card 1: Totale attività
         fig.add_trace(
-            go.Indicator(
+            fs.indicator(
                 mode="number",
                 value=result["total_activities"],
                 title={
@@ -65,7 +67,7 @@ def visualize_kitchen_statistics(
         # Card 3: Media attività per giorno
         activities_stats = result["activities_per_day"]
         fig.add_trace(
-            go.Indicator(
+            fs.indicator(
                 mode="number",
                 value=activities_stats["average"],
                 title={
@@ -83,7 +85,7 @@ def visualize_kitchen_statistics(
 
         # Card 5: Min attività per giorno
         fig.add_trace(
-            go.Indicator(
+            fs.indicator(
                 mode="number",
                 value=activities_stats["min"],
                 title={
@@ -100,7 +102,7 @@ def visualize_kitchen_statistics(
 
         # Card 6: Max attività per giorno
         fig.add_trace(
-            go.Indicator(
+            fs.indicator(
                 mode="number",
                 value=activities_stats["max"],
                 title={
@@ -135,7 +137,8 @@ def visualize_kitchen_statistics(
     except Exception as e:
         return ErrorResult(error=f"Errore nella visualizzazione statistiche cucina: {str(e)}")
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
 def visualize_kitchen_usage_pattern(
     result: Annotated[KitchenUsagePatternResult, "Result from analyze_kitchen_usage_pattern tool"]
 ) -> GraphData | ErrorResult:
@@ -154,7 +157,7 @@ def visualize_kitchen_usage_pattern(
     """
     try:
         # Crea subplot con 2 colonne
-        fig = make_subplots(
+        fig = fs.make_subplots(
             rows=1, cols=2,
             subplot_titles=(
                 "Distribuzione per Fascia Oraria",
@@ -171,7 +174,7 @@ def visualize_kitchen_usage_pattern(
         percentages = [result["timeslot_distribution"][key]["percentage"] for key in timeslot_keys]
         
         fig.add_trace(
-            go.Bar(
+            fs.bar(
                 x=timeslots,
                 y=counts,
                 marker_color=["#fbbf24", "#f97316", "#8b5cf6"],
@@ -191,7 +194,7 @@ def visualize_kitchen_usage_pattern(
         ]
         
         fig.add_trace(
-            go.Bar(
+            fs.bar(
                 x=metrics,
                 y=values,
                 marker_color=["#3b82f6", "#10b981", "#ec4899"],
@@ -228,7 +231,8 @@ def visualize_kitchen_usage_pattern(
         return ErrorResult(error=f"Errore nella visualizzazione pattern cucina: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
 def visualize_kitchen_temperature(
     result: Annotated[KitchenTemperatureAnalysisResult, "Result from analyze_kitchen_temperature tool"]
 ) -> GraphData | ErrorResult:
@@ -248,7 +252,7 @@ def visualize_kitchen_temperature(
     """
     try:
         # Crea grafico a barre semplice
-        fig = go.Figure()
+        fig = fs.Figure()
         
         temperatures = ["Media", "Massima", "Minima"]
         values = [
@@ -259,7 +263,7 @@ def visualize_kitchen_temperature(
         colors = ["#3b82f6", "#ef4444", "#10b981"]
         
         fig.add_trace(
-            go.Bar(
+            fs.bar(
                 x=temperatures,
                 y=values,
                 marker_color=colors,
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
+import logging
 from typing import Annotated
 from langchain_core.tools import tool
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
 from backend.models.results import (
     MobilityAnalysisResult,
@@ -11,9 +10,15 @@ from backend.models.results import (
 
 )
 from backend.models.state import GraphData
+from backend.tools.tool_output import with_artifact
+# Figure costruite come dict (senza i validatori di plotly.graph_objects)
+from backend.utils import figure_spec as fs
 
+logger = logging.getLogger(__name__)
 
-@tool
+
+@tool(response_format="content_and_artifact")
+@with_artifact
 def visualize_mobility_patterns(
     result: Annotated[MobilityAnalysisResult, "Result from analyze_mobility_patterns tool"]
 ) -> GraphData | ErrorResult:
@@ -30,10 +35,10 @@ def visualize_mobility_patterns(
     Returns:
         GraphData con il grafico Plotly in formato JSON, oppure ErrorResult
     """
-    print("RESULT TO GRAPH", result)
+    logger.debug("RESULT TO GRAPH %s", result)
     try:
         # Crea subplot con 1 riga e 2 colonne
-        fig = make_subplots(
+        fig = fs.make_subplots(
             rows=1, cols=2,
             subplot_titles=(
                 "Distribuzione per Stanza (%)",
@@ -61,7 +66,7 @@ def visualize_mobility_patterns(
         display_rooms = [room.replace("_", " ").title() for room in rooms]
         
         fig.add_trace(
-            go.Pie(
+            fs.pie(
                 labels=display_rooms,
                 values=percentages,
                 marker_colors=colors,
@@ -86,7 +91,7 @@ def visualize_mobility_patterns(
         metric_colors = ["#3b82f6", "#10b981", "#f59e0b"]
         
         fig.add_trace(
-            go.Bar(
+            fs.bar(
                 x=metrics,
                 y=values,
                 marker_color=metric_colors,
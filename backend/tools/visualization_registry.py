@@ -0,0 +1,169 @@
+"""
+Registro delle visualizzazioni: tipo di risultato dei tool di analisi -> tool visualize_*.
+
+Ogni tool visualize_* disegna un solo tipo di risultato (un TypedDict di
+backend.models.results), quindi il grafico si sceglie dal tipo dei dati raccolti senza
+chiedere all'LLM. Il tipo di un risultato a runtime (un dict) si riconosce dalle chiavi
+obbligatorie del TypedDict. Quando per la stessa domanda sono disponibili più grafici,
+decidono le parole chiave della domanda; solo se restano ambigui serve l'LLM.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from langchain_core.tools import BaseTool
+from typing_extensions import TypedDict
+
+from backend.models.results import (
+    DailyHeartRateResult,
+    ErrorResult,
+    KitchenStatisticsResult,
+    KitchenTemperatureAnalysisResult,
+    KitchenUsagePatternResult,
+    MobilityAnalysisResult,
+    SleepDistributionResult,
+    SleepQualityCorrelationResult,
+    SleepStatisticsResult,
+)
+from backend.models.state import GraphData
+from backend.tools.tool_output import invoke_tool
+from backend.tools.visualization_kitchen_tool import (
+    visualize_kitchen_statistics,
+    visualize_kitchen_temperature,
+    visualize_kitchen_usage_pattern,
+)
+from backend.tools.visualization_mobility_tool import visualize_mobility_patterns
+from backend.tools.visualization_sleep_tools import (
+    visualize_daily_heart_rate,
+    visualize_sleep_distribution,
+    visualize_sleep_quality_correlation,
+    visualize_sleep_statistics,
+)
+
+
+class VisualizationSpec(TypedDict):
+    """Un renderer registrato"""
+    result_type: type
+    tool: BaseTool
+    description: str
+    # Inizi di parola (minuscoli) che nella domanda indicano questo grafico
+    keywords: tuple[str, ...]
+    # Grafico per le domande generiche del dominio
+    default: bool
+
+
+VISUALIZATIONS: list[VisualizationSpec] = [
+    {
+        "result_type": SleepStatisticsResult,
+        "tool": visualize_sleep_statistics,
+        "description": "statistiche generali sul sonno",
+        "keywords": ("statistic", "general", "riepilog", "panoramica"),
+        "default": True,
+    },
+    {
+        "result_type": SleepDistributionResult,
+        "tool": visualize_sleep_distribution,
+        "description": "distribuzione delle fasi del sonno (REM, profondo, leggero)",
+        "keywords": ("fasi", "fase", "rem", "profond", "leggero", "distribuzion", "efficienza"),
+        "default": False,
+    },
+    {
+        "result_type": SleepQualityCorrelationResult,
+        "tool": visualize_sleep_quality_correlation,
+        "description": "correlazioni tra interruzioni (risvegli, uscite dal letto) e qualità del sonno",
+        "keywords": ("risvegl", "svegli", "interruzion", "uscite dal letto", "alza", "qualità", "correlazion"),
+        "default": False,
+    },
+    {
+        "result_type": DailyHeartRateResult,
+        "tool": visualize_daily_heart_rate,
+        "description": "andamento giornaliero della frequenza cardiaca notturna",
+        "keywords": ("cardiac", "battit", "bpm", "cuore", "heart"),
+        "default": False,
+    },
+    {
+        "result_type": KitchenStatisticsResult,
+        "tool": visualize_kitchen_statistics,
+        "description": "statistiche generali sull'uso della cucina",
+        "keywords": ("statistic", "general", "riepilog", "panoramica"),
+        "default": True,
+    },
+    {
+        "result_type": KitchenUsagePatternResult,
+        "tool": visualize_kitchen_usage_pattern,
+        "description": "utilizzo della cucina per fascia oraria (mattina, pranzo, cena)",
+        "keywords": ("fasci", "orari", "mattin", "pranzo", "cena", "quando", "pattern", "abitudin"),
+        "default": False,
+    },
+    {
+        "result_type": KitchenTemperatureAnalysisResult,
+        "tool": visualize_kitchen_temperature,
+        "description": "temperature raggiunte in cucina",
+        "keywords": ("temperatur", "calore", "caldo", "fornell"),
+        "default": False,
+    },
+    {
+        "result_type": MobilityAnalysisResult,
+        "tool": visualize_mobility_patterns,
+        "description": "movimenti del paziente tra le stanze e per fascia oraria",
+        "keywords": (),
+        "default": True,
+    },
+]
+
+
+def find_visualization(data: dict[str, Any]) -> VisualizationSpec | None:
+    """Renderer del risultato: il TypedDict più specifico di cui data ha tutte le chiavi obbligatorie"""
+    keys = data.keys()
+    matches = [spec for spec in VISUALIZATIONS if spec["result_type"].__required_keys__ <= keys]
+    return max(matches, key=lambda spec: len(spec["result_type"].__required_keys__), default=None)
+
+
+def flatten_results(data: dict[str, Any] | None) -> list[dict[str, Any]]:
+    """Risultati validi di una risposta di agente (espande {"results": [...]} e scarta gli errori)"""
+    if not isinstance(data, dict):
+        return []
+    items = data.get("results", [data])
+    return [item for item in items if isinstance(item, dict) and "error" not in item]
+
+
+def eligible_visualizations(results: list[dict[str, Any]]) -> list[tuple[VisualizationSpec, dict[str, Any]]]:
+    """Grafici disegnabili con i risultati raccolti (per tipo vale il risultato più recente)"""
+    by_tool: dict[str, tuple[VisualizationSpec, dict[str, Any]]] = {}
+    for data in results:
+        spec = find_visualization(data)
+        if spec is not None:
+            by_tool[spec["tool"].name] = (spec, data)
+    return list(by_tool.values())
+
+
+def mentioned_visualizations(eligible: list[tuple[VisualizationSpec, dict[str, Any]]],
+                             question: str) -> list[tuple[VisualizationSpec, dict[str, Any]]]:
+    """Grafici disponibili citati dalla domanda tramite le loro parole chiave"""
+    words = " " + " ".join(re.findall(r"\w+", question.lower()))
+    return [item for item in eligible if any(f" {keyword}" in words for keyword in item[0]["keywords"])]
+
+
+def pick_visualization(eligible: list[tuple[VisualizationSpec, dict[str, Any]]],
+                       question: str) -> tuple[VisualizationSpec, dict[str, Any]] | None:
+    """
+    Sceglie il grafico senza LLM: l'unico disponibile, l'unico citato dalla domanda o,
+    per una domanda generica, quello di default del dominio. None se la scelta è ambigua.
+    """
+    if len(eligible) == 1:
+        return eligible[0]
+    mentioned = mentioned_visualizations(eligible, question)
+    if len(mentioned) == 1:
+        return mentioned[0]
+    if not mentioned:
+        defaults = [item for item in eligible if item[0]["default"]]
+        if defaults:
+            return defaults[0]
+    return None
+
+
+def render_visualization(spec: VisualizationSpec, data: dict[str, Any]) -> GraphData | ErrorResult:
+    """Chiama direttamente il tool visualize_* del risultato (il grafico è l'artifact del tool)"""
+    return invoke_tool(spec["tool"], {"result": data})
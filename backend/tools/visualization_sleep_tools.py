@@ -2,8 +2,6 @@ from __future__ import annotations
 
 from typing import Annotated
 from langchain_core.tools import tool
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
 from backend.models.results import (
     SleepStatisticsResult,
@@ -13,9 +11,15 @@ from backend.models.results import (
     ErrorResult,
 )
 from backend.models.state import GraphData
+from backend.tools.tool_output import with_artifact
+from backend.utils.downsampling import time_series_trace
+from backend.utils.series import plotly_values, series_dates, series_values
+# Figure costruite come dict (senza i validatori di plotly.graph_objects)
+from backend.utils import figure_spec as fs
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
 def visualize_sleep_statistics(
         result: Annotated[SleepStatisticsResult, "Result from analyze_sleep_statistics tool"]
 ) -> GraphData | ErrorResult:
@@ -36,7 +40,7 @@ def visualize_sleep_statistics(
     """
     try:
         # Crea subplot con 2 righe e 2 colonne per gli indicator cards
-        fig = make_subplots(
+        fig = fs.make_subplots(
             rows=2, cols=2,
             specs=[
                 [{"type": "indicator"}, {"type": "indicator"}],
@@ -49,7 +53,7 @@ def visualize_sleep_statistics(
         # Card 1: Tempo totale di sonno
         sleep_time_stats = result["total_sleep_time"]
         fig.add_trace(
-            go.Indicator(
+            fs.indicator(
                 mode="number+delta",
                 value=sleep_time_stats["average"],
                 title={
@@ -68,7 +72,7 @@ def visualize_sleep_statistics(
         # Card 2: Risvegli notturni
         wakeup_stats = result["wakeup_count"]
         fig.add_trace(
-            go.Indicator(
+            fs.indicator(
                 mode="number",
                 value=wakeup_stats["average"],
                 title={
@@ -86,7 +90,7 @@ def visualize_sleep_statistics(
         # Card 3: Uscite dal letto
         out_of_bed_stats = result["out_of_bed_count"]
         fig.add_trace(
-            go.Indicator(
+            fs.indicator(
                 mode="number",
                 value=out_of_bed_stats["average"],
                 title={
@@ -103,7 +107,7 @@ def visualize_sleep_statistics(
 
         # Card 4: Numero notti
         fig.add_trace(
-            go.Indicator(
+            fs.indicator(
                 mode="number",
                 value=result["num_nights"],
                 title={
@@ -139,7 +143,8 @@ def visualize_sleep_statistics(
         return ErrorResult(error=f"Errore nella visualizzazione statistiche sonno: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
 def visualize_sleep_distribution(
     result: Annotated[SleepDistributionResult, "Result from analyze_sleep_distribution tool"]
 ) -> GraphData | ErrorResult:
@@ -159,7 +164,7 @@ def visualize_sleep_distribution(
     """
     try:
         # Crea subplot con 1 riga e 2 colonne
-        fig = make_subplots(
+        fig = fs.make_subplots(
             rows=1, cols=2,
             subplot_titles=(
                 "Distribuzione Percentuale Fasi",
@@ -185,7 +190,7 @@ def visualize_sleep_distribution(
         
         # Subplot 1: Pie chart percentuali
         fig.add_trace(
-            go.Pie(
+            fs.pie(
                 labels=phases,
                 values=percentages,
                 marker_colors=colors,
@@ -198,7 +203,7 @@ def visualize_sleep_distribution(
         
         # Subplot 2: Bar chart minuti
         fig.add_trace(
-            go.Bar(
+            fs.bar(
                 x=phases,
                 y=minutes,
                 marker_color=colors,
@@ -234,7 +239,8 @@ def visualize_sleep_distribution(
         return ErrorResult(error=f"Errore nella visualizzazione distribuzione sonno: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
 def visualize_sleep_quality_correlation(
     result: Annotated[SleepQualityCorrelationResult, "Result from analyze_sleep_quality_correlation tool"]
 ) -> GraphData | ErrorResult:
@@ -258,7 +264,7 @@ def visualize_sleep_quality_correlation(
     """
     try:
         # Crea grafico a barre
-        fig = go.Figure()
+        fig = fs.Figure()
         
         correlations_data = [
             {
@@ -278,7 +284,7 @@ def visualize_sleep_quality_correlation(
         colors = [item["color"] for item in correlations_data]
         
         fig.add_trace(
-            go.Bar(
+            fs.bar(
                 x=labels,
                 y=values,
                 marker_color=colors,
@@ -329,7 +335,8 @@ def visualize_sleep_quality_correlation(
         return ErrorResult(error=f"Errore nella visualizzazione correlazioni sonno: {str(e)}")
 
 
-@tool
+@tool(response_format="content_and_artifact")
+@with_artifact
 def visualize_daily_heart_rate(
     result: Annotated[DailyHeartRateResult, "Result from analyze_daily_heart_rate tool"]
 ) -> GraphData | ErrorResult:
@@ -349,26 +356,27 @@ def visualize_daily_heart_rate(
     """
     try:
         # Estrai date e valori
-        dates = list(result["daily_avg_hr"].keys())
-        hr_values = list(result["daily_avg_hr"].values())
+        dates = series_dates(result["daily_avg_hr"])
+        hr_array = series_values(result["daily_avg_hr"])
         
-        # Crea line chart
-        fig = go.Figure()
+        # Crea line chart (ridotto al budget di punti per periodi lunghi)
+        fig = fs.Figure()
         
         fig.add_trace(
-            go.Scatter(
-                x=dates,
-                y=hr_values,
+            time_series_trace(
+                dates,
+                plotly_values(result["daily_avg_hr"]),
+                value_label="FC",
+                unit="bpm",
                 mode="lines+markers",
                 line=dict(color="#ef4444", width=2),
                 marker=dict(size=8, color="#dc2626"),
-                name="FC Media",
-                hovertemplate="<b>%{x}</b><br>FC: %{y:.1f} bpm<extra></extra>"
+                name="FC Media"
             )
         )
         
         # Calcola media complessiva per linea di riferimento
-        avg_hr = sum(hr_values) / len(hr_values) if hr_values else 0
+        avg_hr = float(hr_array.mean()) if len(hr_array) else 0
         
         fig.add_hline(
             y=avg_hr,
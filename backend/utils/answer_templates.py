@@ -0,0 +1,431 @@
+"""
+Risposte testuali deterministiche per i turni con un solo risultato.
+
+Quando il turno ha prodotto un solo risultato non cross-domain (es. un
+SleepStatisticsResult), la risposta di 2-3 paragrafi si costruisce dai numeri e da
+soglie di riferimento, senza l'agente LLM del correlation_analyzer. Ogni tipo di
+risultato (un TypedDict di backend.models.results) ha il suo template, scelto come in
+visualization_registry dalle chiavi obbligatorie del TypedDict. La sintesi cross-domain
+e i turni con più risultati restano all'LLM.
+
+Il template non guarda la domanda né lo storico: a qualunque domanda sullo stesso
+risultato risponde con lo stesso report. Per questo è opt-in (ANSWER_SYNTHESIS=template
+o answer_synthesis nella richiesta).
+
+Le soglie sono valori di riferimento generali per adulti, non valutazioni cliniche.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Mapping, Optional
+
+from backend.models.results import (
+    DailyHeartRateResult,
+    KitchenAnalysisResult,
+    KitchenStatisticsResult,
+    KitchenTemperatureAnalysisResult,
+    KitchenUsagePatternResult,
+    MobilityAnalysisResult,
+    SleepDistributionResult,
+    SleepQualityCorrelationResult,
+    SleepStatisticsResult,
+)
+from backend.utils.llm_format import format_number
+from backend.utils.series_summary import summarize_series
+
+# Durata del sonno raccomandata (minuti)
+SLEEP_MINUTES_RANGE = (420, 540)
+# Percentuali di riferimento delle fasi del sonno sul tempo dormito
+SLEEP_PHASE_RANGES = {
+    "rem_sleep": ("REM", 20, 25),
+    "deep_sleep": ("sonno profondo", 13, 23),
+    "light_sleep": ("sonno leggero", 50, 60),
+}
+# Efficienza del sonno: buona da 85%, discreta da 75%
+SLEEP_EFFICIENCY_GOOD = 85
+SLEEP_EFFICIENCY_FAIR = 75
+# Risvegli per notte oltre cui le interruzioni sono frequenti
+FREQUENT_WAKEUPS = 3
+# Frequenza cardiaca (bpm) e respiratoria (atti/min) notturne di riferimento
+NIGHT_HR_RANGE = (50, 70)
+NIGHT_RR_RANGE = (12, 20)
+# |r| per una correlazione moderata e forte (come in analyze_sleep_quality_correlation)
+CORRELATION_MODERATE = 0.3
+CORRELATION_STRONG = 0.7
+# Coefficiente di variazione oltre cui una metrica è variabile tra i giorni
+HIGH_VARIABILITY = 0.15
+# Notti sotto cui le correlazioni sono poco affidabili
+MIN_NIGHTS_FOR_CORRELATION = 14
+# Quota di una fascia oraria sotto cui è quasi inutilizzata (%)
+MINOR_SLOT_PERCENTAGE = 10
+
+_SLEEP_CORRELATIONS = {
+    "wakeup_vs_sleep_time": ("risvegli", "durata del sonno"),
+    "wakeup_vs_efficiency": ("risvegli", "efficienza del sonno"),
+    "wakeup_vs_deep_sleep": ("risvegli", "sonno profondo"),
+    "out_of_bed_vs_sleep_time": ("uscite dal letto", "durata del sonno"),
+    "out_of_bed_vs_efficiency": ("uscite dal letto", "efficienza del sonno"),
+    "out_of_bed_vs_deep_sleep": ("uscite dal letto", "sonno profondo"),
+}
+_ROOMS = {"camera_letto": "camera da letto"}
+_SLOTS = {"mattina": "di mattina", "pomeriggio": "di pomeriggio", "sera": "di sera", "notte": "di notte",
+          "pranzo": "a pranzo", "cena": "a cena"}
+
+
+def _n(value: Any) -> str:
+    return format_number(value)
+
+
+def _b(text: str) -> str:
+    return f"**{text}**"
+
+
+def _hours(minutes: float) -> str:
+    hours, rest = divmod(round(minutes), 60)
+    return f"{hours} h {rest:02d} min"
+
+
+def _period(data: Mapping[str, Any]) -> str:
+    return str(data.get("period", "")).replace(" to ", " al ")
+
+
+def _percent(part: float, total: float) -> float:
+    return part / total * 100 if total else 0.0
+
+
+def _range_position(value: float, low: float, high: float) -> str:
+    if value < low:
+        return "sotto"
+    if value > high:
+        return "sopra"
+    return "entro"
+
+
+def _correlation(r: float) -> str:
+    strength = ("forte" if abs(r) >= CORRELATION_STRONG
+                else "moderata" if abs(r) >= CORRELATION_MODERATE else "debole")
+    return f"{strength} {'positiva' if r > 0 else 'negativa'}"
+
+
+def _variability(stats: Mapping[str, float]) -> float:
+    return stats["std_dev"] / stats["average"] if stats["average"] else 0.0
+
+
+def _efficiency(efficiency: float) -> str:
+    if efficiency > 100:
+        return (f"L'efficienza del sonno risulta del {_b(_n(efficiency) + '%')}: un valore oltre il 100% indica "
+                "che il tempo a letto registrato è inferiore al tempo dormito, quindi il dato va verificato.")
+    quality = ("buona" if efficiency >= SLEEP_EFFICIENCY_GOOD
+               else "discreta" if efficiency >= SLEEP_EFFICIENCY_FAIR else "bassa")
+    return (f"L'efficienza del sonno è del {_b(_n(efficiency) + '%')}, {quality} "
+            f"(valori da {SLEEP_EFFICIENCY_GOOD}% in su indicano un sonno efficiente).")
+
+
+# =============================================================================
+# SLEEP DOMAIN
+# =============================================================================
+
+def sleep_statistics_answer(data: SleepStatisticsResult) -> list[str]:
+    total = data["total_sleep_time"]
+    low, high = SLEEP_MINUTES_RANGE
+    position = _range_position(total["average"], low, high)
+    first = (
+        f"Nel periodo dal {_period(data)} sono state analizzate {_b(str(data['num_nights']) + ' notti')}. "
+        f"Il tempo di sonno medio è di {_b(_n(total['average']) + ' minuti')} ({_hours(total['average'])}), "
+        f"{position} l'intervallo raccomandato di {low // 60}-{high // 60} ore, con una mediana di "
+        f"{_n(total['median'])} minuti e notti tra {_n(total['min'])} e {_n(total['max'])} minuti."
+    )
+    if _variability(total) > HIGH_VARIABILITY:
+        first += (f" La durata varia sensibilmente da una notte all'altra "
+                  f"(deviazione standard di {_n(total['std_dev'])} minuti).")
+
+    phases = {key: data[key]["average"] for key in ("rem_sleep_duration", "deep_sleep_duration", "light_sleep_duration")}
+    phase_total = sum(phases.values())
+    wakeups = data["wakeup_count"]["average"]
+    second = (
+        f"In media ogni notte comprende {_b(_n(phases['rem_sleep_duration']) + ' minuti')} di REM "
+        f"({_n(_percent(phases['rem_sleep_duration'], phase_total))}%), "
+        f"{_b(_n(phases['deep_sleep_duration']) + ' minuti')} di sonno profondo "
+        f"({_n(_percent(phases['deep_sleep_duration'], phase_total))}%) e "
+        f"{_n(phases['light_sleep_duration'])} minuti di sonno leggero. "
+        f"Si registrano {_b(_n(wakeups) + ' risvegli')} e {_b(_n(data['out_of_bed_count']['average']) + ' uscite dal letto')} "
+        f"per notte, "
+        + ("interruzioni frequenti" if wakeups > FREQUENT_WAKEUPS else "un numero di interruzioni contenuto")
+        + f" (massimo {_n(data['wakeup_count']['max'])} risvegli in una notte)."
+    )
+
+    hr, rr = data["hr_average"], data["rr_average"]
+    third = (
+        f"La frequenza cardiaca media notturna è di {_b(_n(hr['average']) + ' bpm')}, "
+        f"{_range_position(hr['average'], *NIGHT_HR_RANGE)} l'intervallo tipico di "
+        f"{NIGHT_HR_RANGE[0]}-{NIGHT_HR_RANGE[1]} bpm durante il sonno (tra {_n(hr['min'])} e {_n(hr['max'])} bpm); "
+        f"la frequenza respiratoria media è di {_b(_n(rr['average']) + ' atti/min')}, "
+        f"{_range_position(rr['average'], *NIGHT_RR_RANGE)} l'intervallo di "
+        f"{NIGHT_RR_RANGE[0]}-{NIGHT_RR_RANGE[1]} atti/min."
+    )
+    return [first, second, third]
+
+
+def sleep_distribution_answer(data: SleepDistributionResult) -> list[str]:
+    first = (
+        f"Su {_b(str(data['num_nights']) + ' notti')} (dal {_period(data)}) il sonno medio è di "
+        f"{_b(_n(data['total_sleep_minutes']) + ' minuti')} ({_hours(data['total_sleep_minutes'])}): "
+        + ", ".join(f"{label} {_b(_n(data[key]['avg_minutes']) + ' min')} ({_n(data[key]['percentage'])}%)"
+                    for key, (label, _, _) in SLEEP_PHASE_RANGES.items())
+        + "."
+    )
+
+    outside = []
+    for key, (label, low, high) in SLEEP_PHASE_RANGES.items():
+        position = _range_position(data[key]["percentage"], low, high)
+        if position != "entro":
+            outside.append(f"il {label} è {position} i valori di riferimento ({low}-{high}%)")
+    if outside:
+        second = "Rispetto alla distribuzione tipica di un adulto, " + "; ".join(outside) + ". "
+    else:
+        second = "Tutte le fasi rientrano nelle proporzioni tipiche di un adulto. "
+    second += _efficiency(data["sleep_efficiency"])
+    return [first, second]
+
+
+def sleep_quality_correlation_answer(data: SleepQualityCorrelationResult) -> list[str]:
+    first = (
+        f"Nel periodo dal {_period(data)} ({_b(str(data['num_nights']) + ' notti')}) si registrano in media "
+        f"{_b(_n(data['avg_wakeup_count']) + ' risvegli')} e {_b(_n(data['avg_out_of_bed_count']) + ' uscite dal letto')} "
+        f"per notte, con {_n(data['avg_total_sleep_hours'])} ore di sonno e "
+        f"{_n(data['avg_deep_sleep_minutes'])} minuti di sonno profondo. "
+        + _efficiency(data["avg_sleep_efficiency"])
+    )
+
+    correlations = {key: r for key, r in data["correlations"].items() if key in _SLEEP_CORRELATIONS and r is not None}
+    relevant = sorted(((key, r) for key, r in correlations.items() if abs(r) >= CORRELATION_MODERATE),
+                      key=lambda item: -abs(item[1]))
+    if relevant:
+        second = "Le interruzioni incidono sulla qualità del sonno: " + "; ".join(
+            f"tra {_SLEEP_CORRELATIONS[key][0]} e {_SLEEP_CORRELATIONS[key][1]} la correlazione è "
+            f"{_correlation(r)} ({_b('r = ' + _n(r))})"
+            for key, r in relevant
+        ) + "."
+    elif correlations:
+        strongest_key, strongest = max(correlations.items(), key=lambda item: abs(item[1]))
+        second = (
+            f"Le interruzioni non mostrano correlazioni rilevanti con la qualità del sonno: tutti i coefficienti "
+            f"sono deboli (|r| < {_n(CORRELATION_MODERATE)}), il più marcato è tra "
+            f"{_SLEEP_CORRELATIONS[strongest_key][0]} e {_SLEEP_CORRELATIONS[strongest_key][1]} "
+            f"({_b('r = ' + _n(strongest))})."
+        )
+    else:
+        second = "Non è stato possibile calcolare le correlazioni con i dati disponibili."
+    if data["num_nights"] < MIN_NIGHTS_FOR_CORRELATION:
+        second += f" Con meno di {MIN_NIGHTS_FOR_CORRELATION} notti i coefficienti sono poco affidabili."
+    return [first, second]
+
+
+def daily_heart_rate_answer(data: DailyHeartRateResult) -> list[str]:
+    summary = summarize_series(data["daily_avg_hr"])
+    if summary is None:
+        return [f"Non ci sono valori di frequenza cardiaca notturna nel periodo dal {_period(data)}."]
+    first = (
+        f"Nel periodo dal {_period(data)} la frequenza cardiaca media notturna, su {_b(str(summary['days']) + ' notti')}, "
+        f"è di {_b(_n(summary['mean']) + ' bpm')} (mediana {_n(summary['median'])} bpm), "
+        f"{_range_position(summary['mean'], *NIGHT_HR_RANGE)} l'intervallo tipico di "
+        f"{NIGHT_HR_RANGE[0]}-{NIGHT_HR_RANGE[1]} bpm durante il sonno. Il valore più basso è "
+        f"{_b(_n(summary['min']['value']) + ' bpm')} il {summary['min']['date']}, il più alto "
+        f"{_b(_n(summary['max']['value']) + ' bpm')} il {summary['max']['date']}."
+    )
+
+    if summary["trend"] == "stabile":
+        second = (f"L'andamento è stabile nel periodo (variazione stimata di {_n(summary['trend_total'])} bpm, "
+                  f"deviazione standard di {_n(summary['std_dev'])} bpm).")
+    else:
+        second = (f"L'andamento è {summary['trend']}: circa {_b(_n(abs(summary['trend_per_week'])) + ' bpm a settimana')}, "
+                  f"{_n(abs(summary['trend_total']))} bpm sull'intero periodo.")
+    if summary["anomaly_count"]:
+        second += (f" Si distinguono {summary['anomaly_count']} notti anomale rispetto alle altre: "
+                   + ", ".join(f"{item['date']} ({_n(item['value'])} bpm)" for item in summary["anomalies"][:3])
+                   + ".")
+    else:
+        second += " Non ci sono notti con valori anomali rispetto al resto del periodo."
+    return [first, second]
+
+
+# =============================================================================
+# KITCHEN DOMAIN
+# =============================================================================
+
+def kitchen_statistics_answer(data: KitchenStatisticsResult) -> list[str]:
+    duration, per_day = data["duration_minutes"], data["activities_per_day"]
+    first = (
+        f"Nel periodo dal {_period(data)} sono state registrate {_b(str(data['total_activities']) + ' attività')} "
+        f"in cucina in {data['num_days']} giorni, in media {_b(_n(per_day['average']) + ' al giorno')} "
+        f"(da {_n(per_day['min'])} a {_n(per_day['max'])}). Ogni attività dura in media "
+        f"{_b(_n(duration['average']) + ' minuti')} con una mediana di {_n(duration['median'])} minuti"
+    )
+    if duration["median"] and duration["average"] > 1.3 * duration["median"]:
+        first += (f": la maggior parte delle attività è breve e poche sessioni lunghe "
+                  f"(fino a {_n(duration['max'])} minuti) alzano la media.")
+    else:
+        first += f" e un massimo di {_n(duration['max'])} minuti."
+
+    temperature = data["temperature_max"]
+    second = (
+        f"La temperatura massima raggiunta è in media di {_b(_n(temperature['average']) + ' °C')} "
+        f"(da {_n(temperature['min'])} a {_n(temperature['max'])} °C)"
+        + (", quindi prevalgono le preparazioni a bassa temperatura come riscaldare i cibi."
+           if temperature["average"] < 50 else ", compatibile con cotture vere e proprie.")
+    )
+    if _variability(per_day) > HIGH_VARIABILITY:
+        second += f" Il numero di attività giornaliere è variabile (deviazione standard di {_n(per_day['std_dev'])})."
+    return [first, second]
+
+
+def kitchen_usage_pattern_answer(data: KitchenUsagePatternResult) -> list[str]:
+    first = (
+        f"Nel periodo dal {_period(data)} la cucina è stata usata {_b(str(data['total_activities']) + ' volte')}, "
+        f"in media {_b(_n(data['activities_per_day']) + ' al giorno')}, per un totale di "
+        f"{_b(_n(data['total_cooking_time_hours']) + ' ore')}."
+    )
+    slots = data["timeslot_distribution"]
+    second = (
+        f"La fascia più attiva è {_b(data['most_active_slot'])}. Per fascia oraria: "
+        + "; ".join(f"{slot} {stats['count']} attività ({_n(stats['percentage'])}%, in media "
+                    f"{_n(stats['avg_duration'])} minuti)" for slot, stats in slots.items())
+        + "."
+    )
+    minor = [slot for slot, stats in slots.items() if stats["percentage"] < MINOR_SLOT_PERCENTAGE]
+    if minor:
+        second += f" La cucina è quasi inutilizzata {' e '.join(_SLOTS.get(slot, slot) for slot in minor)}."
+    return [first, second]
+
+
+def kitchen_temperature_answer(data: KitchenTemperatureAnalysisResult) -> list[str]:
+    counts = [
+        ("a bassa temperatura", "sotto 50 °C, es. riscaldare", data["low_temp_count"]),
+        ("a media temperatura", "50-150 °C, cotture normali", data["medium_temp_count"]),
+        ("ad alta temperatura", "oltre 150 °C, fritture o forno", data["high_temp_count"]),
+    ]
+    total = sum(count for _, _, count in counts)
+    first = (
+        f"Nel periodo dal {_period(data)} la temperatura massima media delle attività in cucina è di "
+        f"{_b(_n(data['avg_temperature']) + ' °C')}, con valori tra {_n(data['min_temperature'])} e "
+        f"{_b(_n(data['max_temperature']) + ' °C')}. Su {total} attività: "
+        + ", ".join(f"{count} {label} ({_n(_percent(count, total))}%, {description})"
+                    for label, description, count in counts)
+        + "."
+    )
+
+    by_slot = data["avg_temp_by_timeslot"]
+    r = data["temp_vs_duration_correlation"]
+    second = ""
+    if by_slot:
+        hottest = max(by_slot, key=by_slot.get)
+        second = ("Per fascia oraria la temperatura media è "
+                  + ", ".join(f"{_n(value)} °C {_SLOTS.get(slot, slot)}" for slot, value in by_slot.items())
+                  + f"; le preparazioni più calde sono {_b(_SLOTS.get(hottest, hottest))}. ")
+    if r is not None:
+        second += (f"La correlazione tra temperatura e durata è {_correlation(r)} ({_b('r = ' + _n(r))})"
+                   + (": temperatura e durata delle attività sono in pratica indipendenti."
+                      if abs(r) < CORRELATION_MODERATE else "."))
+    return [first, second.strip()] if second else [first]
+
+
+def kitchen_analysis_answer(data: KitchenAnalysisResult) -> list[str]:
+    first = (
+        f"Nel periodo dal {_period(data)} sono state registrate {_b(str(data['total_activities']) + ' attività')} "
+        f"in cucina, {_b(_n(data['activities_per_day']) + ' al giorno')} in media, di "
+        f"{_n(data['avg_duration_minutes'])} minuti ciascuna, per un totale di {_n(data['total_cooking_time_hours'])} ore. "
+        f"La temperatura massima media è di {_n(data['avg_temperature_max'])} °C."
+    )
+    slots = data["time_slot_distribution"]
+    paragraphs = [first]
+    if slots:
+        paragraphs.append(f"La fascia più attiva è {_b(max(slots, key=slots.get))} ("
+                          + ", ".join(f"{slot} {count}" for slot, count in slots.items()) + " attività).")
+    trends = data.get("trends")
+    if trends:
+        paragraphs.append(_trend_sentence(trends, "attività al giorno"))
+    return paragraphs
+
+
+# =============================================================================
+# MOBILITY DOMAIN
+# =============================================================================
+
+def _trend_sentence(trends: Mapping[str, float], unit: str) -> str:
+    frequency, duration = trends["activity_frequency_change"], trends["avg_duration_change_minutes"]
+    if frequency == 0 and duration == 0:
+        return "Tra la prima e la seconda metà del periodo l'attività è rimasta invariata."
+    return (
+        "Tra la prima e la seconda metà del periodo la frequenza "
+        + (f"è {'aumentata' if frequency > 0 else 'diminuita'} di {_b(_n(abs(frequency)) + ' ' + unit)}"
+           if frequency else "è rimasta invariata")
+        + " e la durata media "
+        + (f"è {'aumentata' if duration > 0 else 'diminuita'} di {_n(abs(duration))} minuti."
+           if duration else "è rimasta invariata.")
+    )
+
+
+def mobility_answer(data: MobilityAnalysisResult) -> list[str]:
+    first = (
+        f"Nel periodo dal {_period(data)} sono stati rilevati {_b(str(data['total_detections']) + ' movimenti')} "
+        f"tra le stanze, in media {_b(_n(data['detections_per_day']) + ' al giorno')}, con una permanenza media di "
+        f"{_n(data['avg_duration_minutes'])} minuti e {_n(data['total_active_time_hours'])} ore di attività complessive."
+    )
+    rooms = sorted(data["room_percentages"].items(), key=lambda item: -item[1])
+    slots = data["time_slot_activity"]
+    second = (
+        "Le stanze più frequentate sono "
+        + ", ".join(f"{_b(_ROOMS.get(room, room))} ({_n(percentage)}%)" for room, percentage in rooms[:3])
+        + "."
+    )
+    if slots:
+        busiest = max(slots, key=slots.get)
+        second += (f" La fascia oraria più attiva è {_b(busiest)} ("
+                   + ", ".join(f"{slot} {count}" for slot, count in slots.items()) + " rilevazioni).")
+    paragraphs = [first, second]
+    if data.get("trends"):
+        paragraphs.append(_trend_sentence(data["trends"], "rilevazioni al giorno"))
+    return paragraphs
+
+
+# =============================================================================
+# REGISTRO
+# =============================================================================
+
+ANSWER_TEMPLATES: list[tuple[type, Callable[[Any], list[str]]]] = [
+    (SleepStatisticsResult, sleep_statistics_answer),
+    (SleepDistributionResult, sleep_distribution_answer),
+    (SleepQualityCorrelationResult, sleep_quality_correlation_answer),
+    (DailyHeartRateResult, daily_heart_rate_answer),
+    (KitchenStatisticsResult, kitchen_statistics_answer),
+    (KitchenUsagePatternResult, kitchen_usage_pattern_answer),
+    (KitchenTemperatureAnalysisResult, kitchen_temperature_answer),
+    (KitchenAnalysisResult, kitchen_analysis_answer),
+    (MobilityAnalysisResult, mobility_answer),
+]
+
+
+def find_answer_template(data: Mapping[str, Any]) -> Optional[Callable[[Any], list[str]]]:
+    """Template del risultato: il TypedDict più specifico di cui data ha tutte le chiavi obbligatorie"""
+    keys = data.keys()
+    matches = [(result_type, template) for result_type, template in ANSWER_TEMPLATES
+               if result_type.__required_keys__ <= keys]
+    if not matches:
+        return None
+    return max(matches, key=lambda match: len(match[0].__required_keys__))[1]
+
+
+def template_answer(data: Mapping[str, Any], graphs: Optional[list[Mapping[str, Any]]] = None) -> Optional[str]:
+    """
+    Risposta completa per un singolo risultato (None se nessun template lo riconosce).
+    I grafici disponibili vengono citati in una riga finale, come nella risposta dell'LLM.
+    """
+    template = find_answer_template(data)
+    if template is None:
+        return None
+    paragraphs = template(data)
+    if graphs:
+        titles = ", ".join(f"«{graph['title']}»" for graph in graphs)
+        paragraphs.append(f"{'Il grafico' if len(graphs) == 1 else 'I grafici'} {titles} "
+                          f"{'accompagna' if len(graphs) == 1 else 'accompagnano'} questa risposta.")
+    return "\n\n".join(paragraphs)
@@ -0,0 +1,480 @@
+"""
+Checkpointer persistente su SQLite per il grafo LangGraph.
+
+InMemorySaver conserva ogni checkpoint di ogni thread finché il processo è vivo:
+la memoria cresce senza limiti e le conversazioni si perdono al riavvio.
+SQLiteCheckpointer salva i checkpoint su un database SQLite in modalità WAL, condivisibile
+da più worker uvicorn (una connessione per thread, busy_timeout per le scritture
+concorrenti), e applica:
+
+- retention: per ogni thread restano solo gli ultimi CHECKPOINT_KEEP_LAST checkpoint del
+  grafo principale (più i checkpoint dei subgraph successivi al più vecchio conservato)
+- eviction: i thread senza attività da più di CHECKPOINT_THREAD_TTL_SECONDS vengono eliminati
+- compaction in background: ogni CHECKPOINT_COMPACTION_INTERVAL_SECONDS applica retention
+  ed eviction, poi esegue il checkpoint del WAL e l'incremental vacuum
+
+I metodi async delegano a quelli sincroni in un thread del default executor, così lo
+stesso checkpointer serve sia graph.stream (/chat) sia graph.astream (/chat/stream).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from backend.config.settings import (
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_DB_PATH,
+    CHECKPOINT_KEEP_LAST,
+    CHECKPOINT_THREAD_TTL_SECONDS,
+    CHECKPOINT_COMPACTION_INTERVAL_SECONDS,
+)
+from backend.utils.serialization import create_serializer
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checkpoint_threads_updated_at ON checkpoint_threads (updated_at);
+"""
+
+_SELECT_WRITES = (
+    "SELECT task_id, channel, type, value FROM writes "
+    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx"
+)
+
+
+def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+def _metadata_where(filter: dict[str, Any]) -> tuple[list[str], list[Any]]:
+    wheres, params = [], []
+    for key, value in filter.items():
+        if value is None:
+            wheres.append(f"json_extract(CAST(metadata AS TEXT), '$.{key}') IS NULL")
+            continue
+        if isinstance(value, bool):
+            value = int(value)
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value, separators=(",", ":"))
+        elif not isinstance(value, (str, int, float)):
+            value = str(value)
+        wheres.append(f"json_extract(CAST(metadata AS TEXT), '$.{key}') = ?")
+        params.append(value)
+    return wheres, params
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """Checkpointer LangGraph su SQLite (WAL) con retention, eviction e compaction"""
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        thread_ttl_seconds: float = CHECKPOINT_THREAD_TTL_SECONDS,
+        serde: SerializerProtocol | None = None,
+    ):
+        super().__init__(serde=serde or create_serializer())
+        self.path = str(path)
+        self.keep_last = keep_last
+        self.thread_ttl_seconds = thread_ttl_seconds
+        # Metadati in JSON per poterli filtrare con json_extract in list()
+        self.jsonplus_serde = JsonPlusSerializer()
+
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # Thread toccati dall'ultima compaction (None = tutti, al primo giro)
+        self._dirty: set[str] | None = None
+        self._dirty_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._maintenance_thread: threading.Thread | None = None
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        # Ha effetto solo alla creazione del database: permette di restituire
+        # le pagine libere al filesystem senza un VACUUM completo
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        with conn:
+            conn.executescript(SCHEMA)
+
+    # ------------------------------------------------------------------ connessioni
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # timeout = busy_timeout: attesa del lock di scrittura tenuto da altri worker
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        self.stop_maintenance()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------ lettura
+
+    def _tuple(self, conn, thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata):
+        writes = conn.execute(_SELECT_WRITES, (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+        return CheckpointTuple(
+            config=_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.jsonplus_serde.loads(metadata) if metadata is not None else {},
+            parent_config=_config(thread_id, checkpoint_ns, parent_id) if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((w_type, value)))
+                for task_id, channel, w_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        conn = self._connection()
+
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: list[Any] = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+
+        row = conn.execute(query, params).fetchone()
+        if row is None:
+            return None
+        return self._tuple(conn, thread_id, checkpoint_ns, *row)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        wheres, params = [], []
+        if config is not None:
+            wheres.append("thread_id = ?")
+            params.append(str(config["configurable"]["thread_id"]))
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                wheres.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                wheres.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if filter:
+            metadata_wheres, metadata_params = _metadata_where(filter)
+            wheres.extend(metadata_wheres)
+            params.extend(metadata_params)
+        if before is not None:
+            wheres.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+            "FROM checkpoints"
+        )
+        if wheres:
+            query += " WHERE " + " AND ".join(wheres)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+
+        conn = self._connection()
+        for row in conn.execute(query, params).fetchall():
+            yield self._tuple(conn, *row)
+
+    # ------------------------------------------------------------------ scrittura
+
+    def _touch(self, cur: sqlite3.Cursor, thread_id: str) -> None:
+        cur.execute(
+            "INSERT INTO checkpoint_threads (thread_id, updated_at) VALUES (?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (thread_id, time.time()),
+        )
+        with self._dirty_lock:
+            if self._dirty is not None:
+                self._dirty.add(thread_id)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = self.jsonplus_serde.dumps(get_checkpoint_metadata(config, metadata))
+
+        conn = self._connection()
+        with conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized_checkpoint,
+                    serialized_metadata,
+                ),
+            )
+            self._touch(cur, thread_id)
+        return _config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        # I canali speciali (errori, interrupt, ...) sovrascrivono, le scritture normali no
+        verb = "INSERT OR REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "INSERT OR IGNORE"
+        configurable = config["configurable"]
+        rows = [
+            (
+                str(configurable["thread_id"]),
+                str(configurable["checkpoint_ns"]),
+                str(configurable["checkpoint_id"]),
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        conn = self._connection()
+        with conn:
+            for table in ("checkpoints", "writes", "checkpoint_threads"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (str(thread_id),))
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ------------------------------------------------------------------ async
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # ------------------------------------------------------------------ manutenzione
+
+    def prune_thread(self, thread_id: str) -> int:
+        """
+        Applica la retention a un thread: restano gli ultimi keep_last checkpoint del grafo
+        principale. I checkpoint dei subgraph (checkpoint_ns != '') e le pending writes più
+        vecchi del primo checkpoint conservato appartengono a step conclusi e vengono
+        eliminati insieme. Gli id dei checkpoint (uuid6) sono ordinati nel tempo.
+        Restituisce il numero di checkpoint eliminati.
+        """
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, self.keep_last - 1),
+        ).fetchone()
+        if row is None:
+            return 0
+        cutoff = row[0]
+        with conn:
+            deleted = conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id < ?", (thread_id, cutoff)
+            ).rowcount
+            conn.execute("DELETE FROM writes WHERE thread_id = ? AND checkpoint_id < ?", (thread_id, cutoff))
+        return deleted
+
+    def evict_idle_threads(self, now: float | None = None) -> list[str]:
+        """Elimina i thread senza nuovi checkpoint da più di thread_ttl_seconds"""
+        deadline = (now or time.time()) - self.thread_ttl_seconds
+        idle = [
+            thread_id for (thread_id,) in self._connection().execute(
+                "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?", (deadline,)
+            ).fetchall()
+        ]
+        for thread_id in idle:
+            self.delete_thread(thread_id)
+        return idle
+
+    def compact(self) -> dict[str, int]:
+        """Retention sui thread modificati, eviction dei thread inattivi e compattazione del file"""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        conn = self._connection()
+        if dirty is None:
+            dirty = {thread_id for (thread_id,) in conn.execute("SELECT thread_id FROM checkpoint_threads")}
+
+        pruned = sum(self.prune_thread(thread_id) for thread_id in dirty)
+        evicted = self.evict_idle_threads()
+
+        if pruned or evicted:
+            conn.execute("PRAGMA incremental_vacuum")
+        # Riporta nel database le pagine del WAL e ne tronca il file
+        # (con altri worker in lettura il checkpoint resta parziale e riprova al giro dopo)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+
+        stats = {"threads": len(dirty), "pruned_checkpoints": pruned, "evicted_threads": len(evicted)}
+        logger.log(logging.INFO if pruned or evicted else logging.DEBUG, "Compaction checkpoint: %s", stats)
+        return stats
+
+    def start_maintenance(self, interval_seconds: float = CHECKPOINT_COMPACTION_INTERVAL_SECONDS) -> None:
+        """Avvia la compaction periodica in un thread daemon (idempotente)"""
+        if self._maintenance_thread is not None or interval_seconds <= 0:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.compact()
+                except sqlite3.Error as e:
+                    logger.warning("Compaction dei checkpoint fallita: %s", e)
+
+        self._maintenance_thread = threading.Thread(target=loop, name="checkpoint-compaction", daemon=True)
+        self._maintenance_thread.start()
+
+    def stop_maintenance(self) -> None:
+        if self._maintenance_thread is not None:
+            self._stop.set()
+            self._maintenance_thread.join()
+            self._maintenance_thread = None
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """
+    Checkpointer configurato da CHECKPOINT_BACKEND:
+    - "sqlite": SQLiteCheckpointer condiviso dal processo, con compaction in background
+    - "memory": InMemorySaver (nessuna persistenza, utile per test e benchmark)
+    """
+    global _checkpointer
+    if CHECKPOINT_BACKEND == "memory":
+        return InMemorySaver(serde=create_serializer())
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = SQLiteCheckpointer(CHECKPOINT_DB_PATH)
+            _checkpointer.start_maintenance()
+            logger.info("Checkpoint su SQLite: %s (ultimi %d per thread, TTL %ds)",
+                        CHECKPOINT_DB_PATH, CHECKPOINT_KEEP_LAST, CHECKPOINT_THREAD_TTL_SECONDS)
+    return _checkpointer
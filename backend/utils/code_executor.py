@@ -0,0 +1,297 @@
+"""
+Pool di processi isolati per eseguire il codice Plotly generato dall'LLM.
+
+Ogni worker è un processo Python separato (python -m backend.utils.code_executor) che
+importa Plotly una volta all'avvio e poi esegue le richieste una alla volta, ciascuna
+in un namespace nuovo e in una cartella temporanea propria (creata e rimossa dal processo
+principale, così non resta su disco nemmeno quando il worker viene terminato). La figura ``fig`` lasciata
+dal codice torna al chiamante come JSON: nessuno stato condiviso tra richieste
+concorrenti, a differenza del vecchio PythonREPL a livello di modulo.
+
+Limiti per richiesta:
+- tempo (wall-clock): allo scadere il worker viene terminato e sostituito
+- memoria: RLIMIT_AS del worker (solo dove il modulo resource è disponibile); un
+  MemoryError termina il worker, che viene sostituito
+
+I worker vengono riciclati dopo un numero massimo di esecuzioni e ricreati in
+background, così il pool resta pre-riscaldato.
+
+Protocollo: una riga JSON per messaggio su stdin/stdout del worker. Il primo messaggio
+del worker è {"ready": true}; ogni richiesta {"code": ..., "workdir": ...} riceve
+{"stdout": ..., "error": ..., "figure": ...}.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from typing_extensions import TypedDict
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+# Tempo massimo per l'avvio di un worker (import di Plotly e pandas)
+STARTUP_TIMEOUT_SECONDS = 60
+# Output testuale restituito all'LLM
+MAX_STDOUT_CHARS = 10_000
+
+
+class ExecutionResult(TypedDict):
+    """Esito di un'esecuzione nel pool"""
+    stdout: str
+    error: Optional[str]
+    figure: Optional[dict[str, Any]]
+    duration_ms: float
+
+
+def _result(error: str | None = None, stdout: str = "", figure: dict | None = None,
+            duration_ms: float = 0.0) -> ExecutionResult:
+    return {"stdout": stdout, "error": error, "figure": figure, "duration_ms": duration_ms}
+
+
+class _Worker:
+    """Un processo worker con un thread che legge le sue risposte"""
+
+    def __init__(self, memory_mb: int):
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.getenv("PYTHONPATH")]))}
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "backend.utils.code_executor", "--memory-mb", str(memory_mb)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=PROJECT_ROOT,
+            env=env,
+            text=True,
+            encoding="utf-8",
+        )
+        self.tasks = 0
+        self.ready = False
+        self._responses: queue.Queue = queue.Queue()
+        threading.Thread(target=self._read, name=f"code-executor-{self.process.pid}", daemon=True).start()
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            self._responses.put(json.loads(line))
+        self._responses.put(None)  # processo terminato
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.ready:
+            try:
+                self.ready = bool(self._responses.get(timeout=timeout))
+            except queue.Empty:
+                self.ready = False
+        return self.ready
+
+    def execute(self, code: str, timeout: float) -> ExecutionResult:
+        self.tasks += 1
+        start = time.perf_counter()
+        # i file scritti dal codice (es. write_html) restano isolati e vengono rimossi qui
+        workdir = tempfile.mkdtemp(prefix="code-executor-")
+        try:
+            self.process.stdin.write(json.dumps({"code": code, "workdir": workdir}) + "\n")
+            self.process.stdin.flush()
+            response = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            return _result(f"TimeoutError: execution exceeded {timeout:g}s and was stopped",
+                           duration_ms=(time.perf_counter() - start) * 1000)
+        except OSError as e:
+            response = None
+            logger.warning("Code executor %s not reachable: %r", self.process.pid, e)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if response is None:
+            self.kill()
+            return _result(f"Executor terminated unexpectedly (exit code {self.process.returncode})",
+                           duration_ms=(time.perf_counter() - start) * 1000)
+        if response.get("recycle"):
+            self.kill()  # il worker termina da solo dopo un MemoryError
+        return _result(response["error"], response["stdout"], response["figure"],
+                       (time.perf_counter() - start) * 1000)
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+
+
+class CodeExecutorPool:
+    """Pool di worker pre-riscaldati; run() è thread-safe e blocca finché un worker è libero"""
+
+    def __init__(self, size: int, timeout_seconds: float, memory_mb: int, max_tasks: int):
+        self.size = size
+        self.timeout_seconds = timeout_seconds
+        self.memory_mb = memory_mb
+        self.max_tasks = max_tasks
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(_Worker(memory_mb))
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        if not self._closed:
+            # Il nuovo worker importa Plotly mentre aspetta in coda la prossima richiesta
+            self._idle.put(_Worker(self.memory_mb))
+
+    def run(self, code: str) -> ExecutionResult:
+        worker = self._idle.get()
+        try:
+            if not worker.wait_ready(STARTUP_TIMEOUT_SECONDS):
+                return _result("Executor failed to start")
+            return worker.execute(code, self.timeout_seconds)
+        finally:
+            if worker.alive and worker.ready and worker.tasks < self.max_tasks:
+                self._idle.put(worker)
+            else:
+                self._replace(worker)
+
+    def warm(self) -> None:
+        """Attende che tutti i worker inattivi abbiano completato l'avvio"""
+        workers = [self._idle.get() for _ in range(self.size)]
+        try:
+            for worker in workers:
+                worker.wait_ready(STARTUP_TIMEOUT_SECONDS)
+        finally:
+            for worker in workers:
+                self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+
+_pool: CodeExecutorPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_executor_pool() -> CodeExecutorPool:
+    """Pool condiviso dal processo, creato (e i worker avviati) al primo uso"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from backend.config.settings import (
+                CODE_EXECUTOR_MAX_TASKS,
+                CODE_EXECUTOR_MEMORY_MB,
+                CODE_EXECUTOR_POOL_SIZE,
+                CODE_EXECUTOR_TIMEOUT_SECONDS,
+            )
+
+            _pool = CodeExecutorPool(
+                size=CODE_EXECUTOR_POOL_SIZE,
+                timeout_seconds=CODE_EXECUTOR_TIMEOUT_SECONDS,
+                memory_mb=CODE_EXECUTOR_MEMORY_MB,
+                max_tasks=CODE_EXECUTOR_MAX_TASKS,
+            )
+            atexit.register(_pool.shutdown)
+            logger.info("Code executor pool avviato (%d worker)", _pool.size)
+    return _pool
+
+
+# --- processo worker ---
+
+def _limit_memory(memory_mb: int) -> None:
+    """Limita lo spazio di indirizzamento a quello attuale (interprete e librerie) + memory_mb"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        logger.warning("Modulo resource non disponibile: nessun limite di memoria per il code executor")
+        return
+    baseline = 0
+    try:
+        with open("/proc/self/statm") as f:
+            baseline = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    limit = baseline + memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        logger.warning("Impossibile impostare il limite di memoria del code executor: %r", e)
+
+
+def _execute(code: str, workdir: str) -> dict:
+    """Esegue code in un namespace nuovo dentro workdir; "recycle" indica che il worker deve terminare"""
+    import contextlib
+    import io
+
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    namespace = {"__name__": "__main__"}
+    stdout = io.StringIO()
+    error = None
+    recycle = False
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(stdout):
+            exec(compile(code, "<generated>", "exec"), namespace)
+    except MemoryError:
+        error, recycle = "MemoryError: memory limit exceeded", True
+    except BaseException as e:
+        error = repr(e)
+    finally:
+        os.chdir(cwd)
+
+    figure = None
+    fig = namespace.get("fig")
+    if error is None and isinstance(fig, go.Figure):
+        try:
+            figure = json.loads(pio.to_json(fig, validate=False))
+        except Exception as e:
+            error = f"Failed to convert figure: {e!r}"
+    return {"stdout": stdout.getvalue()[-MAX_STDOUT_CHARS:], "error": error, "figure": figure, "recycle": recycle}
+
+
+def _worker_main(memory_mb: int) -> None:
+    # Il protocollo usa una copia di stdout; qualunque altra scrittura su fd 1 finisce su stderr
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+
+    def send(message: dict) -> None:
+        protocol.write(json.dumps(message) + "\n")
+        protocol.flush()
+
+    import plotly.express  # noqa: F401
+    import plotly.graph_objects as go
+    import plotly.subplots  # noqa: F401
+
+    # fig.show() aprirebbe un browser sul server
+    go.Figure.show = lambda self, *args, **kwargs: None
+    _limit_memory(memory_mb)
+    send({"ready": True})
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        response = _execute(request["code"], request["workdir"])
+        send(response)
+        if response["recycle"]:
+            break
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--memory-mb", type=int, default=1024)
+    _worker_main(parser.parse_args().memory_mb)
@@ -0,0 +1,305 @@
+"""
+Context caching lato provider per i prefissi statici dei prompt.
+
+Il system prompt del planner (con esempi e format_instructions) e i system prompt
+degli agenti ReAct con le dichiarazioni dei tool non cambiano tra una richiesta e
+l'altra. Invece di reinviarli ogni volta vengono registrati una sola volta come
+CachedContent del provider e referenziati per nome tramite ``cached_content``.
+
+Backend disponibili:
+- GeminiContextCacheBackend: CachedContent di Gemini (CacheService v1beta)
+- LocalContextCacheBackend: stand-in in memoria con lo stesso contratto, per test e uso offline
+
+Le cache vengono rinnovate (estensione del TTL) quando mancano meno di
+``refresh_margin_seconds`` alla scadenza, così una richiesta non trova mai un
+riferimento scaduto.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import hashlib
+import itertools
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+from backend.config.settings import (
+    google_api_key,
+    LLM_BACKEND,
+    CONTEXT_CACHE_BACKEND,
+    CONTEXT_CACHE_TTL_SECONDS,
+    CONTEXT_CACHE_REFRESH_MARGIN_SECONDS,
+    CONTEXT_CACHE_MIN_TOKENS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Dopo un errore di creazione non si riprova per questo intervallo (es. modello senza supporto al caching)
+FAILURE_BACKOFF_SECONDS = 600
+
+
+@dataclass
+class CacheEntry:
+    """Riferimento a un prefisso registrato presso il provider"""
+    name: str
+    expire_at: float
+
+
+@dataclass
+class CachedPrefix:
+    """Contenuto di un prefisso registrato (usato dal backend locale)"""
+    model: str
+    system_instruction: str
+    tools: list[Any] = field(default_factory=list)
+
+
+def _normalize_model(model: str) -> str:
+    return model if model.startswith("models/") else f"models/{model}"
+
+
+def _tool_text(tool: Any) -> str:
+    """Rappresentazione testuale di un tool (nome, docstring e schema degli argomenti)"""
+    name = getattr(tool, "name", str(tool))
+    description = getattr(tool, "description", "")
+    args = getattr(tool, "args", {})
+    return f"{name}\n{description}\n{json.dumps(args, default=str, sort_keys=True)}"
+
+
+def estimate_prefix_tokens(system_instruction: str, tools: Sequence[Any] = ()) -> int:
+    """Stima grossolana (4 caratteri per token) della dimensione del prefisso"""
+    chars = len(system_instruction) + sum(len(_tool_text(t)) for t in tools)
+    return chars // 4
+
+
+class LocalContextCacheBackend:
+    """
+    Stand-in in memoria del context caching del provider.
+    Stesso contratto del backend Gemini: crea, rinnova, elimina e (solo qui) risolve per nome.
+    """
+
+    def __init__(self):
+        self._contents: dict[str, CachedPrefix] = {}
+        self._expirations: dict[str, float] = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self, model: str, system_instruction: str, tools: Sequence[Any], ttl_seconds: int) -> CacheEntry:
+        with self._lock:
+            name = f"cachedContents/local-{next(self._counter)}"
+            self._contents[name] = CachedPrefix(model, system_instruction, list(tools))
+            self._expirations[name] = time.time() + ttl_seconds
+            return CacheEntry(name=name, expire_at=self._expirations[name])
+
+    def refresh(self, name: str, ttl_seconds: int) -> CacheEntry:
+        with self._lock:
+            if name not in self._contents:
+                raise KeyError(f"Cached content {name} non trovato")
+            self._expirations[name] = time.time() + ttl_seconds
+            return CacheEntry(name=name, expire_at=self._expirations[name])
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._contents.pop(name, None)
+            self._expirations.pop(name, None)
+
+    def resolve(self, name: str) -> CachedPrefix | None:
+        """Restituisce il prefisso registrato se esiste e non è scaduto"""
+        with self._lock:
+            if self._expirations.get(name, 0) < time.time():
+                return None
+            return self._contents.get(name)
+
+
+class GeminiContextCacheBackend:
+    """Backend basato sul CacheService di Gemini (google.ai.generativelanguage_v1beta)"""
+
+    def __init__(self, api_key: str | None):
+        self._api_key = api_key
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google.ai.generativelanguage_v1beta import CacheServiceClient
+            self._client = CacheServiceClient(client_options={"api_key": self._api_key})
+        return self._client
+
+    def create(self, model: str, system_instruction: str, tools: Sequence[Any], ttl_seconds: int) -> CacheEntry:
+        from google.ai.generativelanguage_v1beta import CachedContent, Content, Part
+        from google.protobuf import duration_pb2
+        from langchain_google_genai._function_utils import convert_to_genai_function_declarations
+
+        cached_content = CachedContent(
+            model=_normalize_model(model),
+            system_instruction=Content(parts=[Part(text=system_instruction)]),
+            tools=[convert_to_genai_function_declarations(list(tools))] if tools else [],
+            ttl=duration_pb2.Duration(seconds=ttl_seconds),
+        )
+        response = self.client.create_cached_content(cached_content=cached_content)
+        return CacheEntry(name=response.name, expire_at=response.expire_time.timestamp())
+
+    def refresh(self, name: str, ttl_seconds: int) -> CacheEntry:
+        from google.ai.generativelanguage_v1beta import CachedContent
+        from google.protobuf import duration_pb2, field_mask_pb2
+
+        response = self.client.update_cached_content(
+            cached_content=CachedContent(name=name, ttl=duration_pb2.Duration(seconds=ttl_seconds)),
+            update_mask=field_mask_pb2.FieldMask(paths=["ttl"]),
+        )
+        return CacheEntry(name=response.name, expire_at=response.expire_time.timestamp())
+
+    def delete(self, name: str) -> None:
+        self.client.delete_cached_content(name=name)
+
+    def resolve(self, name: str) -> CachedPrefix | None:
+        return None
+
+
+class ContextCacheManager:
+    """
+    Registra i prefissi statici una sola volta e restituisce il nome della cache da
+    passare come ``cached_content``. I prefissi sono indicizzati per hash di
+    (modello, system prompt, tool), quindi una modifica al prompt crea una nuova cache.
+    """
+
+    def __init__(self, backend, ttl_seconds: int, refresh_margin_seconds: int, min_tokens: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.min_tokens = min_tokens
+        self._entries: dict[str, CacheEntry] = {}
+        self._failed_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, system_instruction: str, tools: Sequence[Any]) -> str:
+        payload = "\n".join([_normalize_model(model), system_instruction] + [_tool_text(t) for t in tools])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model: str, system_instruction: str, tools: Sequence[Any] = ()) -> str | None:
+        """
+        Restituisce il nome della cache per il prefisso, creandola o rinnovandola se necessario.
+        Restituisce None se il prefisso non è cacheabile: la richiesta va fatta senza cache.
+        """
+        if estimate_prefix_tokens(system_instruction, tools) < self.min_tokens:
+            return None
+
+        key = self._key(model, system_instruction, tools)
+        with self._lock:
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry and entry.expire_at - now > self.refresh_margin_seconds:
+                return entry.name
+
+            if self._failed_until.get(key, 0) > now:
+                return None
+
+            try:
+                if entry and entry.expire_at > now:
+                    entry = self.backend.refresh(entry.name, self.ttl_seconds)
+                else:
+                    entry = self.backend.create(model, system_instruction, tools, self.ttl_seconds)
+            except Exception as e:
+                logger.warning("Context cache non disponibile per %s: %s", model, e)
+                self._entries.pop(key, None)
+                self._failed_until[key] = now + FAILURE_BACKOFF_SECONDS
+                return None
+
+            self._entries[key] = entry
+            return entry.name
+
+    def clear(self) -> None:
+        """Elimina tutte le cache registrate presso il provider"""
+        with self._lock:
+            for entry in self._entries.values():
+                try:
+                    self.backend.delete(entry.name)
+                except Exception as e:
+                    logger.warning("Eliminazione cache %s fallita: %s", entry.name, e)
+            self._entries.clear()
+            self._failed_until.clear()
+
+
+_context_cache: ContextCacheManager | None = None
+_context_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _local_backend_rejected() -> bool:
+    """
+    Il backend locale vale solo con il modello simulato: con Gemini i nomi
+    cachedContents/local-N verrebbero inviati all'API reale, senza system prompt né tool,
+    e la chiamata fallirebbe. In quel caso il context caching viene disattivato.
+    """
+    if CONTEXT_CACHE_BACKEND == "local" and LLM_BACKEND != "fake":
+        logger.warning("CONTEXT_CACHE_BACKEND=local richiede LLM_BACKEND=fake (attuale: %s): "
+                       "context caching disattivato", LLM_BACKEND)
+        return True
+    return False
+
+
+def get_context_cache() -> ContextCacheManager | None:
+    """Manager condiviso configurato da CONTEXT_CACHE_BACKEND (None se disattivato)"""
+    global _context_cache
+    if CONTEXT_CACHE_BACKEND == "off" or _local_backend_rejected():
+        return None
+    with _context_cache_lock:
+        if _context_cache is None:
+            # Il modello simulato risolve i prefissi solo dal backend locale
+            if CONTEXT_CACHE_BACKEND == "local" or LLM_BACKEND == "fake":
+                backend = LocalContextCacheBackend()
+            else:
+                backend = GeminiContextCacheBackend(google_api_key)
+            _context_cache = ContextCacheManager(
+                backend,
+                ttl_seconds=CONTEXT_CACHE_TTL_SECONDS,
+                refresh_margin_seconds=CONTEXT_CACHE_REFRESH_MARGIN_SECONDS,
+                min_tokens=CONTEXT_CACHE_MIN_TOKENS,
+            )
+    return _context_cache
+
+
+def supports_context_cache(llm) -> bool:
+    """True se il modello accetta il parametro cached_content"""
+    return hasattr(llm, "cached_content")
+
+
+def lookup_cached_prefix(llm, system_instruction: str, tools: Sequence[Any] = ()) -> str | None:
+    """Nome della cache per il prefisso (system prompt + tool) del modello, se disponibile"""
+    cache = get_context_cache()
+    if cache is None or not supports_context_cache(llm):
+        return None
+    return cache.get(llm.model, system_instruction, tools)
+
+
+def cached_prompt_model(llm, system_prompt: str, tools: Sequence[Any] = ()):
+    """
+    Selettore di modello dinamico per create_react_agent.
+
+    Se il prefisso (system prompt + dichiarazioni dei tool) è in cache, il modello viene
+    invocato solo con ``cached_content``: Gemini non accetta system_instruction o tools
+    insieme a una cache. Altrimenti si ricade sul comportamento standard di create_react_agent
+    (system prompt in testa e tool legati con bind_tools).
+
+    Da usare con ``create_react_agent(cached_prompt_model(llm, prompt, tools), tools=tools)``.
+    """
+    tools = list(tools)
+    uncached_model = llm.bind_tools(tools) if tools else llm
+    with_system_prompt = RunnableLambda(
+        lambda messages: [SystemMessage(content=system_prompt)] + list(messages)
+    ) | uncached_model
+
+    def select_model(state, runtime):
+        cache_name = lookup_cached_prefix(llm, system_prompt, tools)
+        if cache_name:
+            return llm.bind(cached_content=cache_name)
+        return with_system_prompt
+
+    return select_model
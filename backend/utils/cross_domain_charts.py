@@ -0,0 +1,148 @@
+"""
+Grafico cross-domain deterministico costruito sui template di graph_templates.
+
+Per ogni risultato dei tool presente (sonno, cucina, mobilità) viene scelto il template
+adatto, riconosciuto dalle chiavi del TypedDict, e le sue tracce vengono composte in
+un'unica figura a subplot. Nessuna chiamata LLM e nessun codice eseguito a runtime.
+"""
+
+import logging
+import math
+from typing import Any, Callable
+
+from backend.models.state import GraphData, TeamResponse
+from backend.utils import figure_spec as fs
+from backend.utils.graph_templates import (
+    create_heart_rate_line,
+    create_kitchen_temp_by_timeslot,
+    create_kitchen_timeslot_bar,
+    create_kitchen_variability_box,
+    create_mobility_room_bars,
+    create_mobility_timeslot_bar,
+    create_sleep_phases_pie,
+    create_sleep_quality_bars,
+    create_sleep_variability_box,
+)
+
+logger = logging.getLogger(__name__)
+
+DOMAINS = ["sleep", "kitchen", "mobility"]
+TEAM_DOMAINS = {"sleep_team": "sleep", "kitchen_team": "kitchen", "mobility_team": "mobility"}
+
+# Chiave che identifica il tipo di risultato -> template da usare, in ordine di priorità
+# all'interno di ciascun dominio
+PANEL_TEMPLATES: dict[str, list[tuple[str, Callable[[Any], GraphData]]]] = {
+    "sleep": [
+        ("daily_avg_hr", create_heart_rate_line),
+        ("rem_sleep", create_sleep_phases_pie),
+        ("correlations", create_sleep_quality_bars),
+        ("total_sleep_time", create_sleep_variability_box),
+    ],
+    "kitchen": [
+        ("timeslot_distribution", create_kitchen_timeslot_bar),
+        ("avg_temp_by_timeslot", create_kitchen_temp_by_timeslot),
+        ("duration_minutes", create_kitchen_variability_box),
+    ],
+    "mobility": [
+        ("room_distribution", create_mobility_room_bars),
+        ("time_slot_activity", create_mobility_timeslot_bar),
+    ],
+}
+
+# Pannelli per dominio: con più domini ognuno resta rappresentato
+MAX_PANELS_PER_DOMAIN = 2
+COLUMNS = 2
+ROW_HEIGHT = 340
+
+# Tracce che occupano un dominio (niente assi cartesiani)
+_DOMAIN_TRACES = {"pie", "indicator"}
+
+
+def collect_domain_results(structured_responses: list[TeamResponse]) -> dict[str, list[dict]]:
+    """
+    Risultati validi dei tool raggruppati per dominio.
+    Espande gli aggregati {"results": [...]} degli agenti e scarta gli ErrorResult.
+    """
+    results = {domain: [] for domain in DOMAINS}
+    for team in structured_responses:
+        domain = TEAM_DOMAINS.get(team["team_name"])
+        if domain is None:
+            continue
+        for response in team["structured_responses"]:
+            data = response["data"]
+            items = data.get("results", [data]) if isinstance(data, dict) else []
+            results[domain].extend(item for item in items if isinstance(item, dict) and "error" not in item)
+    return results
+
+
+def _select_panels(results: dict[str, list[dict]]) -> list[GraphData]:
+    panels = []
+    for domain in DOMAINS:
+        selected = 0
+        for key, template in PANEL_TEMPLATES[domain]:
+            if selected == MAX_PANELS_PER_DOMAIN:
+                break
+            # A parità di tipo vale il risultato più recente
+            data = next((item for item in reversed(results.get(domain, [])) if key in item), None)
+            if data is None:
+                continue
+            try:
+                panels.append(template(data))
+                selected += 1
+            except (KeyError, TypeError, ValueError, ZeroDivisionError) as e:
+                logger.warning("Template %s non applicabile: %r", template.__name__, e)
+    return panels
+
+
+def create_cross_domain_chart(results: dict[str, list[dict]], title: str) -> GraphData | None:
+    """
+    Compone in una figura a subplot i template dei risultati disponibili.
+    Ritorna None se nessun risultato è rappresentabile.
+    """
+    panels = _select_panels(results)
+    if not panels:
+        return None
+
+    rows = math.ceil(len(panels) / COLUMNS)
+    cells = [(i // COLUMNS + 1, i % COLUMNS + 1) for i in range(len(panels))]
+    specs = [[None] * COLUMNS for _ in range(rows)]
+    for (row, col), panel in zip(cells, panels):
+        trace_types = {trace.get("type") for trace in panel["plotly_json"]["data"]}
+        specs[row - 1][col - 1] = {"type": "domain" if trace_types & _DOMAIN_TRACES else "xy"}
+    # Con un numero dispari di pannelli l'ultimo occupa tutta la riga
+    if len(panels) % COLUMNS:
+        specs[-1] = [dict(specs[-1][0], colspan=COLUMNS)] + [None] * (COLUMNS - 1)
+
+    fig = fs.make_subplots(
+        rows=rows, cols=COLUMNS,
+        specs=specs,
+        subplot_titles=[panel["title"] for panel in panels],
+        vertical_spacing=0.5 / rows if rows > 1 else 0.1,
+        horizontal_spacing=0.12
+    )
+
+    for (row, col), panel in zip(cells, panels):
+        layout = panel["plotly_json"].get("layout", {})
+        for trace in panel["plotly_json"]["data"]:
+            fig.add_trace(trace, row=row, col=col)
+        if specs[row - 1][col - 1]["type"] == "xy":
+            fig.update_xaxes(title_text=layout.get("xaxis", {}).get("title", {}).get("text"), row=row, col=col)
+            fig.update_yaxes(title_text=layout.get("yaxis", {}).get("title", {}).get("text"), row=row, col=col)
+            # Linee di riferimento dei template (es. la media della frequenza cardiaca)
+            for shape in layout.get("shapes", []):
+                if shape.get("type") == "line" and shape.get("y0") == shape.get("y1"):
+                    fig.add_hline(y=shape["y0"], line_dash="dash", line_color="gray", row=row, col=col)
+
+    fig.update_layout(
+        title=title,
+        height=ROW_HEIGHT * rows + 120,
+        showlegend=False,
+        margin=dict(t=120, b=40, l=60, r=40)
+    )
+
+    return {
+        "id": "correlation_chart",
+        "title": title,
+        "type": "plotly",
+        "plotly_json": fig.to_dict()
+    }
@@ -0,0 +1,183 @@
+"""
+Cache dei dataset CSV e dei risultati dei tool di analisi.
+
+- load_dataset: ogni CSV viene letto e parsato (colonne data) una sola volta e
+  ricaricato solo se il file cambia su disco (mtime).
+- tool_result_cache: memoizza i risultati dei tool analyze_* per (tool, soggetto,
+  periodo, versione del dataset). Le computazioni in corso sono condivise: se un
+  agente chiama un tool mentre il prefetch speculativo lo sta già calcolando,
+  attende lo stesso risultato invece di ricalcolarlo.
+
+I DataFrame restituiti da load_dataset sono condivisi: vanno filtrati/copiati,
+mai modificati in place.
+"""
+
+from __future__ import annotations
+
+import copy
+import functools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+
+TOOL_RESULT_CACHE_SIZE = 256
+
+_datasets: dict[str, tuple[int, pd.DataFrame]] = {}
+_dataset_locks: dict[str, threading.Lock] = {}
+_datasets_lock = threading.Lock()
+
+
+def dataset_version(path: Path | str) -> int | None:
+    """Versione del file (mtime in ns), None se il file non esiste"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_dataset(path: Path | str, date_columns: tuple[str, ...] = ()) -> pd.DataFrame:
+    """Legge il CSV una sola volta (con le colonne data già convertite) e lo restituisce dalla cache"""
+    key = str(path)
+    with _datasets_lock:
+        lock = _dataset_locks.setdefault(key, threading.Lock())
+
+    with lock:
+        version = dataset_version(path)
+        cached = _datasets.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        df = pd.read_csv(path)
+        for column in date_columns:
+            df[column] = pd.to_datetime(df[column])
+
+        _datasets[key] = (version, df)
+        return df
+
+
+def clear_datasets() -> None:
+    with _datasets_lock:
+        _datasets.clear()
+
+
+# Insieme in cui registrare le chiavi dei risultati speculativi (None = calcolo non speculativo)
+_speculative: ContextVar[set | None] = ContextVar("speculative", default=None)
+
+
+@contextmanager
+def speculative_context(keys: set):
+    """
+    I risultati calcolati in questo contesto sono marcati come speculativi e le loro chiavi
+    aggiunte a keys, così chi li ha richiesti può riconciliare solo i propri
+    """
+    token = _speculative.set(keys)
+    try:
+        yield
+    finally:
+        _speculative.reset(token)
+
+
+@dataclass
+class _CacheEntry:
+    future: Future
+    speculative: bool
+
+
+class ToolResultCache:
+    """Cache LRU thread-safe dei risultati dei tool, con deduplicazione delle computazioni in corso"""
+
+    def __init__(self, max_entries: int = TOOL_RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        speculative_keys = _speculative.get()
+        speculative = speculative_keys is not None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if not speculative:
+                    # Un uso reale conferma il risultato speculativo
+                    entry.speculative = False
+                owner = False
+            else:
+                entry = _CacheEntry(future=Future(), speculative=speculative)
+                self._entries[key] = entry
+                if speculative:
+                    speculative_keys.add(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                owner = True
+
+        if owner:
+            try:
+                result = compute()
+            except BaseException as e:
+                entry.future.set_exception(e)
+                self._discard(key, entry)
+                raise
+            entry.future.set_result(result)
+            # Gli errori (soggetto inesistente, file mancante, ...) non vengono memorizzati
+            if isinstance(result, dict) and "error" in result:
+                self._discard(key, entry)
+
+        return copy.deepcopy(entry.future.result())
+
+    def _discard(self, key: Hashable, entry: _CacheEntry) -> None:
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+    def reconcile(self, keys: set, keep: Callable[[Hashable], bool]) -> int:
+        """
+        Tra i risultati speculativi con chiave in keys (quelli di un solo prefetch: le voci
+        speculative delle altre richieste non vengono toccate) conferma quelli per cui
+        keep(key) è True e scarta gli altri. Restituisce il numero di risultati scartati.
+        """
+        discarded = 0
+        with self._lock:
+            for key in list(keys):
+                entry = self._entries.get(key)
+                if entry is None or not entry.speculative:
+                    continue
+                if keep(key):
+                    entry.speculative = False
+                else:
+                    del self._entries[key]
+                    discarded += 1
+        return discarded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+tool_result_cache = ToolResultCache()
+
+
+def cached_tool_result(dataset_path: Path | str):
+    """
+    Decoratore per le funzioni dei tool analyze_*(subject_id, period).
+    Va applicato sotto @tool: la firma e la docstring originali restano visibili all'LLM.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(subject_id, period):
+            key = (func.__name__, subject_id, period, dataset_version(dataset_path))
+            return tool_result_cache.get_or_compute(key, lambda: func(subject_id, period))
+
+        return wrapper
+
+    return decorator
+
@@ -0,0 +1,171 @@
+"""
+Riduzione delle serie temporali lunghe prima di disegnarle.
+
+Con periodi di più anni una serie giornaliera (o per evento) porta migliaia di punti nel
+JSON della figura e nel browser. time_series_trace() costruisce la traccia di una serie
+rispettando un budget di punti:
+
+- entro il budget la serie resta intera
+- oltre il budget viene ridotta con LTTB (Largest-Triangle-Three-Buckets, mantiene la
+  forma della curva) oppure min-max (minimo e massimo di ogni bucket, mantiene i picchi);
+  i punti mostrati sono valori originali, e l'hover di ciascuno riporta gli aggregati
+  del bucket che rappresenta (intervallo, media, minimo, massimo, numero di valori)
+- oltre una soglia di punti disegnati la traccia diventa scattergl (rendering WebGL)
+
+Budget, metodo e soglia vengono da CHART_MAX_POINTS, CHART_DOWNSAMPLING e
+CHART_WEBGL_THRESHOLD in settings.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+
+from backend.utils import figure_spec as fs
+from backend.utils.series import values_array
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("lttb", "minmax")
+
+
+def _numeric_x(x: Sequence[Any]) -> np.ndarray:
+    """Ascisse numeriche per LTTB: timestamp se x sono date, altrimenti la posizione"""
+    try:
+        return np.asarray(x, dtype="datetime64[ns]").astype(np.int64).astype(float)
+    except (TypeError, ValueError):
+        try:
+            return np.asarray(x, dtype=float)
+        except (TypeError, ValueError):
+            return np.arange(len(x), dtype=float)
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    """Confini di buckets intervalli contigui che coprono gli indici [0, n)"""
+    return np.linspace(0, n, buckets + 1).astype(int)
+
+
+def lttb_indices(x: Sequence[Any], y: Sequence[float], max_points: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Indici dei punti scelti da LTTB e, per ciascuno, il bucket [inizio, fine) che rappresenta.
+    Primo e ultimo punto sono sempre mantenuti.
+    """
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        indices = np.arange(n)
+        return indices, np.stack([indices, indices + 1], axis=1)
+
+    xs, ys = _numeric_x(x), np.asarray(y, dtype=float)
+    # I punti interni sono divisi in max_points - 2 bucket
+    edges = _bucket_edges(n - 2, max_points - 2) + 1
+    # Vertice "successivo" del triangolo di ogni bucket: media del bucket seguente
+    # (per l'ultimo bucket, l'ultimo punto)
+    counts = np.diff(edges)
+    next_x = np.append((np.add.reduceat(xs[1:-1], edges[:-1] - 1) / counts)[1:], xs[-1])
+    next_y = np.append((np.add.reduceat(ys[1:-1], edges[:-1] - 1) / counts)[1:], ys[-1])
+    xs_list, ys_list = xs.tolist(), ys.tolist()
+    indices = np.empty(max_points, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for b in range(max_points - 2):
+        # Punto del bucket che forma il triangolo di area massima col punto scelto prima
+        px, py, nx, ny = xs_list[previous], ys_list[previous], next_x[b], next_y[b]
+        start, end = int(edges[b]), int(edges[b + 1])
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            area = abs((px - nx) * (ys_list[i] - py) - (px - xs_list[i]) * (ny - py))
+            if area > best_area:
+                best, best_area = i, area
+        previous = best
+        indices[b + 1] = previous
+
+    buckets = np.empty((max_points, 2), dtype=int)
+    buckets[0], buckets[-1] = (0, 1), (n - 1, n)
+    buckets[1:-1, 0], buckets[1:-1, 1] = edges[:-1], edges[1:]
+    return indices, buckets
+
+
+def minmax_indices(y: Sequence[float], max_points: int) -> tuple[np.ndarray, np.ndarray]:
+    """Minimo e massimo (in ordine di tempo) di max_points // 2 bucket, con il bucket di ciascuno"""
+    n = len(y)
+    if n <= max_points or max_points < 2:
+        indices = np.arange(n)
+        return indices, np.stack([indices, indices + 1], axis=1)
+
+    ys = np.asarray(y, dtype=float)
+    edges = _bucket_edges(n, max_points // 2)
+    indices, buckets = [], []
+    for start, end in zip(edges[:-1], edges[1:]):
+        chunk = ys[start:end]
+        for index in sorted({start + int(chunk.argmin()), start + int(chunk.argmax())}):
+            indices.append(index)
+            buckets.append((start, end))
+    return np.asarray(indices), np.asarray(buckets)
+
+
+def _bucket_aggregates(x: list, y: Sequence[float], buckets: np.ndarray) -> list[list]:
+    """[primo x, ultimo x, media, minimo, massimo, numero di valori] del bucket di ogni punto"""
+    # I bucket sono contigui e ordinati; con min-max due punti condividono lo stesso bucket
+    starts, positions = np.unique(buckets[:, 0], return_inverse=True)
+    values = np.asarray(y, dtype=float)
+    counts = np.diff(np.append(starts, len(values)))
+    means = (np.add.reduceat(values, starts) / counts).tolist()
+    minima = np.minimum.reduceat(values, starts).tolist()
+    maxima = np.maximum.reduceat(values, starts).tolist()
+    ends = (starts + counts - 1).tolist()
+    starts, counts = starts.tolist(), counts.tolist()
+    return [
+        [x[starts[b]], x[ends[b]], means[b], minima[b], maxima[b], counts[b]]
+        for b in positions.tolist()
+    ]
+
+
+def time_series_trace(x: Sequence[Any], y: Sequence[float] | Mapping[str, str], value_label: str, unit: str,
+                      max_points: int | None = None, method: str | None = None,
+                      webgl_threshold: int | None = None, **props) -> dict[str, Any]:
+    """
+    Traccia scatter/scattergl della serie (x, y) entro il budget di punti.
+    y può essere anche un typed array Plotly (valori di una DailySeries).
+    props sono le altre proprietà della traccia (mode, line, marker, name, ...).
+    """
+    from backend.config.settings import CHART_DOWNSAMPLING, CHART_MAX_POINTS, CHART_WEBGL_THRESHOLD
+
+    max_points = CHART_MAX_POINTS if max_points is None else max_points
+    method = CHART_DOWNSAMPLING if method is None else method
+    webgl_threshold = CHART_WEBGL_THRESHOLD if webgl_threshold is None else webgl_threshold
+    if method not in METHODS:
+        raise ValueError(f"Metodo di downsampling sconosciuto: {method!r} (ammessi: {', '.join(METHODS)})")
+
+    x = list(x)
+    # Liste e typed array vanno a Plotly così come sono; NumPy serve solo per ridurre la serie
+    values = values_array(y) if isinstance(y, Mapping) else np.asarray(y, dtype=float)
+    if len(values) <= max_points:
+        trace = dict(
+            props, x=x, y=y if isinstance(y, (list, Mapping)) else values.tolist(),
+            hovertemplate=f"<b>%{{x}}</b><br>{value_label}: %{{y:.1f}} {unit}<extra></extra>"
+        )
+    else:
+        if method == "lttb":
+            indices, buckets = lttb_indices(x, values, max_points)
+        else:
+            indices, buckets = minmax_indices(values, max_points)
+        customdata = _bucket_aggregates(x, values, buckets)
+        trace = dict(
+            props,
+            x=[x[i] for i in indices.tolist()],
+            y=values[indices].tolist(),
+            customdata=customdata,
+            hovertemplate=(
+                "<b>%{customdata[0]} - %{customdata[1]}</b><br>"
+                f"{value_label} media: %{{customdata[2]:.1f}} {unit}<br>"
+                f"min %{{customdata[3]:.1f}} / max %{{customdata[4]:.1f}} {unit} "
+                "(%{customdata[5]} valori)<extra></extra>"
+            ),
+        )
+        logger.debug("Serie %s ridotta con %s: %d -> %d punti", value_label, method, len(values), len(indices))
+
+    if min(len(values), max_points) > webgl_threshold:
+        return fs.scattergl(**trace)
+    return fs.scatter(**trace)
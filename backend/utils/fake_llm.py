@@ -0,0 +1,471 @@
+"""
+Modello di chat simulato, per eseguire il grafo senza rete né chiavi Gemini.
+
+Con ``LLM_BACKEND=fake`` get_llm() restituisce un FakeChatModel al posto di ogni
+ChatGoogleGenerativeAI di LLM_CONFIGS, così si possono misurare throughput, latenze e
+comportamento dei retry dell'orchestrazione su una macchina senza rete.
+
+Le risposte sono plausibili per ogni punto del grafo che chiama l'LLM:
+
+- structured output (RouteSchema del conversational_router, Router dei supervisor):
+  i campi vengono compilati dallo schema, ``next`` segue una policy di routing
+  (planner se soggetto e dominio sono noti; worker -> visualizzazione -> FINISH nei team)
+- planner: JSON conforme a ExecutionPlan ricavato da parse_query_hints
+- agenti ReAct: una tool call con subject_id/period estratti dall'istruzione (o con i dati
+  presenti nel prompt per i tool di visualizzazione), poi una risposta testuale
+- prefissi in context cache (``cached_content``): risolti dal backend locale
+
+Latenza (tempo al primo token + millisecondi per token), token in uscita e iniezione
+di ResourceExhausted (429) sono configurabili da settings o per istanza.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, Iterator, AsyncIterator, Sequence
+
+from google.api_core import exceptions
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from backend.config.settings import (
+    FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_MS_PER_TOKEN,
+    FAKE_LLM_OUTPUT_TOKENS,
+    FAKE_LLM_ERROR_RATE,
+    FAKE_LLM_RETRY_DELAY_SECONDS,
+    FAKE_LLM_SEED,
+)
+from backend.utils.query_hints import DEFAULT_PERIOD, QueryHints, parse_query_hints
+
+logger = logging.getLogger(__name__)
+
+# Stessa stima di context_cache: 4 caratteri per token
+CHARS_PER_TOKEN = 4
+
+CORRELATION_KEYWORDS = ["correla", "relazion", "collegat", "confront", "paragon", " vs ", "rispetto a",
+                        "influenz", "dipend", "impatto", "effetto"]
+
+DOMAIN_ASPECTS = {
+    "sleep_team": "il sonno",
+    "kitchen_team": "l'attività in cucina",
+    "mobility_team": "la mobilità",
+}
+
+# Codice eseguito dal python_repl_tool del graph generator (deve lasciare ``fig`` nel namespace)
+PLOT_CODE = """from plotly.subplots import make_subplots
+import plotly.graph_objects as go
+fig = make_subplots(rows=1, cols=1)
+fig.add_trace(go.Bar(x=["sonno", "cucina", "mobilità"], y=[1, 1, 1], name="domini analizzati"))
+fig.update_layout(title="Correlazione tra domini (grafico simulato)")
+"""
+
+# Frasi usate per comporre le risposte testuali
+SENTENCES = [
+    "I dati del periodo mostrano un andamento complessivamente regolare.",
+    "Non emergono anomalie rilevanti rispetto ai valori medi osservati.",
+    "La variabilità tra i giorni resta contenuta e coerente con le settimane precedenti.",
+    "Alcuni giorni presentano valori sotto la media, senza un trend persistente.",
+    "I grafici disponibili riassumono l'andamento delle metriche principali.",
+]
+
+_DATA_COLLECTED_RE = re.compile(r"Data collected: (\d+)")
+_LAST_DAYS_RE = re.compile(r"\blast_(\d+)_days\b")
+
+
+def parse_distribution(spec: str):
+    """
+    Campionatore da una specifica "tipo:parametri":
+    constant:v, uniform:min,max, normal:media,dev, lognormal:mediana,sigma, exponential:media.
+    Restituisce una funzione (random.Random) -> float, mai negativa.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    samplers = {
+        "constant": lambda rng, v: v,
+        "uniform": lambda rng, lo, hi: rng.uniform(lo, hi),
+        "normal": lambda rng, mean, std: rng.gauss(mean, std),
+        "lognormal": lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0,
+        "exponential": lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0,
+    }
+    if kind not in samplers:
+        raise ValueError(f"Distribuzione non supportata: {spec!r}")
+    return lambda rng: max(0.0, samplers[kind](rng, *values))
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _text(content: Any) -> str:
+    return content if isinstance(content, str) else json.dumps(content, default=str)
+
+
+@functools.cache
+def _plan_format_instructions() -> str:
+    from langchain_core.output_parsers import PydanticOutputParser
+    from backend.models.state import ExecutionPlan
+
+    return PydanticOutputParser(pydantic_object=ExecutionPlan).get_format_instructions()
+
+
+def _conversation_hints(messages: Sequence[BaseMessage]) -> QueryHints:
+    """Hints della domanda più recente, completati con soggetto, domini e periodo delle precedenti"""
+    questions = [_text(m.content) for m in messages if m.type == "human"]
+    if not questions:
+        return QueryHints()
+    hints = parse_query_hints(questions[-1])
+    explicit_period = hints.period != DEFAULT_PERIOD
+    for question in reversed(questions[:-1]):
+        previous = parse_query_hints(question)
+        hints.subject_id = hints.subject_id or previous.subject_id
+        hints.domains = hints.domains or previous.domains
+        if not explicit_period and previous.period != DEFAULT_PERIOD:
+            hints.period, explicit_period = previous.period, True
+    match = _LAST_DAYS_RE.search(questions[-1])
+    if match:
+        hints.period = match.group(0)
+    return hints
+
+
+def _period_text(period: str) -> str:
+    if "," in period:
+        start, end = period.split(",", 1)
+        return f"dal {start} al {end}"
+    match = _LAST_DAYS_RE.fullmatch(period)
+    return f"negli ultimi {match.group(1)} giorni" if match else period
+
+
+def _plan_json(hints: QueryHints) -> str:
+    subject_id = hints.subject_id
+    teams = hints.domains or ["sleep_team"]
+    tasks = []
+    for team in teams:
+        aspect = DOMAIN_ASPECTS[team]
+        if team == "sleep_team" and hints.heart_rate:
+            aspect += " e la frequenza cardiaca notturna"
+        tasks.append({
+            "team": team,
+            "instruction": f"Analizza {aspect} del soggetto {subject_id} {_period_text(hints.period)}",
+        })
+    return json.dumps({
+        "subject_id": subject_id,
+        "period": hints.period,
+        "cross_domain": len(teams) > 1 or hints.mentions(*CORRELATION_KEYWORDS),
+        "tasks": tasks,
+    }, ensure_ascii=False)
+
+
+def _prompt_data(messages: Sequence[BaseMessage]) -> list[dict]:
+    """Dizionari di dati presenti nell'ultimo prompt (JSON dopo 'Data:' / 'Available data:')"""
+    text = next((_text(m.content) for m in reversed(messages) if m.type == "human"), "")
+    start = text.find("{")
+    if start < 0:
+        return []
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text[start:])
+    except json.JSONDecodeError:
+        return []
+
+    candidates = []
+
+    def collect(value):
+        if isinstance(value, dict):
+            if "results" in value and isinstance(value["results"], list):
+                for item in value["results"]:
+                    collect(item)
+            elif "error" not in value:
+                candidates.append(value)
+                for item in value.values():
+                    if isinstance(item, dict):
+                        collect(item)
+
+    for value in data.values() if isinstance(data, dict) else []:
+        collect(value)
+    return candidates
+
+
+def _matching_data(schema: dict, candidates: list[dict]) -> dict | None:
+    """Primo dizionario che contiene tutti i campi richiesti dallo schema (object)"""
+    required = set(schema.get("required") or schema.get("properties", {}))
+    if not required:
+        return None
+    return next((c for c in candidates if required <= c.keys()), None)
+
+
+def _route(options: list[str], messages: Sequence[BaseMessage], hints: QueryHints) -> str:
+    """Policy di routing per i campi ``next`` (conversational_router e supervisor dei team)"""
+    if "planner" in options:
+        return "planner" if hints.subject_id and hints.domains else "FINISH"
+
+    if "FINISH" not in options:
+        return options[0]
+
+    context = "\n".join(_text(m.content) for m in messages)
+    match = _DATA_COLLECTED_RE.search(context)
+    collected = int(match.group(1)) if match else 0
+    cross_domain = "Cross-domain mode: True" in context
+    visualized = any(_text(m.content).startswith("Visualization") for m in messages)
+
+    workers = [o for o in options if o != "FINISH" and "visualization" not in o]
+    visualizations = [o for o in options if "visualization" in o]
+
+    if workers and collected == 0:
+        return workers[0]
+    question = parse_query_hints(context.split("Original user question:", 1)[-1].split("\n", 1)[0])
+    heart_workers = [w for w in workers if "heart" in w]
+    if collected == 1 and question.heart_rate and heart_workers and heart_workers[0] != workers[0]:
+        return heart_workers[0]
+    if visualizations and not cross_domain and not visualized:
+        return visualizations[0]
+    return "FINISH"
+
+
+class _ResponseContext:
+    """Informazioni ricavate dalla richiesta per compilare risposte e argomenti"""
+
+    def __init__(self, messages: Sequence[BaseMessage], system_instruction: str):
+        self.messages = messages
+        self.system_instruction = system_instruction
+        self.hints = _conversation_hints(messages)
+        self._candidates: list[dict] | None = None
+
+    @property
+    def candidates(self) -> list[dict]:
+        if self._candidates is None:
+            self._candidates = _prompt_data(self.messages)
+        return self._candidates
+
+    def fill(self, name: str, schema: dict) -> Any:
+        enum = schema.get("enum")
+        if enum:
+            return _route(list(enum), self.messages, self.hints) if name == "next" else enum[0]
+        if name == "subject_id":
+            return self.hints.subject_id or 1
+        if name == "period":
+            return self.hints.period
+        if name == "code":
+            return PLOT_CODE
+        if name == "response":
+            if self.hints.subject_id and self.hints.domains:
+                return "Avvio l'analisi richiesta."
+            return ("Ciao! Posso analizzare sonno, cucina e mobilità dei soggetti monitorati: "
+                    "indicami l'ID del soggetto e il dominio da analizzare.")
+        type_ = schema.get("type")
+        if type_ == "object" and schema.get("properties"):
+            data = _matching_data(schema, self.candidates)
+            if data is not None:
+                return data
+            return {key: self.fill(key, sub) for key, sub in schema["properties"].items()
+                    if key in schema.get("required", [])}
+        return {"string": "", "integer": 0, "number": 0.0, "boolean": False,
+                "array": [], "object": {}}.get(type_)
+
+    def can_fill(self, parameters: dict) -> bool:
+        """False se un argomento object richiesto non ha dati corrispondenti nel prompt"""
+        for key in parameters.get("required", []):
+            schema = parameters["properties"][key]
+            if schema.get("type") == "object" and _matching_data(schema, self.candidates) is None:
+                return False
+        return True
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model simulato con lo stesso contratto dei client Gemini usati dal grafo"""
+
+    model: str = "gemini-2.5-flash"
+    max_output_tokens: int | None = None
+    # Parametro accettato come da ChatGoogleGenerativeAI (abilita il context caching)
+    cached_content: str | None = None
+
+    latency_ms: str = FAKE_LLM_LATENCY_MS
+    ms_per_token: float = FAKE_LLM_MS_PER_TOKEN
+    output_tokens: str = FAKE_LLM_OUTPUT_TOKENS
+    error_rate: float = FAKE_LLM_ERROR_RATE
+    retry_delay_seconds: int = FAKE_LLM_RETRY_DELAY_SECONDS
+    seed: int | None = int(FAKE_LLM_SEED) if FAKE_LLM_SEED else None
+
+    _rng: random.Random = PrivateAttr()
+    _latency = PrivateAttr()
+    _output_tokens = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(f"{self.seed}:{self.model}" if self.seed is not None else None)
+        self._latency = parse_distribution(self.latency_ms)
+        self._output_tokens = parse_distribution(self.output_tokens)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model": self.model, "latency_ms": self.latency_ms, "error_rate": self.error_rate}
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: str | bool | None = None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    # --- risposta simulata ---
+
+    def _resolve_cached_prefix(self, name: str) -> tuple[str, list[dict]]:
+        from backend.utils.context_cache import get_context_cache
+
+        cache = get_context_cache()
+        prefix = cache.backend.resolve(name) if cache else None
+        if prefix is None:
+            raise exceptions.NotFound(f"CachedContent {name} non trovato o scaduto")
+        return prefix.system_instruction, [convert_to_openai_tool(t) for t in prefix.tools]
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise exceptions.ResourceExhausted(
+                "429 Resource has been exhausted (simulato). "
+                f"retry_delay {{\n  seconds: {self.retry_delay_seconds}\n}}"
+            )
+
+    def _respond(self, messages: list[BaseMessage], kwargs: dict) -> AIMessage:
+        """Costruisce la risposta (con usage_metadata) senza attese"""
+        tools = list(kwargs.get("tools") or [])
+        system_instruction = "\n".join(_text(m.content) for m in messages if m.type == "system")
+        cached_tokens = 0
+        cached_content = kwargs.get("cached_content") or self.cached_content
+        if cached_content:
+            prefix_instruction, prefix_tools = self._resolve_cached_prefix(cached_content)
+            system_instruction = prefix_instruction + system_instruction
+            cached_tokens = estimate_tokens(prefix_instruction + json.dumps(prefix_tools))
+            tools = prefix_tools + tools
+
+        context = _ResponseContext(messages, system_instruction)
+        message = self._tool_call(context, tools, kwargs.get("tool_choice"))
+        if message is None:
+            if _plan_format_instructions() in system_instruction:
+                content = _plan_json(context.hints)
+            elif messages and isinstance(messages[-1], ToolMessage):
+                content = f"Analisi completata con {messages[-1].name}. FINAL ANSWER"
+            else:
+                content = self._filler(self._sample_output_tokens())
+            message = AIMessage(content=content)
+
+        input_tokens = cached_tokens + estimate_tokens(
+            "".join(_text(m.content) for m in messages) + (json.dumps(tools) if not cached_content else "")
+        )
+        output_tokens = max(1, estimate_tokens(_text(message.content) + json.dumps(
+            [call["args"] for call in message.tool_calls], default=str
+        )))
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cached_tokens},
+        }
+        message.response_metadata = {"model_name": self.model, "finish_reason": "STOP"}
+        return message
+
+    def _tool_call(self, context: _ResponseContext, tools: list[dict], tool_choice) -> AIMessage | None:
+        if not tools:
+            return None
+        forced = tool_choice not in (None, False, "none", "auto")
+        # Ciclo ReAct: dopo il risultato del tool si risponde in testo
+        if not forced and context.messages and isinstance(context.messages[-1], ToolMessage):
+            return None
+
+        functions = [t["function"] for t in tools]
+        if isinstance(tool_choice, str) and tool_choice not in ("any", "auto", "none"):
+            functions = [f for f in functions if f["name"] == tool_choice] or functions
+        function = next((f for f in functions if context.can_fill(f.get("parameters", {}))), None)
+        if function is None:
+            if not forced:
+                return None
+            function = functions[0]
+
+        parameters = function.get("parameters", {})
+        args = {key: context.fill(key, schema) for key, schema in parameters.get("properties", {}).items()}
+        return AIMessage(content="", tool_calls=[{
+            "name": function["name"], "args": args, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call",
+        }])
+
+    def _sample_output_tokens(self) -> int:
+        tokens = max(1, round(self._output_tokens(self._rng)))
+        return min(tokens, self.max_output_tokens) if self.max_output_tokens else tokens
+
+    @staticmethod
+    def _filler(tokens: int) -> str:
+        target = tokens * CHARS_PER_TOKEN
+        parts, length, i = [], 0, 0
+        while length < target:
+            sentence = SENTENCES[i % len(SENTENCES)]
+            parts.append(sentence)
+            length += len(sentence) + 1
+            i += 1
+        return " ".join(parts)[:target]
+
+    def _delays(self) -> tuple[float, float]:
+        """(secondi al primo token, secondi per token in uscita)"""
+        return self._latency(self._rng) / 1000, self.ms_per_token / 1000
+
+    # --- interfaccia BaseChatModel ---
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._maybe_fail()
+        message = self._respond(messages, kwargs)
+        first_token, per_token = self._delays()
+        time.sleep(first_token + per_token * message.usage_metadata["output_tokens"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._maybe_fail()
+        message = self._respond(messages, kwargs)
+        first_token, per_token = self._delays()
+        await asyncio.sleep(first_token + per_token * message.usage_metadata["output_tokens"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message: AIMessage) -> list[tuple[AIMessageChunk, int]]:
+        """Chunk dello streaming con il numero di token di ciascuno"""
+        if message.tool_calls:
+            chunk = AIMessageChunk(content="", tool_call_chunks=[{
+                "name": call["name"], "args": json.dumps(call["args"], default=str), "id": call["id"], "index": i,
+            } for i, call in enumerate(message.tool_calls)])
+            chunks = [(chunk, message.usage_metadata["output_tokens"])]
+        else:
+            words = re.findall(r"\S+\s*", message.content) or [""]
+            chunks = [(AIMessageChunk(content=word), max(1, estimate_tokens(word))) for word in words]
+        # usage_metadata solo sull'ultimo chunk (i chunk vengono sommati)
+        last, tokens = chunks[-1]
+        chunks[-1] = (AIMessageChunk(
+            content=last.content, tool_call_chunks=last.tool_call_chunks,
+            usage_metadata=message.usage_metadata, response_metadata=message.response_metadata,
+        ), tokens)
+        return chunks
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        message = self._respond(messages, kwargs)
+        first_token, per_token = self._delays()
+        time.sleep(first_token)
+        for chunk, tokens in self._chunks(message):
+            time.sleep(per_token * tokens)
+            if run_manager and isinstance(chunk.content, str) and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        message = self._respond(messages, kwargs)
+        first_token, per_token = self._delays()
+        await asyncio.sleep(first_token)
+        for chunk, tokens in self._chunks(message):
+            await asyncio.sleep(per_token * tokens)
+            if run_manager and isinstance(chunk.content, str) and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,217 @@
+"""
+Costruzione di figure Plotly come dict semplici, senza plotly.graph_objects.
+
+go.Figure / make_subplots validano ogni proprietà di ogni traccia e to_dict() copia
+tutto di nuovo; a noi serve solo la specifica JSON. Qui le stesse chiamate
+(Figure, make_subplots, add_trace, update_layout, update_xaxes/update_yaxes,
+add_hline, add_annotation, to_dict) producono direttamente il dict, con la stessa
+struttura di fig.to_dict() per i tipi di grafico che usiamo: indicator, pie, bar, box,
+heatmap, scatter e scattergl. Nessuna validazione: le proprietà vanno scritte giuste.
+
+Come in Plotly sono supportati gli underscore "magici" (marker_color ->
+{"marker": {"color": ...}}) e i titoli stringa vengono normalizzati in {"text": ...}.
+Il template resta un riferimento per nome (go.Figure e Plotly.js lo risolvono).
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any
+
+DEFAULT_TEMPLATE = "plotly"
+
+# Tipi di cella di make_subplots che occupano un dominio invece di una coppia di assi
+_DOMAIN_TYPES = {"domain", "indicator", "pie"}
+
+
+def _expand(props: dict[str, Any]) -> dict[str, Any]:
+    """Espande gli underscore magici e normalizza i titoli, ricorsivamente"""
+    result: dict[str, Any] = {}
+    for key, value in props.items():
+        if isinstance(value, dict):
+            value = _expand(value)
+        elif isinstance(value, (list, tuple)) and value and all(isinstance(item, dict) for item in value):
+            value = [_expand(item) for item in value]
+        elif isinstance(value, tuple):
+            value = list(value)
+        *path, leaf = key.split("_")
+        target = result
+        for part in path:
+            target = target.setdefault(part, {})
+        if leaf == "title" and isinstance(value, str):
+            value = {"text": value}
+        if isinstance(value, dict) and isinstance(target.get(leaf), dict):
+            _merge(target[leaf], value)
+        else:
+            target[leaf] = value
+    return result
+
+
+def _merge(target: dict[str, Any], update: dict[str, Any]) -> None:
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+
+
+def _trace(trace_type: str, props: dict[str, Any]) -> dict[str, Any]:
+    trace = _expand(props)
+    trace["type"] = trace_type
+    return trace
+
+
+def indicator(**props) -> dict[str, Any]:
+    return _trace("indicator", props)
+
+
+def pie(**props) -> dict[str, Any]:
+    return _trace("pie", props)
+
+
+def bar(**props) -> dict[str, Any]:
+    return _trace("bar", props)
+
+
+def box(**props) -> dict[str, Any]:
+    return _trace("box", props)
+
+
+def heatmap(**props) -> dict[str, Any]:
+    return _trace("heatmap", props)
+
+
+def scatter(**props) -> dict[str, Any]:
+    return _trace("scatter", props)
+
+
+def scattergl(**props) -> dict[str, Any]:
+    return _trace("scattergl", props)
+
+
+class Figure:
+    """Equivalente minimale di go.Figure che accumula la specifica in un dict"""
+
+    def __init__(self, data: dict | list[dict] | None = None, layout: dict[str, Any] | None = None):
+        if isinstance(data, dict):
+            data = [data]
+        self.data: list[dict[str, Any]] = list(data or [])
+        self.layout: dict[str, Any] = {"template": DEFAULT_TEMPLATE}
+        # (riga, colonna) -> cella della griglia creata da make_subplots
+        self._cells: dict[tuple[int, int], dict[str, Any]] = {}
+        if layout:
+            self.update_layout(**layout)
+
+    def _cell(self, row: int | None, col: int | None) -> dict[str, Any] | None:
+        if row is None or col is None:
+            return None
+        return self._cells[(row, col)]
+
+    def add_trace(self, trace: dict[str, Any], row: int | None = None, col: int | None = None) -> "Figure":
+        trace = dict(trace)
+        cell = self._cell(row, col)
+        if cell is not None:
+            if cell["type"] == "domain":
+                trace["domain"] = {"x": list(cell["x"]), "y": list(cell["y"])}
+            else:
+                trace["xaxis"], trace["yaxis"] = cell["xref"], cell["yref"]
+        self.data.append(trace)
+        return self
+
+    def update_layout(self, **props) -> "Figure":
+        _merge(self.layout, _expand(props))
+        return self
+
+    def _update_axes(self, axis: str, row: int | None, col: int | None, props: dict[str, Any]) -> None:
+        cell = self._cell(row, col)
+        if cell is not None:
+            names = [cell[f"{axis}axis"]]
+        else:
+            names = [cell[f"{axis}axis"] for cell in self._cells.values() if cell["type"] == "xy"] or [f"{axis}axis"]
+        for name in names:
+            _merge(self.layout.setdefault(name, {}), _expand(props))
+
+    def update_xaxes(self, row: int | None = None, col: int | None = None, **props) -> "Figure":
+        self._update_axes("x", row, col, props)
+        return self
+
+    def update_yaxes(self, row: int | None = None, col: int | None = None, **props) -> "Figure":
+        self._update_axes("y", row, col, props)
+        return self
+
+    def add_annotation(self, **props) -> "Figure":
+        self.layout.setdefault("annotations", []).append(_expand(props))
+        return self
+
+    def add_hline(self, y: float, row: int | None = None, col: int | None = None,
+                  annotation_text: str | None = None, annotation_position: str = "top right",
+                  **props) -> "Figure":
+        """Linea orizzontale su tutta la larghezza degli assi (come go.Figure.add_hline)"""
+        cell = self._cell(row, col)
+        xref, yref = (cell["xref"], cell["yref"]) if cell is not None else ("x", "y")
+        shape = {"type": "line", "x0": 0, "x1": 1, "xref": f"{xref} domain", "y0": y, "y1": y, "yref": yref}
+        _merge(shape, _expand(props))
+        self.layout.setdefault("shapes", []).append(shape)
+        if annotation_text is not None:
+            annotation = {"showarrow": False, "text": annotation_text, "xref": f"{xref} domain", "yref": yref, "y": y}
+            if "right" in annotation_position:
+                annotation.update(x=1, xanchor="right" if "top" in annotation_position or "bottom" in annotation_position else "left")
+            else:
+                annotation.update(x=0, xanchor="left")
+            annotation["yanchor"] = ("bottom" if "top" in annotation_position
+                                     else "top" if "bottom" in annotation_position else "middle")
+            self.layout.setdefault("annotations", []).append(annotation)
+        return self
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"data": copy.deepcopy(self.data), "layout": copy.deepcopy(self.layout)}
+
+
+def make_subplots(rows: int = 1, cols: int = 1, specs: list[list[dict | None]] | None = None,
+                  subplot_titles: list[str] | tuple[str, ...] | None = None,
+                  vertical_spacing: float | None = None, horizontal_spacing: float | None = None) -> Figure:
+    """Griglia di subplot con gli stessi domini, assi e titoli di plotly.subplots.make_subplots"""
+    specs = specs or [[{} for _ in range(cols)] for _ in range(rows)]
+    vertical_spacing = 0.3 / rows if vertical_spacing is None else vertical_spacing
+    horizontal_spacing = 0.2 / cols if horizontal_spacing is None else horizontal_spacing
+    width = (1 - horizontal_spacing * (cols - 1)) / cols
+    height = (1 - vertical_spacing * (rows - 1)) / rows
+    # Inizio di ogni colonna (da sinistra) e di ogni riga (dal basso), calcolati come in Plotly
+    col_start = [sum([width] * c) + c * horizontal_spacing for c in range(cols)]
+    row_start = [sum([height] * r) + r * vertical_spacing for r in range(rows)]
+
+    fig = Figure()
+    titles = list(subplot_titles or [])
+    annotations = []
+    axis_number = 0
+    for r, row_specs in enumerate(specs, start=1):
+        for c, spec in enumerate(row_specs, start=1):
+            if spec is None:
+                continue
+            colspan = spec.get("colspan", 1)
+            rowspan = spec.get("rowspan", 1)
+            x0 = col_start[c - 1]
+            x1 = col_start[c + colspan - 2] + width
+            # Errori di arrotondamento appena fuori da [0, 1]
+            y0 = min(max(row_start[rows - (r + rowspan - 1)], 0.0), 1.0)
+            y1 = min(max(row_start[rows - r] + height, 0.0), 1.0)
+            cell = {"x": [x0, x1], "y": [y0, y1]}
+            if spec.get("type", "xy") in _DOMAIN_TYPES:
+                cell["type"] = "domain"
+            else:
+                axis_number += 1
+                suffix = "" if axis_number == 1 else str(axis_number)
+                cell.update(type="xy", xaxis=f"xaxis{suffix}", yaxis=f"yaxis{suffix}",
+                            xref=f"x{suffix}", yref=f"y{suffix}")
+                fig.layout[cell["xaxis"]] = {"anchor": cell["yref"], "domain": [x0, x1]}
+                fig.layout[cell["yaxis"]] = {"anchor": cell["xref"], "domain": [y0, y1]}
+            fig._cells[(r, c)] = cell
+            if len(annotations) < len(titles):
+                annotations.append({
+                    "font": {"size": 16}, "showarrow": False, "text": titles[len(annotations)],
+                    "x": (x0 + x1) / 2, "xanchor": "center", "xref": "paper",
+                    "y": y1, "yanchor": "bottom", "yref": "paper",
+                })
+    if annotations:
+        fig.layout["annotations"] = annotations
+    return fig
@@ -0,0 +1,184 @@
+"""
+Blob store content-addressed per le figure Plotly.
+
+Le figure (fig.to_dict()) sono il payload più grande dello state: salvarle in
+State.graphs significa copiarle in ogni checkpoint di ogni superstep. Vengono quindi
+scritte una sola volta nel blob store, indicizzate per hash SHA-256 del JSON
+canonico, e nello state resta solo un GraphRef (id, titolo, tipo, blob_id).
+Figure identiche producono lo stesso blob_id e vengono salvate una volta sola.
+Prima del salvataggio la figura viene compattata (backend.utils.plotly_payload).
+
+Backend disponibili (GRAPH_STORE_BACKEND):
+- "fs": un file JSON per blob sotto GRAPH_STORE_PATH
+- "sqlite": una tabella in un database SQLite (WAL)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any
+
+from backend.config.settings import (
+    GRAPH_STORE_BACKEND,
+    GRAPH_STORE_PATH,
+    PLOTLY_COMPACT_PAYLOAD,
+    PLOTLY_FLOAT_DECIMALS,
+    PLOTLY_TYPED_ARRAYS,
+)
+from backend.models.state import GraphData, GraphRef
+from backend.utils.plotly_payload import compact_figure
+
+logger = logging.getLogger(__name__)
+
+# blob_id valido: SHA-256 esadecimale minuscolo (blob_id_for)
+_BLOB_ID_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def encode_figure(figure: dict[str, Any]) -> bytes:
+    """JSON canonico (chiavi ordinate, senza spazi) della figura; gestisce array NumPy e date"""
+    from plotly.utils import PlotlyJSONEncoder
+
+    return json.dumps(figure, cls=PlotlyJSONEncoder, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def blob_id_for(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_valid_blob_id(blob_id: str) -> bool:
+    """True se blob_id ha la forma di un id generato da blob_id_for (niente percorsi arbitrari)"""
+    return isinstance(blob_id, str) and _BLOB_ID_PATTERN.fullmatch(blob_id) is not None
+
+
+class FilesystemGraphStore:
+    """Un file per blob: <root>/<primi 2 caratteri dell'id>/<id>.json"""
+
+    def __init__(self, root: Path | str):
+        self.root = Path(root)
+
+    def _path(self, blob_id: str) -> Path:
+        # blob_id arriva anche dall'URL di /graphs/{blob_id}: solo id validi diventano percorsi
+        if not is_valid_blob_id(blob_id):
+            raise ValueError(f"blob_id non valido: {blob_id!r}")
+        return self.root / blob_id[:2] / f"{blob_id}.json"
+
+    def put_bytes(self, blob_id: str, data: bytes) -> None:
+        path = self._path(blob_id)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Scrittura atomica: un lettore concorrente non vede mai un file parziale
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def get_bytes(self, blob_id: str) -> bytes | None:
+        try:
+            return self._path(blob_id).read_bytes()
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+class SQLiteGraphStore:
+    """Blob in una tabella SQLite, una connessione per thread"""
+
+    def __init__(self, path: Path | str):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS graph_blobs ("
+                "blob_id TEXT PRIMARY KEY, data BLOB NOT NULL, "
+                "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put_bytes(self, blob_id: str, data: bytes) -> None:
+        with self._connection() as conn:
+            conn.execute("INSERT OR IGNORE INTO graph_blobs (blob_id, data) VALUES (?, ?)", (blob_id, data))
+
+    def get_bytes(self, blob_id: str) -> bytes | None:
+        row = self._connection().execute(
+            "SELECT data FROM graph_blobs WHERE blob_id = ?", (blob_id,)
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+
+_graph_store = None
+_graph_store_lock = threading.Lock()
+
+
+def get_graph_store():
+    """Store condiviso configurato da GRAPH_STORE_BACKEND / GRAPH_STORE_PATH"""
+    global _graph_store
+    with _graph_store_lock:
+        if _graph_store is None:
+            if GRAPH_STORE_BACKEND == "sqlite":
+                _graph_store = SQLiteGraphStore(GRAPH_STORE_PATH)
+            else:
+                _graph_store = FilesystemGraphStore(GRAPH_STORE_PATH)
+    return _graph_store
+
+
+def store_graph(graph: GraphData) -> GraphRef:
+    """Salva la figura nel blob store e restituisce il riferimento da mettere nello state"""
+    figure = graph["plotly_json"]
+    if PLOTLY_COMPACT_PAYLOAD:
+        figure, stats = compact_figure(figure, PLOTLY_FLOAT_DECIMALS, PLOTLY_TYPED_ARRAYS)
+        logger.info(
+            "Grafico %s compattato: %d -> %d byte (-%d, template %s, %d typed array)",
+            graph["id"], stats["original_bytes"], stats["compact_bytes"], stats["saved_bytes"],
+            stats["template"], stats["typed_arrays"]
+        )
+    data = encode_figure(figure)
+    blob_id = blob_id_for(data)
+    get_graph_store().put_bytes(blob_id, data)
+    return GraphRef(id=graph["id"], title=graph["title"], type=graph["type"], blob_id=blob_id)
+
+
+def load_figure_bytes(blob_id: str) -> bytes | None:
+    """JSON della figura così come salvato (per servirlo senza decodificarlo)"""
+    return get_graph_store().get_bytes(blob_id)
+
+
+def resolve_graph(ref: GraphRef | GraphData) -> GraphData | None:
+    """Ricostruisce il GraphData completo da un riferimento (None se il blob non esiste)"""
+    if "plotly_json" in ref:
+        # Grafico già completo (es. checkpoint precedenti al blob store)
+        return ref
+    data = load_figure_bytes(ref["blob_id"])
+    if data is None:
+        logger.warning("Blob %s del grafico %s non trovato", ref["blob_id"], ref["id"])
+        return None
+    return GraphData(id=ref["id"], title=ref["title"], type=ref["type"], plotly_json=json.loads(data))
+
+
+def resolve_graphs(refs: list[GraphRef] | None) -> list[GraphData]:
+    graphs = []
+    for ref in refs or []:
+        graph = resolve_graph(ref)
+        if graph is not None:
+            graphs.append(graph)
+    return graphs
@@ -3,8 +3,6 @@ Template Plotly per la generazione di grafici basati sui TypedDict.
 Ogni template è una funzione che riceve dati strutturati e ritorna una specifica Plotly.
 """
 
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from typing import Any
 
 from backend.models.results import (
@@ -18,6 +16,10 @@ from backend.models.results import (
     DailyHeartRateResult
 )
 from backend.models.state import GraphData
+from backend.utils.downsampling import time_series_trace
+from backend.utils.series import plotly_values, series_dates, series_values
+# Figure costruite come dict (senza i validatori di plotly.graph_objects)
+from backend.utils import figure_spec as fs
 
 
 # =============================================================================
@@ -41,7 +43,7 @@ def create_sleep_phases_pie(data: SleepDistributionResult) -> GraphData:
     # Colori standard medicina del sonno
     colors = ['#9B59B6', '#3498DB', '#85C1E2']
 
-    fig = go.Figure(data=[go.Pie(
+    fig = fs.Figure(data=[fs.pie(
         labels=labels,
         values=values,
         hole=0.3,
@@ -90,7 +92,7 @@ def create_sleep_efficiency_gauge(data: SleepDistributionResult) -> GraphData:
     """
     efficiency = data["sleep_efficiency"]
 
-    fig = go.Figure(go.Indicator(
+    fig = fs.Figure(fs.indicator(
         mode="gauge+number+delta",
         value=efficiency,
         domain={'x': [0, 1], 'y': [0, 1]},
@@ -133,7 +135,7 @@ def create_sleep_statistics_dashboard(data: SleepStatisticsResult) -> GraphData:
 
     Mostra 4 metriche principali con media e deviazione standard.
     """
-    fig = make_subplots(
+    fig = fs.make_subplots(
         rows=2, cols=2,
         subplot_titles=(
             "Durata Totale",
@@ -153,7 +155,7 @@ def create_sleep_statistics_dashboard(data: SleepStatisticsResult) -> GraphData:
     total_sleep_avg = data["total_sleep_time"]["average"] / 60
     total_sleep_std = data["total_sleep_time"]["std_dev"] / 60
 
-    fig.add_trace(go.Indicator(
+    fig.add_trace(fs.indicator(
         mode="number+delta",
         value=total_sleep_avg,
         delta={
@@ -170,7 +172,7 @@ def create_sleep_statistics_dashboard(data: SleepStatisticsResult) -> GraphData:
     deep_avg = data["deep_sleep_duration"]["average"]
     deep_std = data["deep_sleep_duration"]["std_dev"]
 
-    fig.add_trace(go.Indicator(
+    fig.add_trace(fs.indicator(
         mode="number+delta",
         value=deep_avg,
         delta={
@@ -187,7 +189,7 @@ def create_sleep_statistics_dashboard(data: SleepStatisticsResult) -> GraphData:
     wakeup_avg = data["wakeup_count"]["average"]
     wakeup_std = data["wakeup_count"]["std_dev"]
 
-    fig.add_trace(go.Indicator(
+    fig.add_trace(fs.indicator(
         mode="number+delta",
         value=wakeup_avg,
         delta={
@@ -203,7 +205,7 @@ def create_sleep_statistics_dashboard(data: SleepStatisticsResult) -> GraphData:
     hr_avg = data["hr_average"]["average"]
     hr_std = data["hr_average"]["std_dev"]
 
-    fig.add_trace(go.Indicator(
+    fig.add_trace(fs.indicator(
         mode="number+delta",
         value=hr_avg,
         delta={
@@ -244,7 +246,7 @@ def create_sleep_quality_bars(data: SleepQualityCorrelationResult) -> GraphData:
 
     colors = ['#E67E22', '#E74C3C']
 
-    fig = go.Figure(data=[go.Bar(
+    fig = fs.Figure(data=[fs.bar(
         x=metrics,
         y=values,
         marker=dict(color=colors),
@@ -307,7 +309,7 @@ def create_sleep_correlation_heatmap(data: SleepQualityCorrelationResult) -> Gra
                 )
             )
 
-    fig = go.Figure(data=go.Heatmap(
+    fig = fs.Figure(data=fs.heatmap(
         z=z_values,
         x=x_labels,
         y=y_labels,
@@ -397,12 +399,12 @@ def create_sleep_variability_box(data: SleepStatisticsResult) -> GraphData:
 
     all_data = [total_data, rem_data, deep_data, light_data]
 
-    fig = go.Figure()
+    fig = fs.Figure()
 
     colors = ['#3498DB', '#9B59B6', '#2ECC71', '#85C1E2']
 
     for i, (name, stats, color) in enumerate(zip(metrics_names, all_data, colors)):
-        fig.add_trace(go.Box(
+        fig.add_trace(fs.box(
             y=[stats["min"], stats["q1"], stats["median"], stats["q3"], stats["max"]],
             name=name,
             marker_color=color,
@@ -445,7 +447,7 @@ def create_kitchen_statistics_dashboard(data: KitchenStatisticsResult) -> GraphD
 
     Mostra 3 metriche principali con media e deviazione standard.
     """
-    fig = make_subplots(
+    fig = fs.make_subplots(
         rows=1, cols=3,
         subplot_titles=(
             "Durata Attività",
@@ -460,7 +462,7 @@ def create_kitchen_statistics_dashboard(data: KitchenStatisticsResult) -> GraphD
     duration_avg = data["duration_minutes"]["average"]
     duration_std = data["duration_minutes"]["std_dev"]
 
-    fig.add_trace(go.Indicator(
+    fig.add_trace(fs.indicator(
         mode="number+delta",
         value=duration_avg,
         delta={
@@ -477,7 +479,7 @@ def create_kitchen_statistics_dashboard(data: KitchenStatisticsResult) -> GraphD
     temp_avg = data["temperature_max"]["average"]
     temp_std = data["temperature_max"]["std_dev"]
 
-    fig.add_trace(go.Indicator(
+    fig.add_trace(fs.indicator(
         mode="number+delta",
         value=temp_avg,
         delta={
@@ -494,7 +496,7 @@ def create_kitchen_statistics_dashboard(data: KitchenStatisticsResult) -> GraphD
     freq_avg = data["activities_per_day"]["average"]
     freq_std = data["activities_per_day"]["std_dev"]
 
-    fig.add_trace(go.Indicator(
+    fig.add_trace(fs.indicator(
         mode="number+delta",
         value=freq_avg,
         delta={
@@ -543,7 +545,7 @@ def create_kitchen_timeslot_bar(data: KitchenUsagePatternResult) -> GraphData:
 
     colors = ['#F39C12', '#E67E22', '#C0392B']
 
-    fig = go.Figure(data=[go.Bar(
+    fig = fs.Figure(data=[fs.bar(
         x=slots,
         y=values,
         marker=dict(color=colors),
@@ -588,7 +590,7 @@ def create_kitchen_duration_by_timeslot(data: KitchenUsagePatternResult) -> Grap
 
     colors = ['#F39C12', '#E67E22', '#C0392B']
 
-    fig = go.Figure(data=[go.Bar(
+    fig = fs.Figure(data=[fs.bar(
         x=slots,
         y=durations,
         marker=dict(color=colors),
@@ -630,7 +632,7 @@ def create_kitchen_temperature_distribution(data: KitchenTemperatureAnalysisResu
 
     colors = ['#3498DB', '#F39C12', '#E74C3C']
 
-    fig = go.Figure(data=[go.Bar(
+    fig = fs.Figure(data=[fs.bar(
         x=categories,
         y=values,
         marker=dict(color=colors),
@@ -667,7 +669,7 @@ def create_kitchen_temperature_gauge(data: KitchenTemperatureAnalysisResult) ->
     min_temp = data["min_temperature"]
     max_temp = data["max_temperature"]
 
-    fig = go.Figure(go.Indicator(
+    fig = fs.Figure(fs.indicator(
         mode="gauge+number+delta",
         value=avg_temp,
         domain={'x': [0, 1], 'y': [0, 1]},
@@ -731,7 +733,7 @@ def create_kitchen_temp_by_timeslot(data: KitchenTemperatureAnalysisResult) -> G
 
     colors = ['#F39C12', '#E67E22', '#C0392B']
 
-    fig = go.Figure(data=[go.Bar(
+    fig = fs.Figure(data=[fs.bar(
         x=slots,
         y=temperatures,
         marker=dict(color=colors),
@@ -791,10 +793,10 @@ def create_kitchen_variability_box(data: KitchenStatisticsResult) -> GraphData:
     all_data = [duration_data, temp_data]
     colors = ['#E67E22', '#E74C3C']
 
-    fig = go.Figure()
+    fig = fs.Figure()
 
     for i, (name, stats, color) in enumerate(zip(metrics_names, all_data, colors)):
-        fig.add_trace(go.Box(
+        fig.add_trace(fs.box(
             y=[stats["min"], stats["q1"], stats["median"], stats["q3"], stats["max"]],
             name=name,
             marker_color=color,
@@ -838,7 +840,7 @@ def create_mobility_room_bars(data: MobilityAnalysisResult) -> GraphData:
     counts = [count for _, count in sorted_rooms]
     percentages = [room_pct[room] for room, _ in sorted_rooms]
 
-    fig = go.Figure(data=[go.Bar(
+    fig = fs.Figure(data=[fs.bar(
         x=rooms,
         y=counts,
         text=[f"{count}<br>{pct:.1f}%" for count, pct in zip(counts, percentages)],
@@ -888,7 +890,7 @@ def create_mobility_timeslot_bar(data: MobilityAnalysisResult) -> GraphData:
 
     colors = ['#34495E', '#F39C12', '#3498DB', '#9B59B6'][:len(values)]
 
-    fig = go.Figure(data=[go.Bar(
+    fig = fs.Figure(data=[fs.bar(
         x=slots,
         y=values,
         marker=dict(color=colors),
@@ -917,30 +919,28 @@ def create_mobility_timeslot_bar(data: MobilityAnalysisResult) -> GraphData:
 def create_heart_rate_line(data: DailyHeartRateResult) -> GraphData:
     """
     Genera un grafico a linee per la frequenza cardiaca giornaliera.
-    Base: daily_avg_hr (dict con date come chiavi)
+    Base: daily_avg_hr (serie colonnare, già in ordine di data)
     """
     daily_hr = data["daily_avg_hr"]
+    dates = series_dates(daily_hr)
+    hr_array = series_values(daily_hr)
 
-    # Ordina per data
-    sorted_items = sorted(daily_hr.items())
-    dates = [item[0] for item in sorted_items]
-    hr_values = [item[1] for item in sorted_items]
+    fig = fs.Figure()
 
-    fig = go.Figure()
-
-    # Linea principale
-    fig.add_trace(go.Scatter(
-        x=dates,
-        y=hr_values,
+    # Linea principale (ridotta al budget di punti per periodi lunghi)
+    fig.add_trace(time_series_trace(
+        dates,
+        plotly_values(daily_hr),
+        value_label='FC',
+        unit='bpm',
         mode='lines+markers',
         name='Frequenza Cardiaca',
         line=dict(color='#E74C3C', width=2),
-        marker=dict(size=8),
-        hovertemplate='<b>%{x}</b><br>FC: %{y:.1f} bpm<extra></extra>'
+        marker=dict(size=8)
     ))
 
     # Media del periodo
-    avg_hr = sum(hr_values) / len(hr_values) if hr_values else 0
+    avg_hr = float(hr_array.mean()) if len(hr_array) else 0
     fig.add_hline(
         y=avg_hr,
         line_dash="dash",
@@ -970,7 +970,7 @@ def create_heart_rate_line(data: DailyHeartRateResult) -> GraphData:
 
 def create_no_data_placeholder(title: str) -> GraphData:
     """Crea un grafico placeholder quando i dati non sono disponibili"""
-    fig = go.Figure()
+    fig = fs.Figure()
 
     fig.add_annotation(
         text="Dati non disponibili",
@@ -0,0 +1,49 @@
+"""
+Import differiti per le librerie pesanti usate solo in alcuni percorsi di codice.
+
+Plotly (~0.5s all'import) serve solo quando si genera un grafico: i moduli che lo usano
+dichiarano ``go = lazy_module("plotly.graph_objects")`` e il modulo vero viene importato
+al primo accesso a un attributo (``go.Figure``), non all'import del modulo che lo usa.
+"""
+
+from __future__ import annotations
+
+import importlib
+from types import ModuleType
+from typing import Any, Callable
+
+
+class LazyModule:
+    """Proxy di un modulo, importato al primo accesso a un suo attributo"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: ModuleType | None = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "importato" if self._module is not None else "non ancora importato"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def lazy_function(module_name: str, attr: str) -> Callable[..., Any]:
+    """Funzione ``attr`` di ``module_name``, importata alla prima chiamata"""
+    module = LazyModule(module_name)
+
+    def wrapper(*args, **kwargs):
+        return getattr(module, attr)(*args, **kwargs)
+
+    wrapper.__name__ = wrapper.__qualname__ = attr
+    wrapper.__doc__ = f"{module_name}.{attr} (import differito alla prima chiamata)"
+    return wrapper
@@ -0,0 +1,190 @@
+"""
+Serializzazione compatta dei risultati strutturati per i prompt LLM.
+
+Il repr Python o il JSON dei risultati ripetono chiavi e annidamenti e portano i float a
+precisione piena. format_result() li rende come testo compatto:
+
+- gli scalari di primo livello su una riga chiave=valore
+- i gruppi di statistiche con le stesse chiavi (es. MetricStatistics, SleepPhaseData,
+  timeslot_distribution) come tabella con intestazione unica
+- i dict di scalari (correlazioni, distribuzioni per stanza) su una riga
+- le serie giornaliere (DailySeries) come data iniziale + valori, se i giorni sono
+  consecutivi, altrimenti coppie data:valore; oltre LLM_SERIES_MAX_VALUES valori come
+  riassunto di backend.utils.series_summary, di dimensione indipendente dal periodo
+- i numeri arrotondati (decimali in funzione della grandezza)
+
+estimate_tokens() stima i token di un testo per loggare e confrontare le dimensioni dei
+prompt (conta parole e punteggiatura come fanno i tokenizer BPE, non è esatta).
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from datetime import date, timedelta
+from typing import Any, Iterable, Mapping
+
+_SCALARS = (str, int, float, bool, type(None))
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Caratteri per token dentro una parola lunga (numeri, identificatori)
+_CHARS_PER_WORD_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Stima approssimata dei token di text"""
+    return sum(math.ceil(len(piece) / _CHARS_PER_WORD_TOKEN) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def format_number(value: Any) -> str:
+    """Numero arrotondato: 1 decimale da 10 in su, 2 tra 1 e 10, 3 sotto 1; senza zeri finali"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, int):
+        return str(value)
+    if not math.isfinite(value):
+        return str(value)
+    magnitude = abs(value)
+    decimals = 1 if magnitude >= 10 else 2 if magnitude >= 1 else 3
+    text = f"{value:.{decimals}f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+
+def _is_series(value: Any) -> bool:
+    return isinstance(value, Mapping) and "dates" in value and "values" in value
+
+
+def _consecutive(dates: list[str]) -> bool:
+    try:
+        days = [date.fromisoformat(d) for d in dates]
+    except (TypeError, ValueError):
+        return False
+    return all(b - a == timedelta(days=1) for a, b in zip(days, days[1:]))
+
+
+def _signed(value: float) -> str:
+    text = format_number(value)
+    return text if text.startswith("-") or text == "0" else f"+{text}"
+
+
+def _dated_values(items: Iterable[Mapping[str, Any]]) -> str:
+    return ", ".join(f"{item['date']}={format_number(item['value'])}" for item in items)
+
+
+def format_series_summary(name: str, series: Mapping[str, Any]) -> str:
+    """Serie giornaliera come riassunto (statistiche, trend, estremi, anomalie, aggregati)"""
+    from backend.utils.series_summary import ANOMALY_Z, summarize_series
+
+    summary = summarize_series(series)
+    if summary is None:
+        return f"{name}: nessun valore"
+    lines = [
+        f"{name} (riassunto di {summary['days']} giorni dal {summary['start']} al {summary['end']}):",
+        f"statistiche: media={format_number(summary['mean'])}, mediana={format_number(summary['median'])}, "
+        f"std={format_number(summary['std_dev'])}, min={format_number(summary['min']['value'])} ({summary['min']['date']}), "
+        f"max={format_number(summary['max']['value'])} ({summary['max']['date']})",
+        f"trend: {summary['trend']}, {_signed(summary['trend_per_week'])} a settimana "
+        f"({_signed(summary['trend_total'])} sull'intero periodo)",
+        f"valori più alti: {_dated_values(summary['highest'])}",
+        f"valori più bassi: {_dated_values(summary['lowest'])}",
+    ]
+    if summary["anomaly_count"]:
+        shown = "" if summary["anomaly_count"] == len(summary["anomalies"]) else f", le {len(summary['anomalies'])} più marcate"
+        lines.append(f"anomalie (|z robusto| > {format_number(ANOMALY_Z)}): {summary['anomaly_count']} giorni{shown}: "
+                     f"{_dated_values(summary['anomalies'])}")
+    else:
+        lines.append("anomalie: nessuna")
+    lines.append(f"medie {summary['granularity']}:")
+    lines.extend(_table(((period["label"], {"media": period["mean"], "min": period["min"], "max": period["max"],
+                                             "giorni": period["days"]})
+                         for period in summary["periods"]), "periodo"))
+    return "\n".join(lines)
+
+
+def format_series(name: str, series: Mapping[str, Any], max_values: int | None = None) -> str:
+    """
+    Serie giornaliera: data iniziale e valori (giorni consecutivi) o coppie data:valore.
+    Oltre max_values valori (None = LLM_SERIES_MAX_VALUES) la serie viene riassunta.
+    """
+    from backend.utils.series import series_dates, series_values
+
+    if max_values is None:
+        from backend.config.settings import LLM_SERIES_MAX_VALUES
+
+        max_values = LLM_SERIES_MAX_VALUES
+    dates = series_dates(series)
+    if len(dates) > max_values:
+        return format_series_summary(name, series)
+    values = [format_number(v) for v in series_values(series).tolist()]
+    if not dates:
+        return f"{name}: nessun valore"
+    if _consecutive(dates):
+        return f"{name} ({len(dates)} giorni consecutivi dal {dates[0]} al {dates[-1]}): {' '.join(values)}"
+    return f"{name} ({len(dates)} giorni): " + " ".join(f"{d}:{v}" for d, v in zip(dates, values))
+
+
+def _is_table(value: Mapping) -> bool:
+    """Dict di dict di scalari, tutti con le stesse chiavi"""
+    rows = list(value.values())
+    if len(rows) < 2 or not all(isinstance(row, Mapping) and row for row in rows):
+        return False
+    columns = list(rows[0])
+    return all(list(row) == columns and all(isinstance(v, _SCALARS) for v in row.values()) for row in rows)
+
+
+def _table(rows: Iterable[tuple[str, Mapping]], label: str) -> list[str]:
+    rows = list(rows)
+    columns = list(rows[0][1])
+    lines = [" | ".join([label, *columns])]
+    lines.extend(" | ".join([name, *(format_number(row[c]) for c in columns)]) for name, row in rows)
+    return lines
+
+
+def _inline(value: Mapping) -> str:
+    return ", ".join(f"{key}={format_number(item)}" for key, item in value.items())
+
+
+def format_result(result: Any) -> str:
+    """Risultato di un tool (o aggregato {"results": [...]}) come testo compatto"""
+    if not isinstance(result, Mapping):
+        return format_number(result)
+    if "error" in result:
+        return f"errore: {result['error']}"
+    if isinstance(result.get("results"), list):
+        return "\n\n".join(format_result(item) for item in result["results"])
+
+    scalars = {key: value for key, value in result.items() if isinstance(value, _SCALARS)}
+    lines = [" | ".join(f"{key}={format_number(value)}" for key, value in scalars.items())] if scalars else []
+
+    # Gruppi di statistiche con le stesse colonne (es. le metriche di SleepStatisticsResult)
+    # di primo livello: una sola tabella
+    stats = [(key, value) for key, value in result.items()
+             if isinstance(value, Mapping) and not _is_series(value) and value
+             and all(isinstance(v, _SCALARS) for v in value.values())]
+    groups: dict[tuple, list[tuple[str, Mapping]]] = {}
+    for key, value in stats:
+        groups.setdefault(tuple(value), []).append((key, value))
+
+    for key, value in result.items():
+        if key in scalars:
+            continue
+        if _is_series(value):
+            lines.append(format_series(key, value))
+        elif isinstance(value, Mapping) and _is_table(value):
+            lines.append(f"{key}:")
+            lines.extend(_table(value.items(), "voce"))
+        elif isinstance(value, Mapping) and (key, value) in stats:
+            group = groups[tuple(value)]
+            if len(group) == 1:
+                lines.append(f"{key}: {_inline(value)}")
+            elif group[0][0] == key:
+                lines.extend(_table(group, "metrica"))
+        elif isinstance(value, Mapping):
+            lines.append(f"{key}: {format_result(value)}")
+        elif isinstance(value, list):
+            lines.append(f"{key}: {', '.join(format_number(item) for item in value)}")
+    return "\n".join(lines)
+
+
+def format_agent_responses(responses: Iterable[Mapping[str, Any]]) -> str:
+    """Risposte degli agenti (AgentResponse) per il prompt di sintesi"""
+    return "\n\n".join(f"[{resp['agent_name']}]\n{format_result(resp['data'])}" for resp in responses)
@@ -0,0 +1,129 @@
+"""
+Memoria conversazionale limitata per i nodi che inviano lo storico all'LLM.
+
+State.messages contiene, oltre alle domande dell'utente e alle risposte finali, anche
+i messaggi interni di ogni turno (riepilogo del planner, [TASK] del supervisor,
+messaggi di tracking dei team, completamento dei nodi, transcript dei tool).
+Per l'LLM servono solo gli scambi utente/assistente:
+
+- conversation_history: riassunto dei turni vecchi + ultimi K scambi + domanda corrente
+- prune_messages / fold_exchanges: usati dal memory node per rimuovere dallo state i
+  messaggi interni dei turni conclusi e accumulare nel riassunto gli scambi più vecchi
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
+
+from backend.config.settings import MEMORY_RECENT_EXCHANGES, MEMORY_SUMMARY_INPUT_CHARS
+
+# Nomi dei messaggi AI che costituiscono la risposta all'utente
+# (None = risposta diretta del conversational_router)
+ANSWER_MESSAGE_NAMES = {None, "correlation_analyzer"}
+
+
+@dataclass
+class Exchange:
+    """Domanda dell'utente con la relativa risposta finale (None se il turno non ha prodotto risposta)"""
+    user: BaseMessage
+    answer: BaseMessage | None = None
+
+
+def is_user_message(msg: BaseMessage) -> bool:
+    # I messaggi human interni (completamento nodi, tracking visualizzazioni, ...) hanno sempre un name
+    return msg.type == "human" and not msg.name
+
+
+def is_answer_message(msg: BaseMessage) -> bool:
+    return msg.type == "ai" and not getattr(msg, "tool_calls", None) and msg.name in ANSWER_MESSAGE_NAMES
+
+
+def is_conversation_message(msg: BaseMessage) -> bool:
+    return is_user_message(msg) or is_answer_message(msg)
+
+
+def split_exchanges(messages: list[BaseMessage]) -> list[Exchange]:
+    """Raggruppa i messaggi in scambi domanda/risposta, ignorando quelli interni"""
+    exchanges: list[Exchange] = []
+    for msg in messages:
+        if is_user_message(msg):
+            exchanges.append(Exchange(user=msg))
+        elif exchanges and is_answer_message(msg):
+            # Se un turno produce più risposte vale l'ultima
+            exchanges[-1].answer = msg
+    return exchanges
+
+
+def _exchange_messages(exchanges: list[Exchange]) -> list[BaseMessage]:
+    messages = []
+    for exchange in exchanges:
+        messages.append(exchange.user)
+        if exchange.answer is not None:
+            messages.append(exchange.answer)
+    return messages
+
+
+def summary_message(summary: str) -> HumanMessage:
+    return HumanMessage(
+        content=f"Riassunto della conversazione precedente:\n{summary}",
+        name="conversation_summary",
+    )
+
+
+def conversation_history(state, recent_exchanges: int = MEMORY_RECENT_EXCHANGES) -> list[BaseMessage]:
+    """
+    Storico da inviare all'LLM: riassunto (se presente), ultimi ``recent_exchanges``
+    scambi completi e la domanda corrente. I messaggi interni sono esclusi.
+    """
+    exchanges = split_exchanges(state["messages"])
+    # Gli scambi già riassunti non vengono reinviati
+    exchanges = exchanges[state.get("summarized_exchanges", 0):]
+    exchanges = exchanges[-(recent_exchanges + 1):]
+
+    history = []
+    summary = state.get("conversation_summary")
+    if summary:
+        history.append(summary_message(summary))
+    history.extend(_exchange_messages(exchanges))
+    return history
+
+
+def prune_messages(messages: list[BaseMessage]) -> list[RemoveMessage]:
+    """Rimozioni per i messaggi interni dei turni conclusi (quelli prima dell'ultima domanda)"""
+    last_user = max((i for i, m in enumerate(messages) if is_user_message(m)), default=0)
+    return [
+        RemoveMessage(id=msg.id)
+        for msg in messages[:last_user]
+        if msg.id and not is_conversation_message(msg)
+    ]
+
+
+def exchanges_to_fold(state, recent_exchanges: int = MEMORY_RECENT_EXCHANGES) -> list[Exchange]:
+    """Scambi conclusi non ancora riassunti che eccedono gli ultimi ``recent_exchanges``"""
+    completed = split_exchanges(state["messages"])[:-1]  # l'ultimo è il turno corrente
+    summarized = state.get("summarized_exchanges", 0)
+    return completed[summarized:max(summarized, len(completed) - recent_exchanges)]
+
+
+def _clip(text, limit: int = MEMORY_SUMMARY_INPUT_CHARS) -> str:
+    text = text if isinstance(text, str) else str(text)
+    return text if len(text) <= limit else text[:limit] + " [...]"
+
+
+def summary_prompt(previous_summary: str | None, exchanges: list[Exchange]) -> str:
+    transcript = []
+    for exchange in exchanges:
+        transcript.append(f"Utente: {_clip(exchange.user.content)}")
+        if exchange.answer is not None:
+            transcript.append(f"Assistente: {_clip(exchange.answer.content)}")
+
+    return (
+        "Aggiorna il riassunto di una conversazione tra un utente e un assistente per "
+        "l'analisi di dati sanitari (sonno, cucina, mobilità).\n"
+        "Conserva: ID dei soggetti, periodi, domini analizzati, risultati numerici chiave "
+        "e richieste ancora aperte. Massimo 150 parole, in italiano, senza preamboli.\n\n"
+        f"Riassunto attuale:\n{previous_summary or '(vuoto)'}\n\n"
+        "Nuovi scambi da integrare:\n" + "\n".join(transcript)
+    )
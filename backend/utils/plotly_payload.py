@@ -0,0 +1,155 @@
+"""
+Compattazione del JSON delle figure Plotly (GraphData.plotly_json).
+
+fig.to_dict() include per intero il template di default (circa 7 KB per grafico) e i
+float a precisione piena. compact_figure():
+
+- sostituisce il template, se coincide con uno dei template registrati di Plotly, con
+  il suo nome (go.Figure e Plotly.js lo risolvono da soli)
+- arrotonda i float a un numero fisso di decimali (PLOTLY_FLOAT_DECIMALS in store_graph)
+- codifica gli array numerici delle tracce come typed array di Plotly
+  ({"dtype": ..., "bdata": base64, "shape": ...}) quando il risultato è più corto del
+  JSON testuale: vale per gli interi (dtype più piccolo che li contiene); per i float
+  arrotondati il testo è di solito più corto di un float64 in base64, e float32
+  cambierebbe i valori mostrati, quindi restano testo
+
+La figura compattata resta un dict JSON valido per go.Figure(...) e st.plotly_chart.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import math
+from typing import Any, Optional
+
+import numpy as np
+from typing_extensions import TypedDict
+
+logger = logging.getLogger(__name__)
+
+# Array più corti non vengono codificati (l'intestazione del typed array non conviene)
+MIN_TYPED_ARRAY_LENGTH = 8
+_INT_DTYPES = ("i1", "u1", "i2", "u2", "i4", "u4")
+
+_template_index: dict[str, str] | None = None
+
+
+class CompactionStats(TypedDict):
+    """Dimensioni della figura prima e dopo la compattazione (JSON compatto, byte)"""
+    original_bytes: int
+    compact_bytes: int
+    saved_bytes: int
+    template: Optional[str]
+    typed_arrays: int
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _known_templates() -> dict[str, str]:
+    """JSON canonico di ogni template registrato in plotly.io -> nome"""
+    global _template_index
+    if _template_index is None:
+        import plotly.io as pio
+
+        _template_index = {_dumps(pio.templates[name].to_plotly_json()): name for name in pio.templates}
+    return _template_index
+
+
+def _round(value: Any, decimals: int) -> Any:
+    if isinstance(value, float):
+        return round(value, decimals) if math.isfinite(value) else value
+    if isinstance(value, dict):
+        return {key: _round(item, decimals) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_round(item, decimals) for item in value]
+    return value
+
+
+def _numeric_array(value: list) -> np.ndarray | None:
+    """Array NumPy se value è una lista (anche 2D rettangolare) di soli numeri, altrimenti None"""
+    if len(value) < MIN_TYPED_ARRAY_LENGTH and not (value and isinstance(value[0], list)):
+        return None
+    rows = value if value and isinstance(value[0], list) else [value]
+    width = len(rows[0])
+    for row in rows:
+        if not isinstance(row, list) or len(row) != width:
+            return None
+        for item in row:
+            if isinstance(item, bool) or not isinstance(item, (int, float)):
+                return None
+    array = np.asarray(value)
+    if array.size < MIN_TYPED_ARRAY_LENGTH:
+        return None
+    return array
+
+
+def _typed_array(array: np.ndarray) -> dict[str, str] | None:
+    """Typed array Plotly per un array di interi (None se non rappresentabile senza perdite)"""
+    if array.dtype.kind == "f":
+        if not np.all(np.isfinite(array)) or not np.all(array == np.round(array)):
+            return None
+        array = array.astype(np.int64)
+    for dtype in _INT_DTYPES:
+        info = np.iinfo(dtype)
+        if array.min() >= info.min and array.max() <= info.max:
+            encoded = {"dtype": dtype, "bdata": base64.b64encode(array.astype(dtype).tobytes()).decode("ascii")}
+            if array.ndim > 1:
+                encoded["shape"] = ", ".join(str(n) for n in array.shape)
+            return encoded
+    return None
+
+
+def _encode_arrays(value: Any, counter: list[int]) -> Any:
+    if isinstance(value, dict):
+        return {key: _encode_arrays(item, counter) for key, item in value.items()}
+    if isinstance(value, list):
+        array = _numeric_array(value)
+        if array is not None:
+            encoded = _typed_array(array)
+            if encoded is not None and len(_dumps(encoded)) < len(_dumps(value)):
+                counter[0] += 1
+                return encoded
+            return value
+        return [_encode_arrays(item, counter) for item in value]
+    return value
+
+
+def compact_figure(figure: dict[str, Any], decimals: int = 3,
+                   typed_arrays: bool = True) -> tuple[dict[str, Any], CompactionStats]:
+    """Figura compattata e statistiche dei byte risparmiati"""
+    from plotly.utils import PlotlyJSONEncoder
+
+    # Solo tipi JSON da qui in poi (to_dict() può contenere array NumPy, date, ...)
+    encoded = json.dumps(figure, cls=PlotlyJSONEncoder, sort_keys=True, separators=(",", ":"))
+    original_bytes = len(encoded)
+    figure = json.loads(encoded)
+    if not isinstance(figure.get("data"), list):
+        # Non è una figura (es. {"error": ...})
+        return figure, CompactionStats(original_bytes=original_bytes, compact_bytes=original_bytes,
+                                       saved_bytes=0, template=None, typed_arrays=0)
+
+    layout = dict(figure.get("layout", {}))
+    template_name = None
+    template = layout.get("template")
+    if isinstance(template, dict):
+        template_name = _known_templates().get(_dumps(template))
+        if template_name is not None:
+            layout["template"] = template_name
+
+    compact = _round({**figure, "layout": layout}, decimals)
+    counter = [0]
+    if typed_arrays:
+        compact["data"] = [_encode_arrays(trace, counter) for trace in compact["data"]]
+
+    compact_bytes = len(_dumps(compact))
+    return compact, CompactionStats(
+        original_bytes=original_bytes,
+        compact_bytes=compact_bytes,
+        saved_bytes=original_bytes - compact_bytes,
+        template=template_name,
+        typed_arrays=counter[0],
+    )
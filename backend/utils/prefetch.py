@@ -0,0 +1,170 @@
+"""
+Prefetch speculativo dei dati mentre il planner LLM sta ragionando.
+
+Soggetto, periodo e domini vengono ipotizzati dalla domanda con euristiche
+(backend.utils.query_hints); in parallelo alla chiamata del planner si caricano i
+dataset e si precalcolano i risultati dei tool analyze_* più probabili nella
+tool_result_cache. Quando arriva l'ExecutionPlan definitivo, i risultati speculativi
+che non corrispondono al piano (soggetto, periodo o team diversi) vengono scartati.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from backend.config.settings import SLEEP_DATA_PATH, KITCHEN_DATA_PATH, SENSOR_DATA_PATH
+from backend.models.state import ExecutionPlan
+from backend.tools.kitchen_tools import (
+    KITCHEN_DATE_COLUMNS,
+    analyze_kitchen_statistics,
+    analyze_kitchen_usage_pattern,
+    analyze_kitchen_temperature,
+)
+from backend.tools.mobility_tools import SENSOR_DATE_COLUMNS, analyze_mobility_patterns
+from backend.tools.sleep_tools import (
+    SLEEP_DATE_COLUMNS,
+    analyze_sleep_statistics,
+    analyze_sleep_distribution,
+    analyze_sleep_quality_correlation,
+    analyze_daily_heart_rate,
+)
+from backend.utils.data_cache import load_dataset, speculative_context, tool_result_cache
+from backend.utils.query_hints import QueryHints, parse_query_hints
+
+logger = logging.getLogger(__name__)
+
+# Dataset da riscaldare per ogni team
+TEAM_DATASETS = {
+    "sleep_team": (SLEEP_DATA_PATH, SLEEP_DATE_COLUMNS),
+    "kitchen_team": (KITCHEN_DATA_PATH, KITCHEN_DATE_COLUMNS),
+    "mobility_team": (SENSOR_DATA_PATH, SENSOR_DATE_COLUMNS),
+}
+
+# Team di appartenenza di ogni tool (per la riconciliazione con il piano)
+TOOL_TEAMS = {
+    analyze_sleep_statistics.name: "sleep_team",
+    analyze_sleep_distribution.name: "sleep_team",
+    analyze_sleep_quality_correlation.name: "sleep_team",
+    analyze_daily_heart_rate.name: "sleep_team",
+    analyze_kitchen_statistics.name: "kitchen_team",
+    analyze_kitchen_usage_pattern.name: "kitchen_team",
+    analyze_kitchen_temperature.name: "kitchen_team",
+    analyze_mobility_patterns.name: "mobility_team",
+}
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+
+def likely_tools(hints: QueryHints) -> list:
+    """
+    Tool che gli agenti di dominio chiameranno con maggiore probabilità.
+    Rispecchia le regole dei prompt degli agenti: per domande generiche solo il tool statistico.
+    """
+    tools = []
+    if "sleep_team" in hints.domains:
+        if hints.mentions("fasi", "rem", "profondo", "leggero", "distribuzione", "efficienza"):
+            tools.append(analyze_sleep_distribution)
+        elif hints.mentions("influenz", "correlaz", "interruzion", "impatto"):
+            tools.append(analyze_sleep_quality_correlation)
+        elif not hints.heart_rate or hints.mentions("dorm", "sonno"):
+            tools.append(analyze_sleep_statistics)
+        if hints.heart_rate:
+            tools.append(analyze_daily_heart_rate)
+    if "kitchen_team" in hints.domains:
+        if hints.mentions("quando", "fasc", "orari", "pasti", "colazion", "pranzo", "cena"):
+            tools.append(analyze_kitchen_usage_pattern)
+        elif hints.mentions("temperatur", "intensit"):
+            tools.append(analyze_kitchen_temperature)
+        else:
+            tools.append(analyze_kitchen_statistics)
+    if "mobility_team" in hints.domains:
+        tools.append(analyze_mobility_patterns)
+    return tools
+
+
+class SpeculativePrefetch:
+    """Handle di un prefetch avviato per una singola richiesta"""
+
+    def __init__(self, hints: QueryHints):
+        self.hints = hints
+        # (job, future) per ogni lavoro sottomesso; job = ("dataset"|"tool", team)
+        self._jobs: list[tuple[tuple[str, str], Future]] = []
+        self._rejected: set[tuple[str, str]] = set()
+        # Chiavi della tool_result_cache create da questo prefetch (le sole da riconciliare)
+        self._cache_keys: set = set()
+
+    def start(self) -> "SpeculativePrefetch":
+        for team in self.hints.domains:
+            path, date_columns = TEAM_DATASETS[team]
+            self._submit(("dataset", team), load_dataset, path, date_columns)
+
+        if self.hints.subject_id is not None:
+            for tool in likely_tools(self.hints):
+                job = ("tool", TOOL_TEAMS[tool.name])
+                self._submit(job, tool.func, self.hints.subject_id, self.hints.period)
+        return self
+
+    def _submit(self, job: tuple[str, str], func, *args) -> None:
+        self._jobs.append((job, _executor.submit(self._run, job, func, *args)))
+
+    def _run(self, job: tuple[str, str], func, *args):
+        if job in self._rejected:
+            return None
+        try:
+            with speculative_context(self._cache_keys):
+                return func(*args)
+        except Exception as e:
+            logger.warning("Prefetch speculativo fallito (%s): %s", getattr(func, '__name__', func), e)
+            return None
+
+    def reconcile(self, plan: ExecutionPlan) -> int:
+        """
+        Confronta le ipotesi con il piano definitivo: i risultati speculativi coerenti con
+        il piano restano in cache, gli altri vengono scartati (e i lavori non ancora partiti
+        annullati). Riguarda solo le voci create da questo prefetch, non quelle speculative
+        delle richieste concorrenti. Restituisce quanti risultati sono stati scartati.
+        """
+        planned_teams = {task.team for task in plan.tasks}
+        hit = self.hints.subject_id == plan.subject_id and self.hints.period == plan.period
+
+        for team in self.hints.domains:
+            if team not in planned_teams:
+                self._rejected.add(("dataset", team))
+            if not hit or team not in planned_teams:
+                self._rejected.add(("tool", team))
+        for job, future in self._jobs:
+            if job in self._rejected:
+                future.cancel()
+
+        def keep(key) -> bool:
+            tool_name, subject_id, period, _ = key
+            return (
+                subject_id == plan.subject_id
+                and period == plan.period
+                and TOOL_TEAMS.get(tool_name) in planned_teams
+            )
+
+        discarded = tool_result_cache.reconcile(self._cache_keys, keep)
+        logger.info("Prefetch speculativo: ipotesi %s (soggetto=%s, periodo=%s), %d risultati scartati",
+                    "confermata" if hit else "smentita", self.hints.subject_id, self.hints.period, discarded)
+        return discarded
+
+
+    def discard(self) -> int:
+        """
+        Scarta tutto il prefetch (es. il planner è fallito e non c'è un piano con cui
+        riconciliare): i lavori non ancora partiti vengono annullati e i risultati
+        speculativi creati da questo prefetch rimossi dalla cache.
+        """
+        for job, future in self._jobs:
+            self._rejected.add(job)
+            future.cancel()
+        discarded = tool_result_cache.reconcile(self._cache_keys, lambda key: False)
+        logger.info("Prefetch speculativo scartato senza piano: %d risultati rimossi", discarded)
+        return discarded
+
+
+def start_speculative_prefetch(question: str) -> SpeculativePrefetch:
+    """Avvia in background il riscaldamento di dataset e cache dei tool per la domanda"""
+    return SpeculativePrefetch(parse_query_hints(question)).start()
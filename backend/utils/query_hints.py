@@ -0,0 +1,107 @@
+"""
+Estrazione euristica (senza LLM) di soggetto, periodo e domini da una domanda in italiano.
+
+Non sostituisce il planner: serve a fare ipotesi economiche sul piano che il planner
+produrrà, ad esempio per avviare in anticipo il caricamento dei dati.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+DEFAULT_PERIOD = "last_30_days"
+
+NUMBER_WORDS = {
+    "un": 1, "una": 1, "uno": 1, "due": 2, "tre": 3, "quattro": 4, "cinque": 5,
+    "sei": 6, "sette": 7, "otto": 8, "nove": 9, "dieci": 10, "undici": 11,
+    "dodici": 12, "quindici": 15, "venti": 20, "trenta": 30,
+}
+
+UNIT_DAYS = {
+    "giorno": 1, "giorni": 1,
+    "settimana": 7, "settimane": 7,
+    "mese": 30, "mesi": 30,
+    "anno": 365, "anni": 365,
+}
+
+# Parole chiave per dominio (radici, confrontate sul testo in minuscolo)
+DOMAIN_KEYWORDS = {
+    "sleep_team": ["dorm", "sonno", "sonni", "risvegl", "notte", "nottur", "fasi", "letto", "cuore",
+                   "cardiac", "battit", "respir"],
+    "kitchen_team": ["cucin", "pasto", "pasti", "cottur", "colazion", "pranzo", "cena", "fornell",
+                     "temperatur"],
+    "mobility_team": ["mobilit", "muov", "moviment", "stanz", "spostament", "camminat", "attività fisica"],
+}
+
+HEART_KEYWORDS = ["cuore", "cardiac", "battit", "frequenza cardiaca"]
+
+_SUBJECT_RE = re.compile(
+    r"\b(?:soggett[oi]|paziente|subject|utente|id)\s*(?:n\.?\s*|numero\s*|id\s*|#\s*)?(\d+)",
+    re.IGNORECASE,
+)
+_DATE = r"(\d{4}-\d{2}-\d{2})"
+_RANGE_RE = re.compile(rf"{_DATE}\s*(?:,|al|a|-|fino al|to)\s*{_DATE}")
+_NUMBER = r"(\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r")"
+_LAST_RE = re.compile(
+    rf"\b(?:ultim[oaie]|scors[oaie]|last|negli|nelle|nei)\s+(?:{_NUMBER}\s+)?"
+    rf"(giorn[oi]|settiman[ae]|mes[ei]|ann[oi])\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class QueryHints:
+    """Ipotesi ricavate dalla domanda dell'utente"""
+    subject_id: int | None = None
+    period: str = DEFAULT_PERIOD
+    domains: list[str] = field(default_factory=list)
+    heart_rate: bool = False
+    text: str = ""
+
+    def mentions(self, *keywords: str) -> bool:
+        return any(k in self.text for k in keywords)
+
+
+def _to_int(token: str | None) -> int:
+    if not token:
+        return 1
+    token = token.lower()
+    return int(token) if token.isdigit() else NUMBER_WORDS.get(token, 1)
+
+
+def parse_period(text: str) -> str:
+    """Restituisce il periodo nel formato del planner ('last_N_days' o 'YYYY-MM-DD,YYYY-MM-DD')"""
+    match = _RANGE_RE.search(text)
+    if match:
+        return f"{match.group(1)},{match.group(2)}"
+
+    match = _LAST_RE.search(text)
+    if match:
+        count = _to_int(match.group(1))
+        unit = match.group(2).lower()
+        days = count * UNIT_DAYS.get(unit, 1)
+        return f"last_{days}_days"
+
+    return DEFAULT_PERIOD
+
+
+def parse_query_hints(text: str) -> QueryHints:
+    """Estrae soggetto, periodo e domini (sleep_team/kitchen_team/mobility_team) dalla domanda"""
+    lowered = text.lower()
+
+    subject_match = _SUBJECT_RE.search(lowered)
+    subject_id = int(subject_match.group(1)) if subject_match else None
+
+    domains = [
+        team for team, keywords in DOMAIN_KEYWORDS.items()
+        if any(k in lowered for k in keywords)
+    ]
+
+    return QueryHints(
+        subject_id=subject_id,
+        period=parse_period(lowered),
+        domains=domains,
+        heart_rate=any(k in lowered for k in HEART_KEYWORDS),
+        text=lowered,
+    )
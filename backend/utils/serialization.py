@@ -0,0 +1,172 @@
+"""
+Serializer binario veloce per checkpoint e payload dei tool.
+
+A ogni superstep LangGraph serializza l'intero checkpoint (messaggi, ExecutionPlan,
+completed_tasks, structured_responses con i risultati TypedDict dei tool) e le
+pending writes. JsonPlusSerializer è generico: per ogni oggetto non nativo codifica
+modulo e nome della classe, lo ricostruisce con importlib e rivalida i modelli pydantic
+(compresi tutti i messaggi) a ogni lettura.
+
+FastStateSerializer usa ormsgpack con estensioni esplicite per i tipi presenti nello state:
+
+- set / frozenset (completed_tasks)
+- datetime, date, time, timedelta (anche pandas.Timestamp)
+- scalari e array NumPy (nativi in ormsgpack, riletti come tipi Python)
+- modelli pydantic del dominio (ExecutionPlan, TeamTask), rivalidati alla lettura
+- messaggi LangChain, ricostruiti senza rivalidazione (i campi salvati sono già validi)
+
+Qualsiasi altro tipo (Send, Interrupt, ...) fa ricadere l'intero valore su
+JsonPlusSerializer, e i dati scritti da JsonPlusSerializer restano leggibili.
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+from typing import Any
+
+import ormsgpack
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    ChatMessage,
+    FunctionMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from backend.config.settings import CHECKPOINT_SERIALIZER
+from backend.models.state import ExecutionPlan, TeamTask
+
+logger = logging.getLogger(__name__)
+
+# Tipo registrato accanto ai byte nel checkpointer
+FAST_TYPE = "fastpack"
+
+EXT_SET = 1
+EXT_FROZENSET = 2
+EXT_DATETIME = 3
+EXT_DATE = 4
+EXT_TIME = 5
+EXT_TIMEDELTA = 6
+EXT_MODEL = 7
+EXT_MESSAGE = 8
+
+# Modelli pydantic dello state, identificati dal nome della classe
+MODELS = {cls.__name__: cls for cls in (ExecutionPlan, TeamTask)}
+
+MESSAGES = {
+    cls.__name__: cls
+    for cls in (
+        AIMessage, AIMessageChunk, HumanMessage, SystemMessage,
+        ToolMessage, FunctionMessage, ChatMessage, RemoveMessage,
+    )
+}
+
+_OPTIONS = (
+    ormsgpack.OPT_NON_STR_KEYS
+    | ormsgpack.OPT_SERIALIZE_NUMPY
+    | ormsgpack.OPT_PASSTHROUGH_DATETIME
+)
+
+
+def _pack(obj: Any) -> bytes:
+    return ormsgpack.packb(obj, default=_default, option=_OPTIONS)
+
+
+def _unpack(data: bytes) -> Any:
+    return ormsgpack.unpackb(data, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+def _default(obj: Any) -> ormsgpack.Ext:
+    # I messaggi sono i più frequenti: controllati per primi
+    message_cls = MESSAGES.get(type(obj).__name__)
+    if message_cls is not None and type(obj) is message_cls:
+        # __dict__ contiene i campi già validati: evita model_dump e l'iterazione pydantic
+        fields = obj.__dict__
+        if obj.__pydantic_extra__:
+            fields = {**fields, **obj.__pydantic_extra__}
+        return ormsgpack.Ext(EXT_MESSAGE, _pack((message_cls.__name__, fields)))
+    if isinstance(obj, set):
+        return ormsgpack.Ext(EXT_SET, _pack(list(obj)))
+    if isinstance(obj, frozenset):
+        return ormsgpack.Ext(EXT_FROZENSET, _pack(list(obj)))
+    # datetime prima di date (datetime è sottoclasse di date)
+    if isinstance(obj, datetime.datetime):
+        return ormsgpack.Ext(EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, datetime.date):
+        return ormsgpack.Ext(EXT_DATE, obj.isoformat().encode())
+    if isinstance(obj, datetime.time):
+        return ormsgpack.Ext(EXT_TIME, obj.isoformat().encode())
+    if isinstance(obj, datetime.timedelta):
+        return ormsgpack.Ext(EXT_TIMEDELTA, _pack((obj.days, obj.seconds, obj.microseconds)))
+    model_cls = MODELS.get(type(obj).__name__)
+    if model_cls is not None and type(obj) is model_cls:
+        return ormsgpack.Ext(EXT_MODEL, _pack((model_cls.__name__, obj.model_dump())))
+    raise TypeError(f"Tipo non gestito da FastStateSerializer: {type(obj).__name__}")
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == EXT_MESSAGE:
+        name, fields = _unpack(data)
+        return MESSAGES[name].model_construct(**fields)
+    if code == EXT_SET:
+        return set(_unpack(data))
+    if code == EXT_FROZENSET:
+        return frozenset(_unpack(data))
+    if code == EXT_DATETIME:
+        try:
+            return datetime.datetime.fromisoformat(data.decode())
+        except ValueError:
+            # pandas.NaT
+            return None
+    if code == EXT_DATE:
+        return datetime.date.fromisoformat(data.decode())
+    if code == EXT_TIME:
+        return datetime.time.fromisoformat(data.decode())
+    if code == EXT_TIMEDELTA:
+        return datetime.timedelta(*_unpack(data))
+    if code == EXT_MODEL:
+        name, fields = _unpack(data)
+        return MODELS[name].model_validate(fields)
+    raise ValueError(f"Estensione msgpack sconosciuta: {code}")
+
+
+class FastStateSerializer(SerializerProtocol):
+    """Serializer per i checkpoint: ormsgpack con estensioni per i tipi dello state"""
+
+    def __init__(self, fallback: SerializerProtocol | None = None):
+        self.fallback = fallback or JsonPlusSerializer()
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return self.fallback.dumps_typed(obj)
+        try:
+            return FAST_TYPE, _pack(obj)
+        except (TypeError, ormsgpack.MsgpackEncodeError) as e:
+            logger.debug("Serializzazione con JsonPlusSerializer: %s", e)
+            return self.fallback.dumps_typed(obj)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_ == FAST_TYPE:
+            return _unpack(payload)
+        return self.fallback.loads_typed(data)
+
+    # SerializerProtocol richiede anche dumps/loads non tipizzati
+    def dumps(self, obj: Any) -> bytes:
+        return _pack(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return _unpack(data)
+
+
+def create_serializer() -> SerializerProtocol:
+    """Serializer dei checkpoint configurato da CHECKPOINT_SERIALIZER ("fast" | "jsonplus")"""
+    if CHECKPOINT_SERIALIZER == "jsonplus":
+        return JsonPlusSerializer()
+    return FastStateSerializer()
@@ -0,0 +1,72 @@
+"""
+Serie giornaliere in forma colonnare (backend.models.results.DailySeries).
+
+Le serie dei risultati dei tool sono due array paralleli, dates e values, invece di un
+dict {data: valore}: Plotly le usa direttamente come x e y e NumPy le legge senza
+ricostruire liste. Con SERIES_TYPED_ARRAYS i valori sono un typed array Plotly
+(float64 in base64): np.frombuffer li legge senza copie e la figura li riusa così come
+sono. I valori restano una lista di default perché il risultato arriva anche all'LLM,
+e per valori arrotondati a due decimali il testo è più corto del base64 di un float64.
+
+Le serie salvate prima del formato colonnare ({data: valore}) vengono lette comunque.
+"""
+
+from __future__ import annotations
+
+import base64
+from typing import Any, Mapping
+
+import numpy as np
+
+from backend.models.results import DailySeries
+
+TYPED_DTYPE = "f8"
+
+
+def daily_series(dates: Any, values: Any, typed_arrays: bool | None = None) -> DailySeries:
+    """
+    Serie colonnare da date (DatetimeIndex, datetime o stringhe YYYY-MM-DD) e valori numerici.
+    typed_arrays=None usa SERIES_TYPED_ARRAYS.
+    """
+    if typed_arrays is None:
+        from backend.config.settings import SERIES_TYPED_ARRAYS
+
+        typed_arrays = SERIES_TYPED_ARRAYS
+    array = np.asarray(values, dtype=np.float64)
+    dates = np.asarray(dates, dtype="datetime64[D]").astype(str).tolist()
+    if typed_arrays:
+        encoded = {"dtype": TYPED_DTYPE, "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
+        return DailySeries(dates=dates, values=encoded)
+    return DailySeries(dates=dates, values=array.tolist())
+
+
+def _is_legacy(series: Mapping) -> bool:
+    return "dates" not in series or "values" not in series
+
+
+def series_dates(series: DailySeries | Mapping[str, float]) -> list[str]:
+    """Date della serie (YYYY-MM-DD)"""
+    if _is_legacy(series):
+        return list(series.keys())
+    return series["dates"]
+
+
+def values_array(values: list[float] | Mapping[str, str]) -> np.ndarray:
+    """Valori come array NumPy (vista in sola lettura sui byte decodificati per i typed array)"""
+    if isinstance(values, Mapping):
+        return np.frombuffer(base64.b64decode(values["bdata"]), dtype=values.get("dtype", TYPED_DTYPE))
+    return np.asarray(values, dtype=np.float64)
+
+
+def series_values(series: DailySeries | Mapping[str, float]) -> np.ndarray:
+    """Valori della serie come array NumPy"""
+    if _is_legacy(series):
+        return np.fromiter(series.values(), dtype=np.float64, count=len(series))
+    return values_array(series["values"])
+
+
+def plotly_values(series: DailySeries | Mapping[str, float]) -> list[float] | dict[str, str]:
+    """Valori nel formato accettato da Plotly per y: la lista o il typed array, senza conversioni"""
+    if _is_legacy(series):
+        return list(series.values())
+    return series["values"]
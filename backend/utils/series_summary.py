@@ -0,0 +1,157 @@
+"""
+Riassunto delle serie giornaliere per i prompt LLM.
+
+Con periodi lunghi una DailySeries (es. la FC notturna di analyze_daily_heart_rate) porta
+centinaia di valori nei prompt di correlation_analyzer e graph_generator. summarize_series()
+la condensa in un riassunto di dimensione limitata qualunque sia la lunghezza del periodo:
+
+- statistiche (media, mediana, deviazione standard, minimo e massimo con la data)
+- trend lineare (variazione a settimana e sull'intero periodo)
+- estremi (i valori più alti e più bassi)
+- anomalie (z-score robusto su mediana e MAD oltre soglia, le più marcate)
+- aggregati per periodo: settimanali finché le settimane sono al massimo MAX_BUCKETS,
+  altrimenti mensili, trimestrali o annuali
+
+La serie completa resta negli structured_responses per i grafici.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+from typing_extensions import TypedDict
+
+from backend.utils.series import series_dates, series_values
+
+# Aggregati per periodo al massimo nel riassunto
+MAX_BUCKETS = 16
+# Valori riportati tra gli estremi e le anomalie
+TOP_VALUES = 3
+MAX_ANOMALIES = 5
+# |z robusto| oltre cui un giorno è un'anomalia
+ANOMALY_Z = 3.0
+
+# Granularità degli aggregati, dalla più fine: (nome, frequenza pandas, formato etichetta)
+_GRANULARITIES = (
+    ("settimanali", "W-MON", "sett. dal %Y-%m-%d"),
+    ("mensili", "MS", "%Y-%m"),
+    ("trimestrali", "QS", "%Y-T{quarter}"),
+    ("annuali", "YS", "%Y"),
+)
+
+
+class DatedValue(TypedDict):
+    date: str
+    value: float
+
+
+class PeriodAggregate(TypedDict):
+    label: str
+    mean: float
+    min: float
+    max: float
+    days: int
+
+
+class SeriesSummary(TypedDict):
+    """Riassunto di una serie giornaliera"""
+    days: int
+    start: str
+    end: str
+    mean: float
+    median: float
+    std_dev: float
+    min: DatedValue
+    max: DatedValue
+    # Pendenza della retta di regressione (unità al giorno * 7) e variazione sull'intero periodo
+    trend_per_week: float
+    trend_total: float
+    trend: str
+    highest: list[DatedValue]
+    lowest: list[DatedValue]
+    anomalies: list[DatedValue]
+    anomaly_count: int
+    granularity: str
+    periods: list[PeriodAggregate]
+
+
+def _dated(dates: list[str], values: np.ndarray, indices) -> list[DatedValue]:
+    return [DatedValue(date=dates[i], value=float(values[i])) for i in indices]
+
+
+def _label(timestamp: pd.Timestamp, fmt: str) -> str:
+    return timestamp.strftime(fmt.replace("{quarter}", str(timestamp.quarter)))
+
+
+def summarize_series(series: Mapping[str, Any]) -> Optional[SeriesSummary]:
+    """Riassunto di una DailySeries (None se la serie non ha valori finiti)"""
+    values = series_values(series)
+    # I giorni senza valore (NaN, inf) renderebbero NaN media, trend ed estremi
+    finite = np.isfinite(values)
+    dates = [d for d, ok in zip(series_dates(series), finite) if ok]
+    values = values[finite]
+    if len(values) == 0:
+        return None
+
+    index = pd.to_datetime(pd.Index(dates))
+    days_from_start = ((index - index[0]).days).to_numpy(dtype=float)
+    std_dev = float(values.std())
+
+    # Trend lineare
+    if len(values) > 1 and days_from_start[-1] > 0:
+        slope = float(np.polyfit(days_from_start, values, 1)[0])
+    else:
+        slope = 0.0
+    trend_total = slope * float(days_from_start[-1])
+    # Variazione entro un quarto della deviazione standard: stabile (anche con serie costanti)
+    if abs(trend_total) <= max(0.25 * std_dev, 1e-9):
+        trend = "stabile"
+    else:
+        trend = "in aumento" if trend_total > 0 else "in calo"
+
+    # Anomalie con z-score robusto (mediana e MAD): non risente degli stessi outlier
+    median = float(np.median(values))
+    mad = float(np.median(np.abs(values - median))) * 1.4826
+    if mad > 0:
+        scores = np.abs(values - median) / mad
+        outliers = np.flatnonzero(scores > ANOMALY_Z)
+        strongest = outliers[np.argsort(-scores[outliers])][:MAX_ANOMALIES]
+    else:
+        outliers = strongest = np.array([], dtype=int)
+
+    order = np.argsort(values, kind="stable")
+    frame = pd.Series(values, index=index)
+    for name, frequency, fmt in _GRANULARITIES:
+        grouped = frame.resample(frequency, label="left", closed="left")
+        stats = pd.DataFrame({
+            "mean": grouped.mean(), "min": grouped.min(), "max": grouped.max(), "days": grouped.count()
+        })
+        stats = stats[stats["days"] > 0]
+        if len(stats) <= MAX_BUCKETS:
+            break
+
+    return SeriesSummary(
+        days=len(values),
+        start=dates[0],
+        end=dates[-1],
+        mean=float(values.mean()),
+        median=median,
+        std_dev=std_dev,
+        min=_dated(dates, values, [order[0]])[0],
+        max=_dated(dates, values, [order[-1]])[0],
+        trend_per_week=slope * 7,
+        trend_total=trend_total,
+        trend=trend,
+        highest=_dated(dates, values, order[::-1][:TOP_VALUES]),
+        lowest=_dated(dates, values, order[:TOP_VALUES]),
+        anomalies=_dated(dates, values, sorted(strongest.tolist())),
+        anomaly_count=len(outliers),
+        granularity=name,
+        periods=[
+            PeriodAggregate(label=_label(ts, fmt), mean=float(row["mean"]), min=float(row["min"]),
+                            max=float(row["max"]), days=int(row["days"]))
+            for ts, row in stats.iterrows()
+        ],
+    )
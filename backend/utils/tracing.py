@@ -0,0 +1,422 @@
+"""
+Tracing per richiesta: tempi dei nodi, chiamate LLM, tool, token e retry.
+
+Ogni richiesta crea un Trace; il TracingCallbackHandler, passato nei callbacks della
+config del grafo, apre uno span per:
+- ogni nodo del grafo (anche dentro i subgraph dei team)
+- ogni chiamata al modello (token di input/output, dimensione di prompt e risposta)
+- ogni chiamata a un tool (dimensione di input e output)
+
+Gli span sono annidati seguendo la gerarchia dei run di LangChain; i retry per quota
+esaurita (invoke_with_retry) vengono registrati come span "retry" sotto il nodo che li
+ha causati. Un trace è esportabile in JSON o nel formato Chrome trace
+(chrome://tracing, Perfetto).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from backend.config.settings import TRACING_ENABLED, TRACE_HISTORY, TRACE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Nodi interni degli agenti ReAct (create_react_agent): nel riepilogo il loro tempo,
+# le chiamate LLM e i tool vengono attribuiti al nodo del grafo che ha invocato l'agente
+AGENT_STEP_NODES = {"agent", "tools"}
+
+
+def payload_size(obj: Any) -> int:
+    """Dimensione approssimativa (caratteri) della rappresentazione testuale di un payload"""
+    if obj is None:
+        return 0
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    try:
+        return len(json.dumps(obj, default=str, ensure_ascii=False))
+    except (TypeError, ValueError):
+        return len(str(obj))
+
+
+@dataclass
+class Span:
+    span_id: str
+    parent_id: str | None
+    name: str
+    kind: str  # "node" | "llm" | "tool" | "retry"
+    start: float
+    end: float | None = None
+    thread_id: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self, origin: float) -> dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """Insieme degli span di una singola richiesta"""
+
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.finished: float | None = None
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, kind: str, parent_id: str | None = None, **attributes) -> Span:
+        span = Span(
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent_id,
+            name=name,
+            kind=kind,
+            start=time.perf_counter(),
+            thread_id=threading.get_ident(),
+            attributes=attributes,
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def end_span(self, span: Span, **attributes) -> None:
+        span.attributes.update(attributes)
+        span.end = time.perf_counter()
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return (end - self.origin) * 1000
+
+    def summary(self) -> dict[str, Any]:
+        """Aggregati per nodo: tempo, chiamate LLM, token, tool e retry"""
+        nodes: dict[str, dict[str, Any]] = defaultdict(lambda: {
+            "calls": 0, "wall_ms": 0.0, "llm_calls": 0, "llm_ms": 0.0,
+            "input_tokens": 0, "output_tokens": 0, "tool_calls": 0, "tool_ms": 0.0, "retries": 0,
+        })
+        by_id = {s.span_id: s for s in self.spans}
+
+        def owner(span: Span) -> str:
+            # Nodo del grafo più vicino risalendo la gerarchia (esclusi gli step degli agenti)
+            parent = by_id.get(span.parent_id)
+            while parent is not None and (parent.kind != "node" or parent.name in AGENT_STEP_NODES):
+                parent = by_id.get(parent.parent_id)
+            return parent.name if parent is not None else "(request)"
+
+        for span in self.spans:
+            if span.kind == "node" and span.name in AGENT_STEP_NODES and span.parent_id in by_id:
+                continue
+            if span.kind == "node":
+                stats = nodes[span.name]
+                stats["calls"] += 1
+                stats["wall_ms"] += span.duration_ms
+            elif span.kind == "llm":
+                stats = nodes[owner(span)]
+                stats["llm_calls"] += 1
+                stats["llm_ms"] += span.duration_ms
+                stats["input_tokens"] += span.attributes.get("input_tokens", 0)
+                stats["output_tokens"] += span.attributes.get("output_tokens", 0)
+            elif span.kind == "tool":
+                stats = nodes[owner(span)]
+                stats["tool_calls"] += 1
+                stats["tool_ms"] += span.duration_ms
+            elif span.kind == "retry":
+                nodes[owner(span)]["retries"] += 1
+
+        llm_spans = [s for s in self.spans if s.kind == "llm"]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round(self.duration_ms, 1),
+            "llm_calls": len(llm_spans),
+            "input_tokens": sum(s.attributes.get("input_tokens", 0) for s in llm_spans),
+            "output_tokens": sum(s.attributes.get("output_tokens", 0) for s in llm_spans),
+            "tool_calls": sum(1 for s in self.spans if s.kind == "tool"),
+            "retries": sum(1 for s in self.spans if s.kind == "retry"),
+            "nodes": {
+                name: {k: round(v, 1) if isinstance(v, float) else v for k, v in stats.items()}
+                for name, stats in nodes.items()
+            },
+        }
+
+    def to_json(self) -> dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attributes": self.attributes,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "summary": self.summary(),
+            "spans": [s.to_dict(self.origin) for s in spans],
+        }
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Formato Trace Event di Chrome: eventi completi ("X") con tempi in microsecondi"""
+        with self._lock:
+            spans = list(self.spans)
+        events = [{
+            "name": self.name, "cat": "request", "ph": "X", "pid": 1, "tid": 0,
+            "ts": 0, "dur": round(self.duration_ms * 1000), "args": self.attributes,
+        }]
+        for span in spans:
+            events.append({
+                "name": span.name,
+                "cat": span.kind,
+                "ph": "X",
+                "pid": 1,
+                "tid": span.thread_id,
+                "ts": round((span.start - self.origin) * 1_000_000),
+                "dur": round(span.duration_ms * 1000),
+                "args": span.attributes,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace_id": self.trace_id}}
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Callback handler che traduce i run di LangChain/LangGraph in span del Trace"""
+
+    # Eseguito nello stesso thread del run: i tempi non includono l'attesa in un executor
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._spans: dict[UUID, Span] = {}
+        # Per ogni run (anche non tracciato) lo span tracciato più vicino tra gli antenati
+        self._nearest: dict[UUID, str | None] = {}
+        # Span del nodo per checkpoint_ns (usato per agganciare i retry al nodo corrente)
+        self._node_by_ns: dict[str, Span] = {}
+        self._lock = threading.Lock()
+
+    def _parent_span_id(self, parent_run_id: UUID | None) -> str | None:
+        if parent_run_id is None:
+            return None
+        return self._nearest.get(parent_run_id)
+
+    def _open(self, run_id: UUID, parent_run_id: UUID | None, name: str, kind: str, **attributes) -> Span:
+        with self._lock:
+            span = self.trace.start_span(name, kind, self._parent_span_id(parent_run_id), **attributes)
+            self._spans[run_id] = span
+            self._nearest[run_id] = span.span_id
+        return span
+
+    def _close(self, run_id: UUID, **attributes) -> None:
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+            self._nearest.pop(run_id, None)
+        if span is not None:
+            self.trace.end_span(span, **attributes)
+
+    # --- nodi del grafo ---
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if name and name == metadata.get("langgraph_node"):
+            span = self._open(run_id, parent_run_id, name, "node", step=metadata.get("langgraph_step"))
+            checkpoint_ns = metadata.get("langgraph_checkpoint_ns")
+            if checkpoint_ns:
+                with self._lock:
+                    self._node_by_ns[checkpoint_ns] = span
+        else:
+            # Run intermedio (sequenze, agenti ReAct, ...): eredita lo span del padre
+            with self._lock:
+                self._nearest[run_id] = self._parent_span_id(parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        if run_id in self._spans:
+            self._close(run_id, output_bytes=payload_size(outputs))
+        else:
+            with self._lock:
+                self._nearest.pop(run_id, None)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        if run_id in self._spans:
+            # GraphBubbleUp (Command/interrupt) non è un errore applicativo
+            self._close(run_id, error=type(error).__name__)
+        else:
+            with self._lock:
+                self._nearest.pop(run_id, None)
+
+    # --- chiamate LLM ---
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, metadata=None,
+                            **kwargs):
+        metadata = metadata or {}
+        self._open(
+            run_id, parent_run_id,
+            metadata.get("ls_model_name") or kwargs.get("name") or "chat_model", "llm",
+            input_messages=sum(len(batch) for batch in messages),
+            input_chars=sum(payload_size(m.content) for batch in messages for m in batch),
+        )
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        self._open(
+            run_id, parent_run_id,
+            metadata.get("ls_model_name") or kwargs.get("name") or "llm", "llm",
+            input_chars=sum(len(p) for p in prompts),
+        )
+
+    def on_llm_end(self, response, *, run_id, parent_run_id=None, **kwargs):
+        input_tokens = output_tokens = 0
+        output_chars = 0
+        tool_calls = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                output_chars += payload_size(message.content if message is not None else generation.text)
+                usage = getattr(message, "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+                tool_calls += len(getattr(message, "tool_calls", None) or [])
+        self._close(
+            run_id,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            output_chars=output_chars,
+            tool_calls=tool_calls,
+        )
+
+    def on_llm_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._close(run_id, error=type(error).__name__)
+
+    # --- tool ---
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, tags=None, metadata=None,
+                      inputs=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._open(run_id, parent_run_id, name, "tool", input_bytes=payload_size(inputs or input_str))
+
+    def on_tool_end(self, output, *, run_id, parent_run_id=None, **kwargs):
+        content = getattr(output, "content", output)
+        self._close(run_id, output_bytes=payload_size(content))
+
+    def on_tool_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._close(run_id, error=type(error).__name__)
+
+    def node_span(self, checkpoint_ns: str | None) -> Span | None:
+        with self._lock:
+            return self._node_by_ns.get(checkpoint_ns) if checkpoint_ns else None
+
+
+class TraceStore:
+    """Ultimi trace completati, consultabili per id"""
+
+    def __init__(self, max_traces: int):
+        self.max_traces = max_traces
+        self._traces: OrderedDict[str, Trace] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.trace_id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Trace | None:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+
+trace_store = TraceStore(TRACE_HISTORY)
+
+
+def _current_handler() -> tuple[TracingCallbackHandler | None, dict]:
+    """Handler di tracing e metadata del run corrente (se si è dentro un nodo del grafo)"""
+    try:
+        from langgraph.config import get_config
+        config = get_config()
+    except RuntimeError:
+        return None, {}
+
+    callbacks = config.get("callbacks")
+    handlers = getattr(callbacks, "handlers", callbacks) or []
+    for handler in handlers:
+        if isinstance(handler, TracingCallbackHandler):
+            return handler, config.get("metadata", {})
+    return None, {}
+
+
+@contextmanager
+def retry_span(attempt: int, max_retries: int, delay: float, error: BaseException):
+    """Registra l'attesa di un retry sotto il nodo che lo ha causato (no-op fuori da un trace)"""
+    handler, metadata = _current_handler()
+    if handler is None:
+        yield
+        return
+
+    parent = handler.node_span(metadata.get("langgraph_checkpoint_ns"))
+    span = handler.trace.start_span(
+        "retry", "retry", parent.span_id if parent else None,
+        attempt=attempt, max_retries=max_retries, delay_s=delay, error=type(error).__name__,
+    )
+    try:
+        yield
+    finally:
+        handler.trace.end_span(span)
+
+
+def tracing_config(config: dict, trace: Trace | None) -> dict:
+    """Aggiunge il callback di tracing alla config del grafo"""
+    if trace is None:
+        return config
+    return {**config, "callbacks": [*config.get("callbacks", []), TracingCallbackHandler(trace)]}
+
+
+def start_trace(name: str, **attributes) -> Trace | None:
+    """Nuovo trace per una richiesta (None se il tracing è disattivato)"""
+    return Trace(name, **attributes) if TRACING_ENABLED else None
+
+
+def finish_trace(trace: Trace | None) -> None:
+    """Chiude il trace, lo registra nello store, logga il riepilogo e (se configurato) lo salva su disco"""
+    if trace is None:
+        return
+    trace.finish()
+    trace_store.add(trace)
+
+    summary = trace.summary()
+    logger.info(
+        "Trace %s: %.0f ms, %d chiamate LLM (%d/%d token), %d tool, %d retry",
+        trace.trace_id, summary["duration_ms"], summary["llm_calls"], summary["input_tokens"],
+        summary["output_tokens"], summary["tool_calls"], summary["retries"],
+    )
+    for node, stats in sorted(summary["nodes"].items(), key=lambda item: -item[1]["wall_ms"]):
+        logger.debug("  %-28s %s", node, stats)
+
+    if TRACE_DIR:
+        directory = Path(TRACE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{trace.trace_id}.json").write_text(json.dumps(trace.to_json(), default=str))
+        (directory / f"{trace.trace_id}.trace.json").write_text(json.dumps(trace.to_chrome_trace(), default=str))
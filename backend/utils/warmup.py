@@ -0,0 +1,132 @@
+"""
+Costruzione differita del grafo e warmup esplicito.
+
+Importare il server non costruisce più nulla: i client LLM, i tre subgraph dei team e gli
+agenti ReAct (con pandas, Plotly e i tool) vengono creati al primo uso di get_graph().
+All'avvio del server run_warmup() esegue le stesse operazioni in background, fase per fase,
+così il primo utente non paga la costruzione e /ready riporta l'avanzamento.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """Grafo compilato condiviso dal processo, costruito al primo uso"""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            start = time.perf_counter()
+            # Importa nodi, tool, pandas e Plotly: solo qui, non all'import del server
+            from backend.graph.builder import build_graph
+
+            _graph = build_graph()
+            logger.info("Grafo compilato in %.2fs", time.perf_counter() - start)
+    return _graph
+
+
+def _warm_llm_clients() -> None:
+    # Solo i client che il grafo usa davvero (il gemini-2.5-pro del fallback solo se attivo)
+    for name in settings.graph_llm_names():
+        settings.get_llm(name)
+
+
+def _warm_datasets() -> None:
+    from backend.utils.prefetch import TEAM_DATASETS
+    from backend.utils.data_cache import load_dataset
+
+    for path, date_columns in TEAM_DATASETS.values():
+        load_dataset(path, date_columns)
+
+
+def _warm_plotting() -> None:
+    import plotly.graph_objects  # noqa: F401
+    import plotly.subplots  # noqa: F401
+
+
+def _warm_code_executors() -> None:
+    # Worker del python_repl_tool: servono solo con il fallback LLM del grafico cross-domain
+    if settings.CROSS_DOMAIN_CHART_LLM_FALLBACK:
+        from backend.utils.code_executor import get_executor_pool
+
+        get_executor_pool().warm()
+
+
+# Fasi del warmup, in ordine
+WARMUP_PHASES = (
+    ("llm_clients", _warm_llm_clients),
+    ("graph", get_graph),
+    ("datasets", _warm_datasets),
+    ("plotting", _warm_plotting),
+    ("code_executors", _warm_code_executors),
+)
+
+
+class WarmupStatus:
+    """Stato del warmup consultabile da /ready"""
+
+    def __init__(self):
+        self.state = "pending"  # pending | running | ready | failed
+        self.current_phase: str | None = None
+        self.phases: dict[str, float] = {}  # fase completata -> secondi
+        self.error: str | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def to_json(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "current_phase": self.current_phase,
+                "completed": len(self.phases),
+                "total": len(WARMUP_PHASES),
+                "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+                "error": self.error,
+            }
+
+
+warmup_status = WarmupStatus()
+_warmup_thread: threading.Thread | None = None
+
+
+def run_warmup(status: WarmupStatus = warmup_status) -> WarmupStatus:
+    """Esegue le fasi del warmup in sequenza aggiornando ``status``"""
+    status.state = "running"
+    for i, (name, func) in enumerate(WARMUP_PHASES, start=1):
+        status.current_phase = name
+        logger.info("Warmup %d/%d: %s", i, len(WARMUP_PHASES), name)
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            logger.exception("Warmup fallito nella fase %s", name)
+            status.state, status.error = "failed", f"{name}: {e}"
+            return status
+        with status._lock:
+            status.phases[name] = time.perf_counter() - start
+
+    status.state, status.current_phase = "ready", None
+    logger.info("Warmup completato in %.2fs", sum(status.phases.values()))
+    return status
+
+
+def start_warmup() -> WarmupStatus:
+    """Avvia il warmup in un thread daemon (una sola volta per processo)"""
+    global _warmup_thread
+    if _warmup_thread is None:
+        _warmup_thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+        _warmup_thread.start()
+    return warmup_status
@@ -0,0 +1,191 @@
+"""
+Micro-benchmark dei serializer dei checkpoint: JsonPlusSerializer (default LangGraph)
+contro FastStateSerializer (backend.utils.serialization).
+
+Gli state sono quelli di una run cross-domain con i tre team, costruiti con i tool
+reali sui dati in data/ (nessuna chiamata LLM):
+
+- main_graph: checkpoint del grafo principale a fine run (messaggi interni inclusi,
+  ExecutionPlan, completed_tasks, structured_responses, riferimenti ai grafici)
+- analysis_agents: checkpoint degli agenti ReAct di analisi (tool call + ToolMessage con
+  riepilogo e artifact)
+- tool_payloads: i risultati TypedDict dei tool così come restituiti (con scalari NumPy)
+- figures: le figure Plotly prodotte dai tool di visualizzazione (fig.to_dict())
+
+Uso (dalla root del progetto):
+    python -m benchmarks.checkpoint_serializer [--repeat 200] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from backend.models.state import ExecutionPlan
+from backend.tools.kitchen_tools import analyze_kitchen_statistics
+from backend.tools.mobility_tools import analyze_mobility_patterns
+from backend.tools.sleep_tools import analyze_sleep_statistics, analyze_daily_heart_rate
+from backend.tools.visualization_kitchen_tool import visualize_kitchen_statistics
+from backend.tools.visualization_mobility_tool import visualize_mobility_patterns
+from backend.tools.visualization_sleep_tools import visualize_sleep_statistics
+from backend.utils.serialization import FastStateSerializer
+
+SUBJECT_ID = 1
+PERIOD = "2024-01-01,2024-06-28"
+QUESTION = f"Confronta sonno, uso della cucina e mobilità del soggetto {SUBJECT_ID} nel primo semestre 2024"
+
+TEAM_TOOLS = {
+    "sleep_team": ("sleep_agent", [analyze_sleep_statistics, analyze_daily_heart_rate]),
+    "kitchen_team": ("kitchen_agent", [analyze_kitchen_statistics]),
+    "mobility_team": ("mobility_agent", [analyze_mobility_patterns]),
+}
+VISUALIZATIONS = [
+    (analyze_sleep_statistics, visualize_sleep_statistics),
+    (analyze_kitchen_statistics, visualize_kitchen_statistics),
+    (analyze_mobility_patterns, visualize_mobility_patterns),
+]
+
+
+def _checkpoint(channel_values: dict) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = channel_values
+    checkpoint["channel_versions"] = {name: f"{1:032}.{0.5:016}" for name in channel_values}
+    return checkpoint
+
+
+def _tool_exchange(tool, content: str, result) -> list:
+    call_id = str(uuid.uuid4())
+    return [
+        AIMessage(content="", tool_calls=[{
+            "name": tool.name, "args": {"subject_id": SUBJECT_ID, "period": PERIOD}, "id": call_id,
+        }]),
+        ToolMessage(content=content, artifact=result, name=tool.name, tool_call_id=call_id),
+    ]
+
+
+def three_team_run_states() -> dict[str, object]:
+    """State realistici di una run con sleep_team, kitchen_team e mobility_team"""
+    plan = ExecutionPlan.model_validate({
+        "subject_id": SUBJECT_ID,
+        "period": PERIOD,
+        "cross_domain": True,
+        "tasks": [
+            {"team": team, "instruction": f"Analizza il dominio {team} del soggetto {SUBJECT_ID} ({PERIOD})"}
+            for team in TEAM_TOOLS
+        ],
+    })
+
+    messages = [
+        HumanMessage(content=QUESTION),
+        AIMessage(content=f"Piano: {len(plan.tasks)} task, cross_domain", name="planner"),
+    ]
+    structured_responses = []
+    agent_states = []
+    tool_payloads = []
+    for task, (team, (agent_name, tools)) in zip(plan.tasks, TEAM_TOOLS.items()):
+        messages.append(AIMessage(content=f"[TASK]: {task.instruction}", name="supervisor_instruction"))
+        agent_messages = [HumanMessage(content=task.instruction)]
+        responses = []
+        for tool in tools:
+            content, result = tool.func(SUBJECT_ID, PERIOD)
+            exchange = _tool_exchange(tool, content, result)
+            agent_messages.extend(exchange)
+            tool_payloads.append(result)
+            # Come nei nodi di analisi: il risultato arriva dall'artifact del ToolMessage
+            responses.append({"task": task.instruction, "agent_name": agent_name, "data": exchange[-1].artifact})
+        agent_messages.append(AIMessage(content=f"Analisi {team} completata."))
+        agent_states.append(_checkpoint({"messages": agent_messages}))
+        structured_responses.append({"team_name": team, "structured_responses": responses})
+        messages.append(HumanMessage(content=f"{team} completed: {task.instruction}", name=f"{team}_response"))
+
+    figures = [visualize.func(analyze.func(SUBJECT_ID, PERIOD)[1])[1] for analyze, visualize in VISUALIZATIONS]
+    graphs = [
+        {"id": fig["id"], "title": fig["title"], "type": fig["type"], "blob_id": uuid.uuid4().hex * 2}
+        for fig in figures
+    ]
+    messages.append(AIMessage(content="Sintesi dei tre domini: " + "lorem ipsum " * 150, name="correlation_analyzer"))
+
+    main_graph = _checkpoint({
+        "messages": messages,
+        "next": "correlation_analyzer",
+        "original_question": QUESTION,
+        "execution_plan": plan,
+        "completed_tasks": {task.instruction for task in plan.tasks},
+        "structured_responses": structured_responses,
+        "graphs": graphs,
+        "summarized_exchanges": 0,
+    })
+    return {
+        "main_graph": main_graph,
+        "analysis_agents": agent_states,
+        "tool_payloads": tool_payloads,
+        "figures": figures,
+    }
+
+
+def _time(func, repeat: int) -> float:
+    """Mediana in microsecondi"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def run(repeat: int) -> list[dict]:
+    states = three_team_run_states()
+    serializers = {"jsonplus": JsonPlusSerializer(), "fast": FastStateSerializer()}
+    rows = []
+    for state_name, state in states.items():
+        for serde_name, serde in serializers.items():
+            try:
+                typed = serde.dumps_typed(state)
+            except TypeError as e:
+                rows.append({"state": state_name, "serializer": serde_name, "error": str(e)})
+                continue
+            rows.append({
+                "state": state_name,
+                "serializer": serde_name,
+                "type": typed[0],
+                "bytes": len(typed[1]),
+                "dumps_us": round(_time(lambda: serde.dumps_typed(state), repeat), 1),
+                "loads_us": round(_time(lambda: serde.loads_typed(typed), repeat), 1),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="output JSON invece della tabella")
+    args = parser.parse_args()
+
+    rows = run(args.repeat)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    baseline = {r["state"]: r for r in rows if r["serializer"] == "jsonplus"}
+    print(f"{'state':<16} {'serializer':<10} {'bytes':>9} {'dumps µs':>10} {'loads µs':>10} {'speedup d/l':>12}")
+    for r in rows:
+        if "error" in r:
+            print(f"{r['state']:<16} {r['serializer']:<10} errore: {r['error']}")
+            continue
+        base = baseline[r["state"]]
+        if "error" in base:
+            speedup = "-"
+        else:
+            speedup = f"{base['dumps_us'] / r['dumps_us']:.1f}x/{base['loads_us'] / r['loads_us']:.1f}x"
+        print(f"{r['state']:<16} {r['serializer']:<10} {r['bytes']:>9} {r['dumps_us']:>10} {r['loads_us']:>10} {speedup:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Micro-benchmark dei tool analyze_* e visualize_* su dataset sintetici di dimensione crescente.
+
+Griglia di default: 3, 100 e 10.000 soggetti x 30 giorni, 180 giorni e 3 anni, con dati
+generati da benchmarks.synthetic_data (stesso schema e frequenze di data/). Ogni scala
+gira in un processo separato con DATA_DIR puntata ai CSV generati; il periodo richiesto
+copre tutti i giorni generati (caso peggiore).
+
+Per ogni tool e scala vengono misurate le fasi (mediana di --repeat esecuzioni):
+
+- parse: lettura del CSV e conversione delle colonne data (load_dataset a freddo, una
+  volta per dataset; nelle chiamate successive il DataFrame è in cache)
+- filter: selezione di soggetto e periodo come nei tool
+- aggregate: resto della chiamata del tool a dataset caldo (tempo del tool - filter);
+  per i tool visualize_* è la costruzione della figura dal risultato di analyze_* (senza
+  la cache dei grafici)
+- serialize: riepilogo del risultato per il contenuto del ToolMessage (il risultato completo
+  viaggia come artifact)
+
+Memoria per chiamata con tracemalloc (picco e memoria trattenuta dopo la chiamata) e
+peak RSS del processo per scala. Le scale che superano --max-rows righe per file vengono
+saltate per quel dataset (10.000 soggetti x 3 anni di eventi dei sensori sono ~370M righe).
+
+Uso (dalla root del progetto):
+    python -m benchmarks.data_tools [--subjects 3 100 10000] [--days 30 180 1095]
+                                    [--repeat 3] [--max-rows 2000000] [--budget-ms 100]
+                                    [--tools analyze_sleep_statistics ...] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import inspect
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.synthetic_data import (
+    SLEEP_FILE,
+    KITCHEN_FILE,
+    SENSOR_FILE,
+    estimated_rows,
+    period_for,
+    write_datasets,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RESULT_MARKER = "@@data_tools@@"
+SUBJECT_ID = 1
+
+TEAM_FILES = {"sleep_team": SLEEP_FILE, "kitchen_team": KITCHEN_FILE, "mobility_team": SENSOR_FILE}
+PHASES = ("parse", "filter", "aggregate", "serialize")
+
+
+def _median_ms(func, repeat: int) -> tuple[float, object]:
+    # Una esecuzione non misurata: import differiti (Plotly) e percorsi di codice a freddo
+    result = func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def _traced_mb(func) -> tuple[float, float]:
+    """(picco, memoria trattenuta) in MB allocati durante func secondo tracemalloc"""
+    tracemalloc.start()
+    try:
+        func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2**20, 2), round(current / 2**20, 2)
+
+
+def _filter(df, date_column: str, subject_id: int, period: str):
+    """Stessa selezione dei tool: soggetto, poi intervallo di date"""
+    import pandas as pd
+
+    df_subject = df[df["subject_id"] == subject_id].copy()
+    start, end = (pd.to_datetime(d) for d in period.split(","))
+    return df_subject[(df_subject[date_column] >= start) & (df_subject[date_column] <= end)]
+
+
+def _tools():
+    """(tool analyze_*, team) e tool visualize_* associati per nome"""
+    from backend.tools import visualization_kitchen_tool, visualization_mobility_tool, visualization_sleep_tools
+    from backend.utils import prefetch
+
+    analyze = [getattr(prefetch, name) for name in prefetch.TOOL_TEAMS]
+    visualize = {}
+    for module in (visualization_sleep_tools, visualization_kitchen_tool, visualization_mobility_tool):
+        for tool in analyze:
+            candidate = getattr(module, tool.name.replace("analyze_", "visualize_", 1), None)
+            if candidate is not None:
+                visualize[tool.name] = candidate
+    return [(tool, prefetch.TOOL_TEAMS[tool.name]) for tool in analyze], visualize
+
+
+def run_scale(subjects: int, days: int, repeat: int, files: list[str], selected: list[str] | None) -> dict:
+    """Misura tutti i tool su una scala (processo figlio, DATA_DIR già impostata)"""
+    start = time.perf_counter()
+    rows = write_datasets(os.environ["DATA_DIR"], subjects, days, files=files)
+    generate_s = round(time.perf_counter() - start, 2)
+
+    from langgraph.prebuilt.tool_node import msg_content_output
+    from backend.tools.tool_output import summarize_for_llm
+    from backend.utils.data_cache import clear_datasets, load_dataset
+    from backend.utils.prefetch import TEAM_DATASETS
+
+    period = period_for(days)
+    datasets = {}
+    for team, file in TEAM_FILES.items():
+        if file not in rows:
+            continue
+        path, date_columns = TEAM_DATASETS[team]
+
+        def parse():
+            clear_datasets()
+            return load_dataset(path, date_columns)
+
+        parse_ms, _ = _median_ms(parse, repeat)
+        parse_peak, _ = _traced_mb(parse)
+        datasets[team] = {
+            "rows": rows[file],
+            "csv_mb": round(os.path.getsize(path) / 2**20, 1),
+            "parse_ms": round(parse_ms, 2),
+            "parse_alloc_peak_mb": parse_peak,
+        }
+        load_dataset(path, date_columns)
+
+    analyze_tools, visualize_tools = _tools()
+    results = []
+    for tool, team in analyze_tools:
+        if team not in datasets or (selected and tool.name not in selected and
+                                    visualize_tools.get(tool.name, tool).name not in selected):
+            continue
+        path, date_columns = TEAM_DATASETS[team]
+        df = load_dataset(path, date_columns)
+        # Funzione originale, senza la cache dei risultati e senza il riepilogo per l'LLM
+        compute = inspect.unwrap(tool.func)
+
+        filter_ms, _ = _median_ms(lambda: _filter(df, date_columns[0], SUBJECT_ID, period), repeat)
+        call_ms, result = _median_ms(lambda: compute(SUBJECT_ID, period), repeat)
+        serialize_ms, content = _median_ms(lambda: msg_content_output(summarize_for_llm(result)), repeat)
+        peak, retained = _traced_mb(lambda: msg_content_output(summarize_for_llm(compute(SUBJECT_ID, period))))
+        phases = {
+            "parse": datasets[team]["parse_ms"],
+            "filter": filter_ms,
+            "aggregate": max(0.0, call_ms - filter_ms),
+            "serialize": serialize_ms,
+        }
+        if not selected or tool.name in selected:
+            results.append(_row(tool.name, phases, peak, retained, content, result))
+
+        visualize = visualize_tools.get(tool.name)
+        if visualize is None or (selected and visualize.name not in selected) or "error" in result:
+            continue
+        # Funzione originale, senza with_artifact: il riepilogo per l'LLM è misurato a parte
+        render = inspect.unwrap(visualize.func)
+        build_ms, figure = _median_ms(lambda: render(result), repeat)
+        serialize_ms, content = _median_ms(lambda: msg_content_output(summarize_for_llm(figure)), repeat)
+        peak, retained = _traced_mb(lambda: msg_content_output(summarize_for_llm(render(result))))
+        phases = {"parse": None, "filter": None, "aggregate": build_ms, "serialize": serialize_ms}
+        results.append(_row(visualize.name, phases, peak, retained, content, figure))
+
+    return {
+        "subjects": subjects,
+        "days": days,
+        "generate_s": generate_s,
+        "datasets": datasets,
+        "tools": results,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _row(name: str, phases: dict, peak: float, retained: float, content, result) -> dict:
+    # Il totale per chiamata esclude parse: il DataFrame resta in cache tra le chiamate
+    call_phases = [phases[p] for p in ("filter", "aggregate", "serialize") if phases[p] is not None]
+    return {
+        "tool": name,
+        **{f"{phase}_ms": round(phases[phase], 2) if phases[phase] is not None else None for phase in PHASES},
+        "call_ms": round(sum(call_phases), 2),
+        "alloc_peak_mb": peak,
+        "retained_mb": retained,
+        "result_bytes": len(content.encode("utf-8")) if isinstance(content, str) else None,
+        "error": result.get("error") if isinstance(result, dict) else None,
+    }
+
+
+def _run_child(subjects: int, days: int, args, files: list[str]) -> dict:
+    with tempfile.TemporaryDirectory(prefix="data-tools-") as data_dir:
+        env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT), "DATA_DIR": data_dir, "LOG_LEVEL": "ERROR"}
+        cmd = [sys.executable, "-m", "benchmarks.data_tools", "--child", str(subjects), str(days),
+               "--repeat", str(args.repeat), "--files", *files]
+        if args.tools:
+            cmd += ["--tools", *args.tools]
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+    return {"subjects": subjects, "days": days, "error": error}
+
+
+def run(args) -> list[dict]:
+    scales = []
+    for subjects in args.subjects:
+        for days in args.days:
+            estimate = estimated_rows(subjects, days)
+            files = [name for name, rows in estimate.items() if rows <= args.max_rows]
+            skipped = {name: rows for name, rows in estimate.items() if rows > args.max_rows}
+            scale = _run_child(subjects, days, args, files) if files else {"subjects": subjects, "days": days}
+            if skipped:
+                scale["skipped"] = skipped
+            scales.append(scale)
+    return scales
+
+
+def first_over_budget(scales: list[dict], budget_ms: float) -> list[tuple[str, dict]]:
+    """Per ogni tool la scala più piccola (per righe) in cui una chiamata supera il budget"""
+    over = {}
+    for scale in scales:
+        for row in scale.get("tools", []):
+            if row["call_ms"] <= budget_ms:
+                continue
+            rows = scale["subjects"] * scale["days"]
+            if row["tool"] not in over or rows < over[row["tool"]][0]:
+                over[row["tool"]] = (rows, {"subjects": scale["subjects"], "days": scale["days"], **row})
+    return sorted(((tool, data) for tool, (_, data) in over.items()), key=lambda item: item[1]["subjects"] * item[1]["days"])
+
+
+def _print_report(scales: list[dict], budget_ms: float) -> None:
+    for scale in scales:
+        print(f"\n=== {scale['subjects']} soggetti x {scale['days']} giorni")
+        if "error" in scale:
+            print(f"  errore: {scale['error']}")
+            continue
+        for team, data in scale.get("datasets", {}).items():
+            print(f"  {team:<14} {data['rows']:>10} righe {data['csv_mb']:>8} MB  parse {data['parse_ms']:>10} ms"
+                  f"  alloc {data['parse_alloc_peak_mb']} MB")
+        for name, rows in scale.get("skipped", {}).items():
+            print(f"  saltato {name}: ~{rows} righe > --max-rows")
+        if not scale.get("tools"):
+            continue
+        print(f"  {'tool':<38} {'filter':>9} {'aggregate':>10} {'serialize':>10} {'call ms':>9} "
+              f"{'alloc MB':>9} {'retained':>9} {'bytes':>9}")
+        for row in scale["tools"]:
+            filter_ms = "-" if row["filter_ms"] is None else row["filter_ms"]
+            print(f"  {row['tool']:<38} {filter_ms:>9} {row['aggregate_ms']:>10} {row['serialize_ms']:>10} "
+                  f"{row['call_ms']:>9} {row['alloc_peak_mb']:>9} {row['retained_mb']:>9} {row['result_bytes'] or '-':>9}"
+                  + (f"  errore: {row['error']}" if row["error"] else ""))
+        print(f"  peak RSS {scale['peak_rss_mb']} MB, generazione dati {scale['generate_s']}s")
+
+    over = first_over_budget(scales, budget_ms)
+    print(f"\nPrimi tool oltre {budget_ms} ms per chiamata (a dataset caldo):")
+    if not over:
+        print("  nessuno")
+    for tool, data in over:
+        print(f"  {tool:<38} da {data['subjects']} soggetti x {data['days']} giorni: {data['call_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subjects", type=int, nargs="+", default=[3, 100, 10_000])
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 180, 1095])
+    parser.add_argument("--repeat", type=int, default=3, help="esecuzioni per fase (mediana)")
+    parser.add_argument("--max-rows", type=int, default=2_000_000, help="righe massime per file generato")
+    parser.add_argument("--budget-ms", type=float, default=100, help="soglia per il riepilogo finale")
+    parser.add_argument("--tools", nargs="+", help="solo questi tool (nomi analyze_*/visualize_*)")
+    parser.add_argument("--json", action="store_true", help="output JSON invece del report testuale")
+    parser.add_argument("--child", nargs=2, type=int, metavar=("SUBJECTS", "DAYS"), help=argparse.SUPPRESS)
+    parser.add_argument("--files", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        subjects, days = args.child
+        result = run_scale(subjects, days, args.repeat, args.files, args.tools)
+        print(RESULT_MARKER + json.dumps(result), flush=True)
+        return
+
+    scales = run(args)
+    if args.json:
+        print(json.dumps(scales, indent=2))
+    else:
+        _print_report(scales, args.budget_ms)
+
+
+if __name__ == "__main__":
+    main()
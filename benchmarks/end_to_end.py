@@ -0,0 +1,303 @@
+"""
+Benchmark end-to-end del grafo compilato (build_graph) con il modello simulato.
+
+Il grafo gira con LLM_BACKEND=fake (backend.utils.fake_llm): nessuna rete, latenze e
+lunghezze delle risposte controllate da --latency / --ms-per-token, seed fisso. I checkpoint
+vanno su un database SQLite temporaneo e i grafici su un blob store temporaneo.
+
+Il corpus contiene quattro classi di domande rappresentative:
+
+- greeting: saluti e richieste di aiuto (risposta diretta del conversational_router)
+- single_domain: un solo team, con grafico del team
+- cross_domain: più team, grafico di correlazione del graph generator
+- follow_up: seconda domanda nello stesso thread (misurata solo la seconda)
+
+Ogni classe gira in un processo separato (peak RSS non influenzato dalle altre), dopo un
+turno di riscaldamento non misurato. Per classe vengono riportati: p50/p95 della latenza
+per turno, chiamate LLM, token (input, output, letti da cache), esecuzioni di tool,
+byte di checkpoint scritti per turno e peak RSS del processo.
+
+Uso (dalla root del progetto):
+    python -m benchmarks.end_to_end [--repeat 5] [--latency constant:0] [--ms-per-token 0]
+                                    [--error-rate 0] [--answer-synthesis llm]
+                                    [--checkpoint-serializer fast] [--json] [--output results.json]
+                                    [--baseline results_precedenti.json]
+Con --output il risultato (JSON con commit e configurazione) può essere confrontato tra
+commit diversi; --baseline stampa la variazione percentuale rispetto a un file precedente.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RESULT_MARKER = "@@end_to_end@@"
+
+# Classe -> conversazioni; in ogni conversazione viene misurato solo l'ultimo turno
+CORPUS = {
+    "greeting": [
+        ["Ciao!"],
+        ["Grazie mille, cosa puoi fare?"],
+    ],
+    "single_domain": [
+        ["Come ha dormito il soggetto 1 dal 2024-01-01 al 2024-06-28?"],
+        ["Analizza l'uso della cucina del soggetto 2 dal 2024-03-01 al 2024-03-31"],
+        ["Come si muove in casa il soggetto 3 dal 2024-01-01 al 2024-02-29?"],
+        ["Com'è la frequenza cardiaca durante il sonno del soggetto 2 dal 2024-04-01 al 2024-04-30?"],
+    ],
+    "cross_domain": [
+        ["Confronta sonno e cucina del soggetto 1 dal 2024-01-01 al 2024-06-28"],
+        ["Il sonno del soggetto 2 è correlato alla mobilità dal 2024-02-01 al 2024-04-30?"],
+        ["Analizza sonno, cucina e mobilità del soggetto 3 dal 2024-01-01 al 2024-03-31"],
+    ],
+    "follow_up": [
+        ["Come ha dormito il soggetto 1 dal 2024-01-01 al 2024-03-31?", "E come ha cucinato nello stesso periodo?"],
+        ["Analizza la mobilità del soggetto 2 dal 2024-01-01 al 2024-06-28", "E il sonno?"],
+    ],
+}
+
+# Metriche per turno, nell'ordine del report
+TURN_METRICS = ("llm_calls", "input_tokens", "output_tokens", "cache_read_tokens", "tool_calls",
+                "checkpoint_bytes", "graphs")
+
+
+class TurnMetrics(BaseCallbackHandler):
+    """Conta chiamate LLM, token e tool di un turno (i nodi paralleli girano in thread diversi)"""
+
+    def __init__(self):
+        self.counts = dict.fromkeys(TURN_METRICS[:5], 0)
+        self._lock = threading.Lock()
+
+    def _add(self, key: str, value: int) -> None:
+        with self._lock:
+            self.counts[key] += value
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._add("llm_calls", 1)
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self._add("input_tokens", usage.get("input_tokens", 0))
+                self._add("output_tokens", usage.get("output_tokens", 0))
+                self._add("cache_read_tokens", usage.get("input_token_details", {}).get("cache_read", 0))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self._add("tool_calls", 1)
+
+
+def _checkpoint_bytes(db_path: str, thread_id: str) -> int:
+    """Byte di checkpoint e pending writes salvati per il thread (tutti i namespace)"""
+    with sqlite3.connect(db_path) as conn:
+        checkpoints = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints WHERE thread_id = ?",
+            (thread_id,),
+        ).fetchone()[0]
+        writes = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes WHERE thread_id = ?", (thread_id,)
+        ).fetchone()[0]
+    return checkpoints + writes
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss è in KiB su Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Percentile nearest-rank"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def run_conversation(graph, db_path: str, turns: list[str]) -> dict:
+    """Esegue la conversazione in un thread nuovo e misura l'ultimo turno"""
+    from langchain_core.messages import HumanMessage
+
+    thread_id = f"e2e-{uuid.uuid4().hex}"
+    for question in turns[:-1]:
+        graph.invoke({"messages": [HumanMessage(content=question)]}, {"configurable": {"thread_id": thread_id}})
+
+    metrics = TurnMetrics()
+    bytes_before = _checkpoint_bytes(db_path, thread_id)
+    # Il canale graphs viene azzerato dal planner: conta solo i riferimenti nuovi
+    graphs_before = {g["blob_id"] for g in graph.get_state({"configurable": {"thread_id": thread_id}}).values.get("graphs") or []}
+    start = time.perf_counter()
+    result = graph.invoke(
+        {"messages": [HumanMessage(content=turns[-1])]},
+        {"configurable": {"thread_id": thread_id}, "callbacks": [metrics]},
+    )
+    latency = time.perf_counter() - start
+    return {
+        "latency_s": latency,
+        **metrics.counts,
+        "checkpoint_bytes": _checkpoint_bytes(db_path, thread_id) - bytes_before,
+        "graphs": sum(1 for g in result.get("graphs") or [] if g["blob_id"] not in graphs_before),
+    }
+
+
+def run_class(name: str, repeat: int) -> dict:
+    """Misura una classe del corpus nel processo corrente (ambiente già configurato)"""
+    from backend.config.settings import CHECKPOINT_DB_PATH
+    from backend.utils.warmup import get_graph
+
+    graph = get_graph()
+    # Turno di riscaldamento: import differiti, dataset, Plotly
+    run_conversation(graph, CHECKPOINT_DB_PATH, CORPUS[name][0])
+    rss_after_warmup = _peak_rss_mb()
+
+    turns, errors = [], []
+    for _ in range(repeat):
+        for conversation in CORPUS[name]:
+            try:
+                turns.append(run_conversation(graph, CHECKPOINT_DB_PATH, conversation))
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    latencies = [turn["latency_s"] for turn in turns]
+    summary = {
+        "turns": len(turns),
+        "errors": len(errors),
+        "p50_s": round(_percentile(latencies, 50), 4) if turns else None,
+        "p95_s": round(_percentile(latencies, 95), 4) if turns else None,
+        "rss_after_warmup_mb": rss_after_warmup,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    for metric in TURN_METRICS:
+        summary[f"{metric}_per_turn"] = round(statistics.mean(t[metric] for t in turns), 1) if turns else None
+    if errors:
+        summary["first_error"] = errors[0]
+    return summary
+
+
+def _child_env(args, workdir: str) -> dict:
+    return {
+        **os.environ,
+        "PYTHONPATH": str(PROJECT_ROOT),
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MS": args.latency,
+        "FAKE_LLM_MS_PER_TOKEN": str(args.ms_per_token),
+        "FAKE_LLM_ERROR_RATE": str(args.error_rate),
+        "FAKE_LLM_RETRY_DELAY_SECONDS": "0",
+        "FAKE_LLM_SEED": str(args.seed),
+        # Impostazioni che cambiano chiamate, token e byte per turno: fissate dalla CLI e
+        # registrate nel risultato, non ereditate dall'ambiente o dai default correnti
+        "ANSWER_SYNTHESIS": args.answer_synthesis,
+        "CHECKPOINT_SERIALIZER": args.checkpoint_serializer,
+        "CHECKPOINT_BACKEND": "sqlite",
+        "CHECKPOINT_DB_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+        # Dimensioni stabili: nessuna compaction durante la misura
+        "CHECKPOINT_COMPACTION_INTERVAL_SECONDS": "0",
+        "GRAPH_STORE_BACKEND": "fs",
+        "GRAPH_STORE_PATH": os.path.join(workdir, "graphs"),
+        "LOG_LEVEL": "ERROR",
+    }
+
+
+def _run_child(name: str, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="e2e-") as workdir:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.end_to_end", "--child", name, "--repeat", str(args.repeat)],
+            cwd=PROJECT_ROOT, env=_child_env(args, workdir), capture_output=True, text=True,
+        )
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+    return {"error": error}
+
+
+def _git_commit() -> str | None:
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() or None
+
+
+def run(args) -> dict:
+    classes = args.classes or list(CORPUS)
+    return {
+        "commit": _git_commit(),
+        "config": {
+            "repeat": args.repeat,
+            "latency": args.latency,
+            "ms_per_token": args.ms_per_token,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+            "answer_synthesis": args.answer_synthesis,
+            "checkpoint_serializer": args.checkpoint_serializer,
+        },
+        "classes": {name: _run_child(name, args) for name in classes},
+    }
+
+
+def _print_report(report: dict, baseline: dict | None) -> None:
+    print(f"commit {report['commit']}  config {report['config']}")
+    columns = ["p50_s", "p95_s"] + [f"{m}_per_turn" for m in TURN_METRICS] + ["peak_rss_mb"]
+    for name, data in report["classes"].items():
+        print(f"\n=== {name}")
+        if "error" in data:
+            print(f"  errore: {data['error']}")
+            continue
+        print(f"  turni {data['turns']}, errori {data['errors']}")
+        previous = (baseline or {}).get("classes", {}).get(name, {})
+        for column in columns:
+            line = f"  {column:<26} {data[column]}"
+            old = previous.get(column)
+            if isinstance(old, (int, float)) and isinstance(data[column], (int, float)) and old:
+                line += f"  ({(data[column] - old) / old:+.1%} vs {baseline.get('commit')})"
+            print(line)
+        if "first_error" in data:
+            print(f"  primo errore: {data['first_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="ripetizioni del corpus di ogni classe")
+    parser.add_argument("--classes", nargs="*", choices=list(CORPUS), help="classi da eseguire (default: tutte)")
+    parser.add_argument("--latency", default="constant:0",
+                        help="distribuzione del tempo al primo token in ms (es. lognormal:600,0.4)")
+    parser.add_argument("--ms-per-token", type=float, default=0, help="ms per token in uscita")
+    parser.add_argument("--error-rate", type=float, default=0, help="probabilità di 429 per chiamata LLM")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--answer-synthesis", choices=["llm", "template"], default="llm",
+                        help="risposta dei turni con un solo risultato (ANSWER_SYNTHESIS)")
+    parser.add_argument("--checkpoint-serializer", choices=["fast", "jsonplus"], default="fast",
+                        help="serializer dei checkpoint (CHECKPOINT_SERIALIZER)")
+    parser.add_argument("--json", action="store_true", help="output JSON invece del report testuale")
+    parser.add_argument("--output", help="salva il risultato JSON su file")
+    parser.add_argument("--baseline", help="risultato JSON precedente con cui confrontare")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_MARKER + json.dumps(run_class(args.child, args.repeat)), flush=True)
+        return
+
+    report = run(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    else:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+        _print_report(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark dei builder delle figure: dict costruiti con backend.utils.figure_spec
+contro la stessa figura passata per plotly.graph_objects (go.Figure(...).to_dict()).
+
+Per ogni template di backend.utils.graph_templates e ogni tool visualize_* vengono
+misurate (mediana di --repeat esecuzioni, senza la cache dei grafici):
+
+- raw: costruzione della figura come dict (il codice attuale)
+- validated: raw + go.Figure(figura).to_dict(), cioè validazione di ogni proprietà e
+  copia completa come faceva il codice basato su go.Figure / make_subplots
+
+La colonna "same" verifica che le due figure coincidano (go.Figure risolve il template
+per nome, quindi il confronto avviene dopo la normalizzazione).
+I risultati di input vengono dai tool analyze_* sui dati in data/.
+
+Uso (dalla root del progetto):
+    python -m benchmarks.figure_builders [--repeat 50] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import inspect
+import json
+import statistics
+import time
+
+SUBJECT_ID = 1
+PERIOD = "2024-01-01,2024-06-28"
+
+
+def _median_ms(func, repeat: int) -> tuple[float, object]:
+    # Una esecuzione non misurata: import differiti (Plotly) e percorsi di codice a freddo
+    result = func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def _analysis_results() -> dict[str, dict]:
+    """Nome del TypedDict del risultato -> risultato reale del tool analyze_*"""
+    from backend.tools.tool_output import invoke_tool
+    from backend.tools.visualization_registry import VISUALIZATIONS, find_visualization
+    from backend.utils import prefetch
+
+    results = {}
+    for name in prefetch.TOOL_TEAMS:
+        result = invoke_tool(getattr(prefetch, name), {"subject_id": SUBJECT_ID, "period": PERIOD})
+        spec = find_visualization(result) if "error" not in result else None
+        if spec is not None:
+            results[spec["result_type"].__name__] = result
+    missing = {spec["result_type"].__name__ for spec in VISUALIZATIONS} - set(results)
+    if missing:
+        raise RuntimeError(f"Nessun risultato di analisi per {sorted(missing)}")
+    return results
+
+
+def _builders(results: dict[str, dict]) -> list[tuple[str, object, object]]:
+    """(nome, funzione originale senza cache, argomento) per template e tool visualize_*"""
+    from backend.tools.visualization_registry import VISUALIZATIONS
+    from backend.utils import graph_templates
+
+    builders = []
+    for name, func in inspect.getmembers(graph_templates, inspect.isfunction):
+        if not name.startswith("create_") or func.__module__ != graph_templates.__name__:
+            continue
+        func = func.__wrapped__
+        parameter = next(iter(inspect.signature(func).parameters.values()))
+        annotation = parameter.annotation if isinstance(parameter.annotation, str) else parameter.annotation.__name__
+        builders.append((name, func, "Grafico" if parameter.name == "title" else results[annotation]))
+    for spec in VISUALIZATIONS:
+        builders.append((spec["tool"].name, inspect.unwrap(spec["tool"].func), results[spec["result_type"].__name__]))
+    return builders
+
+
+def run(repeat: int) -> list[dict]:
+    import plotly.graph_objects as go
+
+    rows = []
+    for name, func, argument in _builders(_analysis_results()):
+        raw_ms, graph = _median_ms(lambda: func(argument), repeat)
+        validated_ms, figure = _median_ms(lambda: go.Figure(func(argument)["plotly_json"]).to_dict(), repeat)
+        rows.append({
+            "builder": name,
+            "raw_ms": round(raw_ms, 3),
+            "validated_ms": round(validated_ms, 3),
+            "speedup": round(validated_ms / raw_ms, 1) if raw_ms else None,
+            "same": go.Figure(graph["plotly_json"]).to_dict() == figure,
+        })
+    return rows
+
+
+def _print_report(rows: list[dict]) -> None:
+    print(f"{'builder':<42} {'raw ms':>9} {'go.Figure ms':>13} {'speedup':>8} {'same':>5}")
+    for row in rows:
+        print(f"{row['builder']:<42} {row['raw_ms']:>9} {row['validated_ms']:>13} {row['speedup']:>7}x {row['same']!s:>5}")
+    raw = sum(row["raw_ms"] for row in rows)
+    validated = sum(row["validated_ms"] for row in rows)
+    print(f"{'totale':<42} {raw:>9.3f} {validated:>13.3f} {validated / raw:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="esecuzioni per builder (mediana)")
+    parser.add_argument("--json", action="store_true", help="output JSON invece del report testuale")
+    args = parser.parse_args()
+
+    rows = run(args.repeat)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
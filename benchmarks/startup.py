@@ -0,0 +1,259 @@
+"""
+Benchmark di avvio: import a freddo e latenza della prima richiesta.
+
+Ogni misura gira in un processo Python nuovo (import a freddo). Per ogni target:
+
+- server (backend.api.server): import del modulo, prima /health, prima richiesta che usa
+  il grafo (GET /chat/{id}/history, che lo costruisce con WARMUP_ON_STARTUP=0) e, in un
+  secondo processo con warmup attivo, tempo fino a /ready = 200
+- backend_main (backend.main): import del modulo e costruzione del grafo al primo uso
+- frontend (frontend/app.py): import delle dipendenze dello script e primo render
+  completo con streamlit.testing (senza backend raggiungibile la pagina mostra l'errore
+  di connessione, come in produzione)
+
+Con --chat si misura anche la prima POST /chat e la prima run_demo: servono un backend
+LLM funzionante e le relative credenziali, oppure il modello simulato (LLM_BACKEND=fake).
+
+Per ogni target viene riportato il dettaglio di python -X importtime del solo import a
+freddo: i moduli con il tempo di import proprio più alto e il totale per pacchetto di
+primo livello.
+
+Uso (dalla root del progetto):
+    python -m benchmarks.startup [--repeat 3] [--top 15] [--chat] [--json]
+                                 [--budget server=1.5 --budget backend_main=1.0]
+Con --budget il processo termina con codice 1 se la mediana dell'import supera il limite.
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+FRONTEND_APP = PROJECT_ROOT / "frontend" / "app.py"
+RESULT_MARKER = "@@startup@@"
+QUESTION = "Come ha dormito il soggetto 1 negli ultimi 30 giorni?"
+# Attesa massima di /ready = 200 nello scenario con warmup e durata massima di un processo figlio
+READY_TIMEOUT_S = 120
+CHILD_TIMEOUT_S = 600
+
+# Codice eseguito nei processi figli: stampa le misure come JSON dopo RESULT_MARKER
+_PRELUDE = f"""
+import json, time
+_t0 = time.perf_counter()
+_result = {{}}
+def _lap(name, since):
+    _result[name] = round(time.perf_counter() - since, 4)
+    return time.perf_counter()
+def _done():
+    print({RESULT_MARKER!r} + json.dumps(_result), flush=True)
+"""
+
+SERVER_LAZY = _PRELUDE + """
+import backend.api.server as server
+t = _lap("import_s", _t0)
+from fastapi.testclient import TestClient
+with TestClient(server.app) as client:
+    t = time.perf_counter()
+    client.get("/health").raise_for_status()
+    t = _lap("first_health_s", t)
+    client.get("/chat/startup-benchmark/history").raise_for_status()
+    t = _lap("first_graph_request_s", t)
+    if CHAT:
+        client.post("/chat", json={"message": QUESTION}).raise_for_status()
+        _lap("first_chat_s", t)
+_done()
+"""
+
+SERVER_WARMUP = _PRELUDE + """
+import backend.api.server as server
+t = _lap("import_s", _t0)
+from fastapi.testclient import TestClient
+with TestClient(server.app) as client:
+    deadline = time.perf_counter() + READY_TIMEOUT_S
+    while True:
+        response = client.get("/ready")
+        warmup = response.json()["warmup"]
+        # Un warmup fallito non diventa mai ready: si esce riportando l'errore
+        if response.status_code == 200 or warmup["state"] == "failed" or time.perf_counter() > deadline:
+            break
+        time.sleep(0.02)
+    _result["warmup"] = warmup
+    if response.status_code == 200:
+        t = _lap("ready_s", t)
+        client.get("/chat/startup-benchmark/history").raise_for_status()
+        _lap("first_graph_request_s", t)
+    elif warmup["state"] == "failed":
+        _result["error"] = f"warmup fallito: {warmup['error']}"
+    else:
+        _result["error"] = f"/ready non pronto dopo {READY_TIMEOUT_S}s (fase {warmup['current_phase']})"
+_done()
+"""
+
+BACKEND_MAIN = _PRELUDE + """
+import backend.main as main
+t = _lap("import_s", _t0)
+from backend.utils.warmup import get_graph
+get_graph()
+t = _lap("graph_build_s", t)
+if CHAT:
+    main.run_demo(QUESTION)
+    _lap("first_chat_s", t)
+_done()
+"""
+
+FRONTEND = _PRELUDE + """
+exec(compile(FRONTEND_IMPORTS, "frontend/app.py", "exec"))
+t = _lap("import_s", _t0)
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(FRONTEND_APP, default_timeout=60)
+app.run()
+_lap("first_render_s", t)
+_done()
+"""
+
+
+def _frontend_imports() -> str:
+    """Solo gli import di primo livello di frontend/app.py (lo script esegue anche la UI)"""
+    tree = ast.parse(FRONTEND_APP.read_text(encoding="utf-8"))
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return ast.unparse(ast.Module(body=imports, type_ignores=[]))
+
+
+# target -> (codice del solo import, per il dettaglio; lista di (scenario, codice, variabili d'ambiente))
+TARGETS = {
+    "server": ("import backend.api.server", [
+        ("lazy", SERVER_LAZY, {"WARMUP_ON_STARTUP": "0"}),
+        ("warmup", SERVER_WARMUP, {"WARMUP_ON_STARTUP": "1"}),
+    ]),
+    "backend_main": ("import backend.main", [("lazy", BACKEND_MAIN, {})]),
+    "frontend": ('exec(compile(FRONTEND_IMPORTS, "frontend/app.py", "exec"))', [("render", FRONTEND, {})]),
+}
+
+
+def _run_child(code: str, env_overrides: dict, chat: bool, importtime: bool = False) -> tuple[dict, str]:
+    header = (
+        f"CHAT = {chat!r}\nQUESTION = {QUESTION!r}\nREADY_TIMEOUT_S = {READY_TIMEOUT_S!r}\n"
+        f"FRONTEND_APP = {str(FRONTEND_APP)!r}\nFRONTEND_IMPORTS = {_frontend_imports()!r}\n"
+    )
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT), **env_overrides}
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", header + code]
+    try:
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+                              timeout=CHILD_TIMEOUT_S)
+    except subprocess.TimeoutExpired as e:
+        stderr = e.stderr.decode(errors="replace") if isinstance(e.stderr, bytes) else (e.stderr or "")
+        return {"error": f"processo interrotto dopo {CHILD_TIMEOUT_S}s"}, stderr
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):]), proc.stderr
+    error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+    return {"error": error}, proc.stderr
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(modulo, self µs, cumulativo µs) dalle righe di python -X importtime"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def import_breakdown(modules: list[tuple[str, int, int]], top: int) -> dict:
+    by_package = defaultdict(int)
+    for name, self_us, _ in modules:
+        by_package[name.split(".")[0]] += self_us
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+    return {
+        "total_ms": round(sum(m[1] for m in modules) / 1000, 1),
+        "modules": len(modules),
+        "top_modules_ms": {name: round(self_us / 1000, 1) for name, self_us, _ in slowest},
+        "packages_ms": {
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }
+
+
+def _median_runs(runs: list[dict]) -> dict:
+    ok = [run for run in runs if "error" not in run]
+    if not ok:
+        return runs[0]
+    summary = {}
+    for key in ok[0]:
+        values = [run[key] for run in ok if isinstance(run.get(key), (int, float))]
+        summary[key] = round(statistics.median(values), 4) if values else ok[-1][key]
+    return summary
+
+
+def run(repeat: int, top: int, chat: bool) -> dict:
+    report = {}
+    for target, (import_code, scenarios) in TARGETS.items():
+        report[target] = {}
+        for scenario, code, env in scenarios:
+            runs = [_run_child(code, env, chat)[0] for _ in range(repeat)]
+            report[target][scenario] = _median_runs(runs)
+        # Dettaglio dei soli moduli importati a freddo (non quelli caricati alla prima richiesta)
+        _, stderr = _run_child(import_code, {}, chat=False, importtime=True)
+        report[target]["imports"] = import_breakdown(parse_importtime(stderr), top)
+    return report
+
+
+def _print_report(report: dict) -> None:
+    for target, data in report.items():
+        print(f"\n=== {target}")
+        for scenario, timings in data.items():
+            if scenario == "imports":
+                continue
+            if "error" in timings:
+                print(f"  {scenario:<8} errore: {timings['error']}")
+                continue
+            values = "  ".join(f"{k}={v}" for k, v in timings.items() if k.endswith("_s"))
+            print(f"  {scenario:<8} {values}")
+        imports = data["imports"]
+        print(f"  import (-X importtime): {imports['total_ms']} ms, {imports['modules']} moduli")
+        print("  per pacchetto: " + ", ".join(f"{p} {ms}" for p, ms in imports["packages_ms"].items()))
+        print("  moduli più lenti (self ms):")
+        for name, ms in imports["top_modules_ms"].items():
+            print(f"    {ms:>8}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="processi a freddo per scenario (mediana)")
+    parser.add_argument("--top", type=int, default=15, help="moduli e pacchetti mostrati nel dettaglio")
+    parser.add_argument("--chat", action="store_true", help="misura anche la prima richiesta di chat (serve l'LLM)")
+    parser.add_argument("--json", action="store_true", help="output JSON invece del report testuale")
+    parser.add_argument("--budget", action="append", default=[], metavar="TARGET=SECONDI",
+                        help="tempo massimo di import (mediana) per un target")
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.top, args.chat)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+    exceeded = []
+    for budget in args.budget:
+        target, seconds = budget.split("=")
+        import_s = next(iter(report[target].values())).get("import_s")
+        if import_s is None or import_s > float(seconds):
+            exceeded.append(f"{target}: import {import_s}s > budget {seconds}s")
+    if exceeded:
+        print("\nBudget superato:\n  " + "\n  ".join(exceeded), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
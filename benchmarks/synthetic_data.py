@@ -0,0 +1,154 @@
+"""
+Generatore di dataset sintetici con lo stesso schema dei CSV in data/.
+
+Le distribuzioni e le frequenze (notti, attività in cucina, eventi dei sensori per
+soggetto e giorno) sono ricavate dai dati reali, così i tool lavorano su dati
+realistici a qualunque scala. Tutto è vettoriale (NumPy) e deterministico dato il seed.
+
+Uso:
+    python -m benchmarks.synthetic_data OUTPUT_DIR --subjects 100 --days 180
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+START_DATE = pd.Timestamp("2024-01-01")
+
+SLEEP_FILE = "sonno_data.csv"
+KITCHEN_FILE = "cucina_data.csv"
+SENSOR_FILE = "sensor_data.csv"
+
+# Frequenze medie per soggetto e giorno nei dati reali
+KITCHEN_ACTIVITIES_PER_DAY = 2.9
+SENSOR_EVENTS_PER_DAY = 34
+
+# Fasce orarie delle attività in cucina: (nome, ora di inizio, probabilità)
+KITCHEN_SLOTS = [("mattina", 6, 0.39), ("pranzo", 12, 0.27), ("cena", 19, 0.34)]
+ROOMS = ["cucina", "soggiorno", "camera_letto", "bagno", "ingresso"]
+ROOM_WEIGHTS = [0.30, 0.24, 0.20, 0.16, 0.10]
+SENSORS_PER_ROOM = 3
+
+
+def estimated_rows(subjects: int, days: int) -> dict[str, int]:
+    """Righe attese per file (per decidere in anticipo se una scala è fattibile)"""
+    return {
+        SLEEP_FILE: subjects * days,
+        KITCHEN_FILE: round(subjects * days * KITCHEN_ACTIVITIES_PER_DAY),
+        SENSOR_FILE: subjects * days * SENSOR_EVENTS_PER_DAY,
+    }
+
+
+def period_for(days: int) -> str:
+    """Periodo che copre tutti i giorni generati, nel formato dei tool"""
+    end = START_DATE + pd.Timedelta(days=days - 1)
+    return f"{START_DATE.date()},{end.date()}"
+
+
+def _subject_days(subjects: int, days: int, per_day: np.ndarray | int) -> tuple[np.ndarray, np.ndarray]:
+    subject_ids = np.repeat(np.arange(1, subjects + 1), days)
+    day_offsets = np.tile(np.arange(days), subjects)
+    return np.repeat(subject_ids, per_day), np.repeat(day_offsets, per_day)
+
+
+def sleep_frame(subjects: int, days: int, rng: np.random.Generator) -> pd.DataFrame:
+    n = subjects * days
+    subject_ids, day_offsets = _subject_days(subjects, days, 1)
+    rem = np.clip(rng.normal(89, 20, n), 30, 170)
+    deep = np.clip(rng.normal(120, 30, n), 45, 207)
+    light = np.clip(rng.normal(212, 39, n), 100, 335)
+    return pd.DataFrame({
+        "data": START_DATE + pd.to_timedelta(day_offsets, unit="D"),
+        "total_sleep_time": np.maximum(rem + deep + light, 300.0),
+        "rem_sleep_duration": rem,
+        "deep_sleep_duration": deep,
+        "light_sleep_duration": light,
+        "wakeup_count": np.clip(rng.poisson(1.5, n) + 3, 3, 10),
+        "out_of_bed_count": np.clip(rng.poisson(0.65, n) + 1, 1, 5),
+        "hr_average": np.clip(rng.normal(60, 7.5, n), 38, 85),
+        "rr_average": np.clip(rng.normal(16, 3, n), 6, 25),
+        "subject_id": subject_ids,
+    })
+
+
+def kitchen_frame(subjects: int, days: int, rng: np.random.Generator) -> pd.DataFrame:
+    per_day = rng.poisson(KITCHEN_ACTIVITIES_PER_DAY, subjects * days)
+    subject_ids, day_offsets = _subject_days(subjects, days, per_day)
+    n = len(subject_ids)
+    slot = rng.choice(len(KITCHEN_SLOTS), n, p=[p for _, _, p in KITCHEN_SLOTS])
+    slot_hours = np.array([hour for _, hour, _ in KITCHEN_SLOTS])[slot]
+    start = (START_DATE + pd.to_timedelta(day_offsets, unit="D")
+             + pd.to_timedelta(slot_hours * 3600 + rng.integers(0, 3 * 3600, n), unit="s"))
+    duration = np.clip(np.round(rng.lognormal(2.7, 0.7, n)), 5, 191).astype(int)
+    order = np.lexsort((start.values, subject_ids))
+    start = start[order]
+    return pd.DataFrame({
+        "timestamp_picco": start,
+        "temperatura_max": np.clip(25 + rng.exponential(15, n), 25, 140),
+        "id_attivita": np.arange(1, n + 1),
+        "start_time_attivita": start,
+        "end_time_attivita": start + pd.to_timedelta(duration[order], unit="m"),
+        "durata_attivita_minuti": duration[order],
+        "fascia_oraria": np.array([name for name, _, _ in KITCHEN_SLOTS])[slot[order]],
+        "subject_id": subject_ids[order],
+    })
+
+
+def sensor_frame(subjects: int, days: int, rng: np.random.Generator) -> pd.DataFrame:
+    subject_ids, day_offsets = _subject_days(subjects, days, SENSOR_EVENTS_PER_DAY)
+    n = len(subject_ids)
+    seconds = day_offsets.astype(np.int64) * 86400 + rng.integers(6 * 3600, 23 * 3600, n)
+    order = np.lexsort((seconds, subject_ids))
+    room = rng.choice(len(ROOMS), n, p=ROOM_WEIGHTS)
+    sensor_ids = np.array([f"S_{r}_{i}" for r in ROOMS for i in range(1, SENSORS_PER_ROOM + 1)])
+    sensor = room * SENSORS_PER_ROOM + rng.integers(0, SENSORS_PER_ROOM, n)
+    return pd.DataFrame({
+        "timestamp": START_DATE + pd.to_timedelta(seconds[order], unit="s"),
+        "sensor_id": sensor_ids[sensor],
+        "sensor_type": "PIR",
+        "room": np.array(ROOMS)[room],
+        "sensor_status": "active",
+        "duration_seconds": np.clip(np.round(rng.lognormal(5.3, 0.9, n)), 30, 3695).astype(int),
+        "subject_id": subject_ids[order],
+    })
+
+
+GENERATORS = {
+    SLEEP_FILE: sleep_frame,
+    KITCHEN_FILE: kitchen_frame,
+    SENSOR_FILE: sensor_frame,
+}
+
+
+def write_datasets(output_dir: Path | str, subjects: int, days: int, seed: int = 0,
+                   files: list[str] | None = None) -> dict[str, int]:
+    """Scrive i CSV richiesti in output_dir e restituisce le righe di ciascuno"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rows = {}
+    for i, (name, generate) in enumerate(GENERATORS.items()):
+        if files is not None and name not in files:
+            continue
+        df = generate(subjects, days, np.random.default_rng(seed + i))
+        df.to_csv(output_dir / name, index=False)
+        rows[name] = len(df)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir")
+    parser.add_argument("--subjects", type=int, default=3)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for name, rows in write_datasets(args.output_dir, args.subjects, args.days, args.seed).items():
+        print(f"{name}: {rows} righe")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import json
+
 import streamlit as st
 import requests
 import plotly.graph_objects as go
@@ -15,6 +17,21 @@ st.set_page_config(
 # URL del backend
 BACKEND_URL = "http://localhost:8000"
 
+
+def iter_sse_events(response):
+    """Legge uno stream Server-Sent Events restituendo coppie (evento, dati JSON)"""
+    event, data_lines = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if event and data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].lstrip())
+
+
 # Inizializza session state
 if "thread_id" not in st.session_state:
     st.session_state.thread_id = str(uuid4())
@@ -227,19 +244,46 @@ if st.session_state.is_loading:
     user_message = st.session_state.past[-1]
 
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/chat",
+        # Stream SSE: avanzamento del grafo e token della risposta man mano che arrivano
+        status = st.status("Processing...", expanded=False)
+        answer_placeholder = st.empty()
+        answer = ""
+        data = None
+
+        with requests.post(
+            f"{BACKEND_URL}/chat/stream",
             json={
                 "message": user_message,
                 "thread_id": st.session_state.thread_id,
                 "max_iterations": 15
             },
-            timeout=120
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-
+            stream=True,
+            timeout=(5, 120)
+        ) as response:
+            if response.status_code != 200:
+                st.session_state.generated.append(f"Error: {response.status_code}")
+            else:
+                for event, payload in iter_sse_events(response):
+                    if event == "plan":
+                        teams = ", ".join(t["team"] for t in payload["tasks"])
+                        status.update(label=f"Plan ready: {teams}")
+                    elif event == "team_started":
+                        status.update(label=f"Running {payload['team']}...")
+                    elif event == "node":
+                        status.write(f"{payload['team'] or 'main'}: {payload['node']}")
+                    elif event == "graphs":
+                        status.write(f"{len(payload['graphs'])} graphs ready")
+                    elif event == "token":
+                        answer += payload["content"]
+                        answer_placeholder.markdown(answer)
+                    elif event == "message":
+                        data = payload
+                    elif event == "error":
+                        st.session_state.generated.append(f"Error: {payload['detail']}")
+
+        status.update(label="Done", state="complete")
+
+        if data is not None:
             # Add assistant message
             st.session_state.generated.append(data["message"])
 
@@ -250,8 +294,6 @@ if st.session_state.is_loading:
 
             # Update thread_id
             st.session_state.thread_id = data["thread_id"]
-        else:
-            st.session_state.generated.append(f"Error: {response.status_code}")
 
     except requests.exceptions.Timeout:
         st.session_state.generated.append("Request timeout. Backend is taking too long.")